@@ -40,8 +40,8 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
-    'user',
-    'game',
+    'user.apps.UserConfig',
+    'game.apps.GameConfig',
     "debug_toolbar",
 ]
 
@@ -124,9 +124,131 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
-    ]
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'common.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'common.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'common.pagination.IdCursorPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Lifetime in seconds of the JWT access tokens and of the refresh tokens
+# used to renew them without logging in again
+ACCESS_TOKEN_LIFETIME = 15 * 60
+REFRESH_TOKEN_LIFETIME = 30 * 24 * 60 * 60
+
+# Number of verified JWT payloads kept in memory by JWTAuthentication
+JWT_CACHE_SIZE = 4096
+
+# Users authenticated by JWTAuthentication are kept in memory for
+# USER_CACHE_TTL seconds. Saving or deleting a user drops it earlier.
+USER_CACHE_SIZE = 4096
+USER_CACHE_TTL = 60
+
+# Serialized games are kept in memory for GAME_FRAGMENT_CACHE_TTL seconds.
+# Saving a game, a genre or the genres of a game drops them earlier.
+GAME_FRAGMENT_CACHE_SIZE = 4096
+GAME_FRAGMENT_CACHE_TTL = 60
+
+# The game catalog version behind the /games ETags is read from the
+# database at most every CATALOG_VERSION_TTL seconds per process
+CATALOG_VERSION_TTL = 1
+
+# /games/search keeps an index of the game names in memory, rebuilt when
+# the catalog changes and every SEARCH_INDEX_TTL seconds to refresh the
+# popularity ranking. Misspelled names are matched down to a trigram
+# similarity of SEARCH_FUZZY_THRESHOLD. The results of the last
+# SEARCH_CACHE_SIZE queries are kept with the index.
+SEARCH_INDEX_TTL = 5 * 60
+SEARCH_FUZZY_THRESHOLD = 0.3
+SEARCH_CACHE_SIZE = 10000
+SEARCH_MAX_RESULTS = 50
+
+# compute_similar_games keeps the SIMILAR_GAMES_K most similar games of
+# every game, comparing SIMILARITY_BLOCK_SIZE games with the whole catalog
+# at a time, so memory is a few block size x games arrays
+SIMILAR_GAMES_K = 20
+SIMILARITY_BLOCK_SIZE = 256
+
+# compute_co_played_games keeps the RECOMMENDATION_TOP_N games most played
+# by the players of every game. It reads the play sessions of
+# RECOMMENDATION_CHUNK_SIZE users at a time and leaves out the users who
+# played more than RECOMMENDATION_MAX_BASKET games. Their games are paired in
+# batches of at most RECOMMENDATION_PAIR_BUDGET pairs (16 bytes each).
+# /users/me/recommendations scores them against the last
+# RECOMMENDATION_HISTORY games of the user.
+RECOMMENDATION_TOP_N = 50
+RECOMMENDATION_CHUNK_SIZE = 10000
+RECOMMENDATION_MAX_BASKET = 500
+RECOMMENDATION_PAIR_BUDGET = 10 ** 7
+RECOMMENDATION_HISTORY = 50
+RECOMMENDATION_MAX_RESULTS = 50
+
+# Square thumbnails generated for every user image, per size label, in each
+# format and quality. AVATAR_THUMBNAIL_WORKERS processes generate them after
+# the upload is committed, 0 generates them in the request thread.
+AVATAR_THUMBNAIL_SIZES = {'small': 64, 'medium': 256}
+AVATAR_THUMBNAIL_FORMATS = ('WEBP', 'JPEG')
+AVATAR_THUMBNAIL_QUALITY = {'WEBP': 80, 'JPEG': 85}
+AVATAR_THUMBNAIL_WORKERS = 2
+
+# Largest batch accepted by POST /playsessions with a JSON array and the
+# number of rows sent per INSERT when it is stored
+PLAYSESSION_BULK_MAX_SIZE = 1000
+PLAYSESSION_BULK_BATCH_SIZE = 500
+
+# Write-behind mode: POST /playsessions appends the sessions to a local
+# spool and returns 202, and the flush_playsessions command stores them.
+# Requests are rejected with 503 once the spool holds
+# PLAYSESSION_SPOOL_MAX_BYTES.
+PLAYSESSION_WRITE_BEHIND = False
+PLAYSESSION_SPOOL_DIR = '/vol/spool/playsessions'
+PLAYSESSION_SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+# Number of play sessions folded into the rollup tables per transaction
+ROLLUP_BATCH_SIZE = 10000
+
+# Every run recomputes the rollups of the last ROLLUP_RESCAN_DAYS days from
+# the sessions, to count the ones committed out of id order and forget the
+# deleted ones. Older late commits and deletions are not reflected.
+ROLLUP_RESCAN_DAYS = 2
+
+# Unique players per game and day are estimated with HyperLogLog sketches
+# of 2 ** HLL_PRECISION bytes (4KB, about 1.6% standard error)
+HLL_PRECISION = 12
+
+# /games/trending counts play sessions per game in buckets of
+# TRENDING_BUCKET_SECONDS, keeping TRENDING_CAPACITY games per bucket
+# over at most TRENDING_MAX_WINDOW seconds. Sessions stored by other
+# processes are picked up every TRENDING_REFRESH_SECONDS, ids committed up
+# to TRENDING_SAFETY_LAG seconds out of order included.
+TRENDING_BUCKET_SECONDS = 60
+TRENDING_MAX_WINDOW = 24 * 60 * 60
+TRENDING_CAPACITY = 100
+TRENDING_REFRESH_SECONDS = 5
+TRENDING_SAFETY_LAG = 60
+
+# Number of rows read per query by the streamed JSON endpoints
+STREAM_CHUNK_SIZE = 500
+
+# Upper bound for the page_size query parameter of paginated endpoints
+MAX_PAGE_SIZE = 500
+
+# GET /games and /playsessions lists are built from values() rows and one
+# grouped genre query instead of serializer instances. Requests with
+# ?fields= or ?expand= always go through the serializers.
+PROJECTION_READ_PATH = False
+
+# GET /games and /games/{id} are served from an in-memory snapshot of the
+# whole catalog, reloaded when the catalog version changes
+CATALOG_SNAPSHOT = False
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -148,6 +270,21 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = '/vol/web/media'
+
+# Media files are named after their content, so they never change and
+# can be cached by browsers and CDNs for a year
+DEFAULT_FILE_STORAGE = 'common.storage.ContentAddressedStorage'
+MEDIA_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Unreferenced media files younger than this many seconds are kept by
+# the garbage collection, their upload may not be committed yet
+MEDIA_GC_MIN_AGE = 60 * 60
+
+# Uploads are streamed to a temporary file instead of being held in memory
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 STATIC_ROOT = '/vol/web/static'
 
 # Default primary key field type
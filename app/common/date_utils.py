@@ -1,8 +1,11 @@
+import re
 from datetime import date
 
 
 valid_age = 18
 
+duration_units = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
 
 def calculate_age(birthdate):
     """Calculate the user age"""
@@ -25,3 +28,11 @@ def convert_date_str(date):
         return date.strftime("%Y-%m-%d")
     except ValueError:
         raise ValueError("The input is invalid.")
+
+
+def convert_str_duration(duration: str):
+    """Convert a duration like 30m, 1h or 7d to seconds"""
+    match = re.fullmatch(r"(\d+)([smhd])", duration or "")
+    if not match or int(match.group(1)) == 0:
+        raise ValueError("The input is invalid.")
+    return int(match.group(1)) * duration_units[match.group(2)]
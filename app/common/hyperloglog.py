@@ -0,0 +1,60 @@
+import hashlib
+import math
+
+
+class HyperLogLog:
+    """
+    HyperLogLog cardinality sketch with 2 ** precision one byte registers.
+    Sketches of the same precision merge by taking the register maximums,
+    and the relative standard error is 1.04 / sqrt(2 ** precision).
+    """
+
+    def __init__(self, precision=12, registers=None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers or self.size)
+        if len(self.registers) != self.size:
+            raise ValueError("The registers do not match the precision.")
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Load a sketch saved with to_bytes"""
+        return cls(len(data).bit_length() - 1, data)
+
+    def to_bytes(self):
+        """Return the registers of the sketch"""
+        return bytes(self.registers)
+
+    def add(self, value):
+        """Add a value to the sketch"""
+        digest = int.from_bytes(hashlib.blake2b(
+            str(value).encode(), digest_size=8).digest(), 'big')
+        bits = 64 - self.precision
+        index = digest >> bits
+        rank = bits - (digest & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Merge another sketch into this one"""
+        if other.precision != self.precision:
+            raise ValueError("Only sketches of the same precision merge.")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    @property
+    def relative_error(self):
+        """Return the relative standard error of the estimates"""
+        return 1.04 / math.sqrt(self.size)
+
+    def estimate(self):
+        """Return the estimated number of distinct values"""
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        raw = alpha * self.size ** 2 / sum(
+            2.0 ** -register for register in self.registers)
+
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * self.size and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return self.size * math.log(self.size / zeros)
+        return raw
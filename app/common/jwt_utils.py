@@ -1,6 +1,11 @@
+import copy
 import jwt
+import time
 from datetime import datetime, timedelta
-from app.settings import SECRET_KEY
+from app.settings import SECRET_KEY, JWT_CACHE_SIZE, USER_CACHE_SIZE, \
+    USER_CACHE_TTL, ACCESS_TOKEN_LIFETIME
+from common.cache import ExpiringLRUCache
+from common.token_cache import TokenCache
 from rest_framework import exceptions, status
 from rest_framework.response import Response
 from rest_framework.authentication import BaseAuthentication
@@ -8,6 +13,8 @@ from django.contrib.auth import get_user_model
 
 
 class JWTAuthentication(BaseAuthentication):
+    token_cache = TokenCache(JWT_CACHE_SIZE)
+    user_cache = ExpiringLRUCache(USER_CACHE_SIZE)
 
     def authenticate(self, request):
         """Validate if the credentails are valid"""
@@ -19,6 +26,8 @@ class JWTAuthentication(BaseAuthentication):
                 return None
 
         payload = self.__jwt_decode(token)
+        if payload.get('type') == 'refresh':
+            raise exceptions.AuthenticationFailed('unauthenticated')
 
         user = self.__validate_user(payload.get('user_id', None),
                                     payload.get('is_staff', None))
@@ -26,39 +35,86 @@ class JWTAuthentication(BaseAuthentication):
         return (user, None)
 
     @classmethod
-    def generate_jwt(cls, id, is_staff):
-        """Generate a jwt token"""
+    def generate_jwt(cls, id, is_staff, refresh_token=None):
+        """Generate a jwt token and, when given, its refresh token"""
         payload = {
             'user_id': id,
             'is_staff': is_staff,
-            'exp': datetime.utcnow() + timedelta(days=1),
+            'exp': datetime.utcnow() + timedelta(
+                seconds=ACCESS_TOKEN_LIFETIME),
             'iat': datetime.utcnow()
         }
 
         token = jwt.encode(payload, SECRET_KEY, algorithm='HS256')
+        response = cls.__create_jwt_cookie(cls, token)
+
+        if refresh_token:
+            response.data['refresh'] = cls.generate_refresh_jwt(
+                refresh_token)
+
+        return response
+
+    @staticmethod
+    def generate_refresh_jwt(refresh_token):
+        """Generate a jwt for a stored refresh token"""
+        payload = {
+            'jti': str(refresh_token.jti),
+            'type': 'refresh',
+            'exp': refresh_token.expires_at,
+            'iat': datetime.utcnow()
+        }
 
-        return cls.__create_jwt_cookie(cls, token)
+        return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
+
+    @staticmethod
+    def decode_refresh_jwt(token):
+        """Return the refresh token id of a valid refresh jwt or None"""
+        if not token:
+            return None
+
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms='HS256')
+        except jwt.InvalidTokenError:
+            return None
+
+        if payload.get('type') != 'refresh':
+            return None
+
+        return payload.get('jti')
 
     def __jwt_decode(self, token):
         """Decode and validate the token"""
+        payload = self.token_cache.get(token)
+        if payload is not None:
+            return payload
+
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms='HS256')
         except jwt.ExpiredSignatureError:
             raise exceptions.AuthenticationFailed('unauthenticated')
 
+        self.token_cache.set(token, payload)
         return payload
 
     def __validate_user(self, user_id, user_is_staff=False):
         """Validate if the user exists"""
-        try:
-            user = get_user_model().objects.get(
-                pk=user_id,
-                is_staff=user_is_staff
-            )
-        except get_user_model().DoesNotExist:
+        user = self.user_cache.get(user_id)
+        if user is None:
+            try:
+                user = get_user_model().objects.get(pk=user_id)
+            except get_user_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed('User not found')
+            self.user_cache.set(user_id, user, time.time() + USER_CACHE_TTL)
+
+        if user.is_staff != user_is_staff:
             raise exceptions.AuthenticationFailed('User not found')
 
-        return user
+        return copy.copy(user)
+
+    @classmethod
+    def invalidate_user(cls, user_id):
+        """Drop a user from the cache after it changed"""
+        cls.user_cache.delete(user_id)
 
     def __create_jwt_cookie(self, token):
         """Create a cookie with the jwt token"""
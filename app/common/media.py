@@ -0,0 +1,9 @@
+from django.views.static import serve
+from app.settings import MEDIA_CACHE_CONTROL
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """Serve a media file, names are never rewritten with a new content"""
+    response = serve(request, path, document_root, show_indexes)
+    response['Cache-Control'] = MEDIA_CACHE_CONTROL
+    return response
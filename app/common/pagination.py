@@ -0,0 +1,119 @@
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Opaque keyset pagination ordered by primary key.
+    The page is selected with a `WHERE id > cursor` instead of an OFFSET,
+    and no `COUNT(*)` is issued, so every page costs the same.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class PlaySessionCursorPagination(IdCursorPagination):
+    """
+    Keyset pagination ordered by the play session creation time.
+    The cursor holds the whole (creation_time, id) position of the last
+    row, so sessions created at the same instant are paged with
+    `WHERE (creation_time, id) > cursor` instead of an OFFSET.
+    """
+    ordering = ('creation_time', 'id')
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            values = [instance[order.lstrip('-')] for order in ordering]
+        else:
+            values = [getattr(instance, order.lstrip('-'))
+                      for order in ordering]
+        return json.dumps([str(value) for value in values])
+
+    def keyset_filter(self, position, reverse):
+        """Return the filter of the rows following a cursor position"""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or \
+                len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        keyset = Q()
+        equal = Q()
+        for order, value in zip(self.ordering, values):
+            lookup = 'lt' if reverse != order.startswith('-') else 'gt'
+            order_attr = order.lstrip('-')
+            keyset |= equal & Q(**{f'{order_attr}__{lookup}': value})
+            equal &= Q(**{order_attr: value})
+
+        # The bound on the first column alone lets the index seek
+        lookup = 'lte' if reverse != self.ordering[0].startswith('-') \
+            else 'gte'
+        first_attr = self.ordering[0].lstrip('-')
+        return Q(**{f'{first_attr}__{lookup}': values[0]}) & keyset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(
+                    self.keyset_filter(current_position, reverse))
+            except (ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Positions are unique, so the offset is only set by the cursors
+        # of a page that had no position yet
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
@@ -0,0 +1,177 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def parse_selection(value):
+    """
+    Convert a `?fields=` or `?expand=` value like "name,game.name" to a
+    tree like {"name": {}, "game": {"name": {}}}. None means no selection.
+    """
+    if value is None:
+        return None
+
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for name in path.strip().split("."):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def is_nested_serializer(field):
+    """Check if a field renders a nested sparse serializer"""
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    return isinstance(field, SparseFieldsMixin)
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin that only renders the fields selected with `fields`
+    and renders the nested serializers not selected with `expand` as
+    primary keys. Both are trees built by parse_selection, None keeps
+    every field and expands every nested serializer.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.selected_fields = fields
+        self.expanded_fields = expand
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        if self.selected_fields is not None:
+            unknown = set(self.selected_fields) - set(fields)
+            if unknown:
+                msg = f"Unknown fields: {', '.join(sorted(unknown))}"
+                raise serializers.ValidationError({"fields": msg})
+            fields = {name: field for name, field in fields.items()
+                      if name in self.selected_fields}
+
+        for name, field in fields.items():
+            if not is_nested_serializer(field):
+                continue
+
+            if (
+                self.expanded_fields is not None
+                and name not in self.expanded_fields
+            ):
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    source=field.source, read_only=True,
+                    many=isinstance(field, serializers.ListSerializer))
+                continue
+
+            nested = getattr(field, "child", field)
+            nested.selected_fields = self.__subtree(self.selected_fields,
+                                                    name)
+            nested.expanded_fields = self.__subtree(self.expanded_fields,
+                                                    name)
+
+        return fields
+
+    @staticmethod
+    def __subtree(tree, name):
+        """Return the selection of a nested serializer, None for all"""
+        if not tree or not tree.get(name):
+            return None
+        return tree[name]
+
+
+def queryset_plan(serializer, prefix=""):
+    """
+    Return the only(), select_related() and prefetch_related() lookups
+    needed to render a model serializer. The only() lookups are None when
+    a field does not map to a model field.
+    """
+    model = serializer.Meta.model
+    only, select, prefetch = [], [], []
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            only = None
+            continue
+
+        path = prefix + field.source
+        nested = getattr(field, "child", field)
+        if not isinstance(nested, serializers.ModelSerializer):
+            nested = None
+
+        if model_field.many_to_many or model_field.one_to_many:
+            related = model_field.related_model.objects.all()
+            if nested:
+                related = optimize_queryset(related, nested)
+            else:
+                related = related.only("pk")
+            prefetch.append(Prefetch(path, queryset=related))
+        elif model_field.is_relation and nested:
+            sub_only, sub_select, sub_prefetch = queryset_plan(
+                nested, path + "__")
+            select += [path] + sub_select
+            prefetch += sub_prefetch
+            if only is not None:
+                only = None if sub_only is None else only + [path] + sub_only
+        elif only is not None:
+            # Fields can render more columns than their source
+            only += [path] + [prefix + column for column in
+                              getattr(field, "extra_sources", ())]
+
+    return only, select, prefetch
+
+
+def optimize_queryset(queryset, serializer, extra_fields=()):
+    """Only fetch the columns and relations a serializer renders"""
+    only, select, prefetch = queryset_plan(serializer)
+
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if only is not None:
+        queryset = queryset.only(*only, *extra_fields)
+    return queryset
+
+
+class SparseFieldsViewMixin:
+    """
+    Viewset mixin applying `?fields=` and `?expand=` to the list and
+    retrieve actions, down to the columns and joins of the queryset
+    """
+    sparse_actions = ("list", "retrieve")
+
+    def is_sparse_action(self):
+        return self.action in self.sparse_actions
+
+    def has_sparse_selection(self):
+        """Check if the request selects fields or expansions"""
+        params = self.request.query_params
+        return "fields" in params or "expand" in params
+
+    def get_serializer(self, *args, **kwargs):
+        if self.is_sparse_action():
+            params = self.request.query_params
+            kwargs.setdefault("fields", parse_selection(params.get("fields")))
+            kwargs.setdefault("expand", parse_selection(params.get("expand")))
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.is_sparse_action():
+            return queryset
+
+        # The paginator reads the ordering fields to build its cursors
+        ordering = getattr(self.paginator, "ordering", None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+
+        return optimize_queryset(
+            queryset, self.get_serializer(),
+            [field.lstrip("-") for field in ordering])
@@ -0,0 +1,50 @@
+import hashlib
+import os
+import tempfile
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage naming every file after the SHA-256 of its
+    content, in the directory of the requested name and with its
+    extension. Identical uploads are stored once and a name is never
+    rewritten with another content, so its URL can be cached forever.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The name is replaced by the content hash in _save
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+
+        # Hash and copy the content in one pass, to a temporary file of
+        # the same file system that is then linked to its final name
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=full_directory, suffix='.tmp',
+                                         delete=False) as tmp:
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            for chunk in content.chunks():
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        hexdigest = digest.hexdigest()
+        name = os.path.join(directory, hexdigest[:2], hexdigest + extension)
+        path = self.path(name)
+        try:
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp.name, self.file_permissions_mode)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.link(tmp.name, path)
+        except FileExistsError:
+            # Same content, refresh its age for the garbage collection
+            os.utime(path)
+        finally:
+            os.remove(tmp.name)
+
+        return name.replace('\\', '/')
@@ -0,0 +1,37 @@
+from itertools import islice
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from common.renderers import ORJSONRenderer
+
+
+def iterate_chunks(queryset, chunk_size, *prefetch_lookups):
+    """
+    Yield a queryset in lists of chunk_size objects read with iterator().
+    iterator() ignores prefetch_related, so the lookups are prefetched
+    for every chunk instead.
+    """
+    objects = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(objects, chunk_size))
+        if not chunk:
+            return
+        prefetch_related_objects(chunk, *prefetch_lookups)
+        yield chunk
+
+
+def stream_json_list(serializer_class, chunks, **serializer_kwargs):
+    """Return a response streaming the serialized chunks as a JSON list"""
+    renderer = ORJSONRenderer()
+
+    def generate():
+        separator = b'['
+        for chunk in chunks:
+            data = serializer_class(chunk, many=True,
+                                    **serializer_kwargs).data
+            for item in data:
+                yield separator + renderer.render(item)
+                separator = b','
+        yield b'[]' if separator == b'[' else b']'
+
+    return StreamingHttpResponse(generate(),
+                                 content_type='application/json')
@@ -0,0 +1,42 @@
+from common.hyperloglog import HyperLogLog
+from django.test import SimpleTestCase
+
+
+class HyperLogLogTests(SimpleTestCase):
+    """Test the HyperLogLog sketch"""
+
+    def test_estimate_small_cardinality(self):
+        """Small cardinalities are counted almost exactly"""
+        hll = HyperLogLog()
+        for value in list(range(100)) * 3:
+            hll.add(value)
+
+        self.assertAlmostEqual(hll.estimate(), 100, delta=3)
+
+    def test_estimate_large_cardinality(self):
+        """Large cardinalities are within a few standard errors"""
+        hll = HyperLogLog()
+        for value in range(50000):
+            hll.add(value)
+
+        self.assertAlmostEqual(hll.estimate(), 50000,
+                               delta=50000 * 4 * hll.relative_error)
+
+    def test_merge(self):
+        """Merged sketches estimate the union"""
+        hll1 = HyperLogLog()
+        hll2 = HyperLogLog()
+        for value in range(1000):
+            hll1.add(value)
+            hll2.add(value + 500)
+
+        hll1.merge(HyperLogLog.from_bytes(hll2.to_bytes()))
+
+        self.assertAlmostEqual(hll1.estimate(), 1500,
+                               delta=1500 * 4 * hll1.relative_error)
+        self.assertEqual(len(hll1.to_bytes()), 4096)
+
+    def test_merge_different_precision(self):
+        """Sketches of different precision do not merge"""
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
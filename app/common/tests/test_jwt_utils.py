@@ -0,0 +1,116 @@
+import time
+from unittest.mock import patch
+from common.date_utils import convert_str_date
+from common.jwt_utils import JWTAuthentication
+from common.tests.utils import create_user
+from common.token_cache import TokenCache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+
+PLAY_SESSION_URL = reverse("game:playsession-list")
+BIRTHDATE = convert_str_date("1987-09-10")
+
+
+class TokenCacheTests(TestCase):
+    """Test the verified token cache"""
+
+    def test_get_missing_token(self):
+        """Unknown tokens are a miss"""
+        cache = TokenCache(2)
+
+        self.assertIsNone(cache.get("token"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_get_cached_token(self):
+        """Cached tokens are a hit"""
+        cache = TokenCache(2)
+        payload = {"user_id": 1, "exp": time.time() + 60}
+        cache.set("token", payload)
+
+        self.assertEqual(cache.get("token"), payload)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_expired_token_is_evicted(self):
+        """Tokens past their exp claim are dropped"""
+        cache = TokenCache(2)
+        cache.set("token", {"user_id": 1, "exp": time.time() - 1})
+
+        self.assertIsNone(cache.get("token"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        """The cache never grows past its max size"""
+        cache = TokenCache(2)
+        exp = time.time() + 60
+        cache.set("token1", {"user_id": 1, "exp": exp})
+        cache.set("token2", {"user_id": 2, "exp": exp})
+        cache.get("token1")
+        cache.set("token3", {"user_id": 3, "exp": exp})
+
+        self.assertIsNotNone(cache.get("token1"))
+        self.assertIsNone(cache.get("token2"))
+        self.assertEqual(cache.stats()["size"], 2)
+
+
+class JWTAuthenticationCacheTests(TestCase):
+    """Test that JWTAuthentication reuses verified tokens"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            get_user_model().objects.create_user,
+            email="nuno@b.com",
+            password="12345",
+            username="nuno",
+            birthdate=BIRTHDATE,
+        )
+        JWTAuthentication.token_cache.clear()
+        JWTAuthentication.user_cache.clear()
+        self.token = JWTAuthentication.generate_jwt(
+            self.user.id, self.user.is_staff).data["token"]
+
+    def test_cached_token_skips_verification(self):
+        """A second request with the same token skips jwt.decode"""
+        res = self.client.get(PLAY_SESSION_URL, HTTP_TOKEN=self.token)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with patch("common.jwt_utils.jwt.decode") as decode:
+            res = self.client.get(PLAY_SESSION_URL, HTTP_TOKEN=self.token)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        decode.assert_not_called()
+        stats = JWTAuthentication.token_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_cached_user_skips_query(self):
+        """A second request with the same user does not query it"""
+        self.client.get(PLAY_SESSION_URL, HTTP_TOKEN=self.token)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(PLAY_SESSION_URL, HTTP_TOKEN=self.token)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(JWTAuthentication.user_cache.stats()["hits"], 1)
+
+    def test_saved_user_is_invalidated(self):
+        """Saving a user drops it from the cache"""
+        self.client.get(PLAY_SESSION_URL, HTTP_TOKEN=self.token)
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.client.get(PLAY_SESSION_URL, HTTP_TOKEN=self.token)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deleted_user_is_invalidated(self):
+        """Deleting a user drops it from the cache"""
+        self.client.get(PLAY_SESSION_URL, HTTP_TOKEN=self.token)
+        self.user.delete()
+
+        res = self.client.get(PLAY_SESSION_URL, HTTP_TOKEN=self.token)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,84 @@
+import uuid
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import BytesIO
+from common.parsers import ORJSONParser
+from common.renderers import ORJSONRenderer
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+
+class CompactJSONRenderer(JSONRenderer):
+    compact = True
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Test the orjson renderer renders like the DRF renderer"""
+
+    def assertRendersLikeDRF(self, data, accepted_media_type=None):
+        self.assertEqual(
+            ORJSONRenderer().render(data, accepted_media_type),
+            CompactJSONRenderer().render(data, accepted_media_type))
+
+    def test_render_serializer_values(self):
+        """The values our serializers emit render the same"""
+        self.assertRendersLikeDRF(ReturnDict({
+            "creation_time": datetime(2021, 3, 4, 5, 6, 7, 891011,
+                                      tzinfo=timezone.utc),
+            "naive": datetime(2021, 3, 4, 5, 6, 7),
+            "birthdate": date(1987, 9, 10),
+            "time": time(5, 6, 7),
+            "duration": timedelta(minutes=90),
+            "price": Decimal("9.99"),
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "message": gettext_lazy("This field is required."),
+            "results": ReturnList([{"name": "Jogo é", 1: None}],
+                                  serializer=None),
+        }, serializer=None))
+
+    def test_render_none(self):
+        """No data renders an empty body"""
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_render_line_separators(self):
+        """Line separators are escaped for javascript"""
+        self.assertRendersLikeDRF({"name": "a\u2028b\u2029c"})
+
+    def test_render_indent(self):
+        """An indent in the accepted media type pretty prints"""
+        ret = ORJSONRenderer().render({"name": "Game1"},
+                                      "application/json; indent=4")
+
+        self.assertEqual(ret, b'{\n  "name": "Game1"\n}')
+
+
+class ORJSONParserTests(SimpleTestCase):
+    """Test the orjson parser"""
+
+    def test_parse(self):
+        """A JSON body is parsed"""
+        data = ORJSONParser().parse(BytesIO(b'[{"game": 1}, {"game": 2}]'))
+
+        self.assertEqual(data, [{"game": 1}, {"game": 2}])
+
+    def test_parse_encoding(self):
+        """A body in another encoding is decoded first"""
+        data = ORJSONParser().parse(
+            BytesIO('{"name": "Jogo é"}'.encode("latin-1")),
+            parser_context={"encoding": "latin-1"})
+
+        self.assertEqual(data, {"name": "Jogo é"})
+
+    def test_parse_error(self):
+        """A malformed body raises a parse error"""
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"game": '))
+
+    def test_parse_nan(self):
+        """Non standard constants are rejected like the strict parser"""
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"game": NaN}'))
@@ -0,0 +1,69 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from common.media import serve_media
+from common.storage import ContentAddressedStorage
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, RequestFactory
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    """Test the storage naming files after their content"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.storage = ContentAddressedStorage(location=self.directory,
+                                               file_permissions_mode=0o644)
+
+    def test_name_is_content_hash(self):
+        """Files are named after the hash of their content"""
+        digest = hashlib.sha256(b"avatar").hexdigest()
+
+        name = self.storage.save("uploads/user/image.JPG",
+                                 ContentFile(b"avatar"))
+
+        self.assertEqual(name, f"uploads/user/{digest[:2]}/{digest}.jpg")
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b"avatar")
+        self.assertEqual(os.stat(self.storage.path(name)).st_mode & 0o777,
+                         0o644)
+
+    def test_identical_content_is_stored_once(self):
+        """Identical uploads share one file, others get their own"""
+        first = self.storage.save("uploads/user/image.jpg",
+                                  SimpleUploadedFile("a.jpg", b"avatar"))
+        os.utime(self.storage.path(first), (0, 0))
+        second = self.storage.save("uploads/user/image.jpg",
+                                   ContentFile(b"avatar"))
+        other = self.storage.save("uploads/user/image.jpg",
+                                  ContentFile(b"other"))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        # Saving it again refreshes the age of the shared file
+        self.assertGreater(os.path.getmtime(self.storage.path(first)), 0)
+        stored = [name for _, _, files in os.walk(self.directory)
+                  for name in files]
+        self.assertEqual(sorted(stored), sorted(
+            [os.path.basename(first), os.path.basename(other)]))
+
+
+class ServeMediaTests(SimpleTestCase):
+    """Test the media files are cached forever"""
+
+    def test_cache_control(self):
+        """Media responses are public and immutable"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, "a.jpg"), "wb") as media_file:
+            media_file.write(b"avatar")
+
+        response = serve_media(RequestFactory().get("/media/a.jpg"),
+                               "a.jpg", document_root=directory)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"],
+                         "public, max-age=31536000, immutable")
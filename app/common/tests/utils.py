@@ -1,3 +1,6 @@
+import json
+import re
+from django.db import connection
 from game.models import Game, Genre
 from common.date_utils import convert_date_str
 
@@ -35,6 +38,7 @@ def create_expected_data_user(user_db) -> dict:
             "username": user_db.username,
             "birthdate": convert_date_str(user_db.birthdate),
             "image": None,
+            "thumbnails": None,
         }
 
 
@@ -53,3 +57,44 @@ def create_expected_data_list(play_session, user, *created_data):
                 expected_data = expected_data_tmp
             expected_data_list.append(expected_data)
         return expected_data_list
+
+
+def _mysql_plan_problems(node):
+    """Walk a MySQL json plan looking for full scans and filesorts"""
+    problems = []
+    if isinstance(node, dict):
+        if node.get("access_type") == "ALL":
+            problems.append(f"full scan on {node.get('table_name')}")
+        if node.get("using_filesort"):
+            problems.append("filesort")
+        for value in node.values():
+            problems += _mysql_plan_problems(value)
+    elif isinstance(node, list):
+        for value in node:
+            problems += _mysql_plan_problems(value)
+    return problems
+
+
+def _sqlite_plan_problems(plan):
+    """Look for full scans and temporary sorts in a SQLite plan"""
+    problems = [
+        f"full scan on {table}" for table in re.findall(
+            r"SCAN (?:TABLE )?(\w+)\s*$", plan, re.MULTILINE)
+    ]
+    if "USE TEMP B-TREE" in plan:
+        problems.append("filesort")
+    return problems
+
+
+def assert_indexed_query(test_case, queryset):
+    """Fail if the query plan falls back to a full scan or filesort"""
+    if connection.vendor == "mysql":
+        plan = queryset.explain(format="json")
+        problems = _mysql_plan_problems(json.loads(plan))
+    elif connection.vendor == "sqlite":
+        plan = queryset.explain()
+        problems = _sqlite_plan_problems(plan)
+    else:
+        test_case.skipTest(f"No plan checks for {connection.vendor}")
+
+    test_case.assertFalse(problems, f"{problems}\n{plan}")
@@ -0,0 +1,25 @@
+import hashlib
+from common.cache import ExpiringLRUCache
+
+
+class TokenCache(ExpiringLRUCache):
+    """
+    Bounded LRU of verified token payloads keyed by the token digest.
+    Entries are dropped once the token `exp` claim has passed, so a hit
+    can safely skip the signature verification.
+    """
+
+    @staticmethod
+    def __digest(token):
+        """Return the cache key of a token"""
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        """Return the cached payload of a token or None"""
+        return super().get(self.__digest(token))
+
+    def set(self, token, payload):
+        """Cache the payload of a verified token until it expires"""
+        expires_at = payload.get('exp')
+        if expires_at:
+            super().set(self.__digest(token), payload, expires_at)
@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+import numpy as np
+from django.db.models import Q
+
+
+SECONDS_PER_DAY = 24 * 60 * 60
+NO_DAY = np.iinfo(np.int64).max
+EPOCH = date(1970, 1, 1)
+# 1970-01-01 is a Thursday, shifting by 3 days starts the weeks on Monday
+WEEK_SHIFT = 3
+
+
+def stream_sessions(queryset, chunk_size):
+    """
+    Yield the (user ids, UTC epoch days) of play sessions as NumPy arrays,
+    in creation time order. Chunks are read with a keyset on the
+    (creation_time, id) index, so memory stays bounded whatever the
+    database driver buffers.
+    """
+    queryset = queryset.order_by('creation_time', 'id').values_list(
+        'id', 'user_id', 'creation_time')
+    after = Q()
+    while True:
+        rows = list(queryset.filter(after)[:chunk_size])
+        if not rows:
+            return
+
+        users = np.fromiter((row[1] for row in rows), dtype=np.int64,
+                            count=len(rows))
+        seconds = np.fromiter((row[2].timestamp() for row in rows),
+                              dtype=np.float64, count=len(rows))
+        yield users, (seconds // SECONDS_PER_DAY).astype(np.int64)
+
+        last_id, _, last_time = rows[-1]
+        after = Q(creation_time__gt=last_time) | Q(creation_time=last_time,
+                                                   id__gt=last_id)
+
+
+class RetentionAccumulator:
+    """
+    Fold chunks of sessions, in time order, into the first play day of
+    every user and a bitmask of the day offsets they came back on.
+    Memory is two integers per user id, whatever the number of sessions.
+    """
+
+    def __init__(self, max_days):
+        if not 0 <= max_days < 64:
+            raise ValueError("The retention is limited to 63 days.")
+        self.max_days = max_days
+        self.first_day = np.empty(0, dtype=np.int64)
+        self.active = np.empty(0, dtype=np.uint64)
+
+    def __grow(self, size):
+        """Make room for user ids lower than size"""
+        if size <= len(self.first_day):
+            return
+
+        size = max(size, 2 * len(self.first_day))
+        first_day = np.full(size, NO_DAY, dtype=np.int64)
+        first_day[:len(self.first_day)] = self.first_day
+        active = np.zeros(size, dtype=np.uint64)
+        active[:len(self.active)] = self.active
+        self.first_day, self.active = first_day, active
+
+    def add(self, users, days):
+        """Fold a chunk of sessions newer than the previous ones"""
+        self.__grow(int(users.max()) + 1)
+        np.minimum.at(self.first_day, users, days)
+
+        offsets = days - self.first_day[users]
+        keep = offsets <= self.max_days
+        np.bitwise_or.at(
+            self.active,
+            users[keep],
+            np.left_shift(np.uint64(1), offsets[keep].astype(np.uint64)),
+        )
+
+    def retention(self, period=1):
+        """
+        Return the first day of every cohort of `period` days, the number
+        of users of each cohort and the matrix of users that played
+        0..max_days days after their first session
+        """
+        seen = self.first_day != NO_DAY
+        cohorts, cohort_index = np.unique(
+            (self.first_day[seen] + WEEK_SHIFT) // period,
+            return_inverse=True)
+        active = self.active[seen]
+
+        sizes = np.bincount(cohort_index, minlength=len(cohorts))
+        retained = np.empty((len(cohorts), self.max_days + 1),
+                            dtype=np.int64)
+        for day in range(self.max_days + 1):
+            played = (active >> np.uint64(day)) & np.uint64(1)
+            retained[:, day] = np.bincount(
+                cohort_index, weights=played, minlength=len(cohorts))
+
+        return cohorts * period - WEEK_SHIFT, sizes, retained
+
+
+def cohort_retention(queryset, max_days=30, period=1, chunk_size=100000):
+    """
+    Compute the day-N retention of the users of a play session queryset,
+    grouped in cohorts by the period of their first session
+    """
+    accumulator = RetentionAccumulator(max_days)
+    for users, days in stream_sessions(queryset, chunk_size):
+        accumulator.add(users, days)
+
+    cohorts, sizes, retained = accumulator.retention(period)
+    rates = retained / np.maximum(sizes, 1)[:, np.newaxis]
+
+    return [
+        {
+            'cohort': EPOCH + timedelta(days=int(cohort)),
+            'users': int(size),
+            'retention': [round(float(rate), 4) for rate in cohort_rates],
+        }
+        for cohort, size, cohort_rates in zip(cohorts, sizes, rates)
+    ]
@@ -0,0 +1,87 @@
+import functools
+import hashlib
+import threading
+import time
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from app.settings import CATALOG_VERSION_TTL
+from game.models import CatalogVersion
+
+
+class CatalogVersionCache:
+    """
+    In-process copy of the catalog version, read from the database at
+    most every `ttl` seconds. Changes made by this process expire it
+    right away, other processes see them within `ttl` seconds.
+    """
+    row_id = 1
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.expire()
+
+    def expire(self):
+        """Read the version from the database on the next get"""
+        self._value = None
+        self._read_at = None
+
+    def get(self):
+        """Return the (version, last change time) of the catalog"""
+        with self._lock:
+            if (
+                self._value is None
+                or time.monotonic() - self._read_at >= self.ttl
+            ):
+                self._value = CatalogVersion.objects.filter(
+                    pk=self.row_id
+                ).values_list('version', 'updated_at').first() or (0, None)
+                self._read_at = time.monotonic()
+            return self._value
+
+    def bump(self):
+        """Record a change of the catalog"""
+        updated = CatalogVersion.objects.filter(pk=self.row_id).update(
+            version=F('version') + 1, updated_at=timezone.now())
+        if not updated:
+            CatalogVersion.objects.get_or_create(pk=self.row_id,
+                                                 defaults={'version': 1})
+        self.expire()
+
+
+def catalog_etag(version, request):
+    """Return the strong ETag of a catalog response"""
+    key = f'{version}:{request.accepted_media_type}:{request.get_full_path()}'
+    return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+
+def conditional_catalog_view(view_method):
+    """
+    Add an ETag and Last-Modified derived from the catalog version to a
+    viewset action, and answer 304 without running it when the client
+    already has the current version
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        version, updated_at = catalog_version.get()
+        etag = catalog_etag(version, request)
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return response
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    return wrapper
+
+
+catalog_version = CatalogVersionCache(CATALOG_VERSION_TTL)
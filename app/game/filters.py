@@ -0,0 +1,30 @@
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+from game.genre_index import genre_index, GenreIndex
+
+
+class GenreFilterBackend(BaseFilterBackend):
+    """
+    Filter the game list with `?genre=<id>[,<id>...]`, keeping the games
+    of any of the genres, or of all of them with `?genre_match=all`
+    """
+    match_choices = ('any', 'all')
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get('genre')
+        if view.action != 'list' or value is None:
+            return queryset
+
+        try:
+            genre_ids = [int(genre_id) for genre_id in value.split(',')]
+        except ValueError:
+            raise serializers.ValidationError(
+                {'genre': 'Expected a comma separated list of genre ids.'})
+
+        match = request.query_params.get('genre_match', 'any')
+        if match not in self.match_choices:
+            msg = f'Expected one of {", ".join(self.match_choices)}.'
+            raise serializers.ValidationError({'genre_match': msg})
+
+        bitmap = genre_index.get().match(genre_ids, match == 'all')
+        return queryset.filter(id__in=GenreIndex.game_ids(bitmap))
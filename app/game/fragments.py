@@ -0,0 +1,61 @@
+import threading
+import time
+from app.settings import GAME_FRAGMENT_CACHE_SIZE, GAME_FRAGMENT_CACHE_TTL
+from common.cache import ExpiringLRUCache
+from game.catalog import catalog_version
+
+
+def copy_fragment(value):
+    """Copy the dicts and lists of a fragment, callers may change them"""
+    if isinstance(value, dict):
+        return {key: copy_fragment(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_fragment(item) for item in value]
+    return value
+
+
+class GameFragmentCache(ExpiringLRUCache):
+    """
+    Bounded LRU of serialized games keyed by the catalog version, the
+    game id and a local version stamp. Changes made by other processes
+    bump the shared catalog version, so they are seen as soon as the
+    catalog ETag changes. Invalidating a game bumps its local version,
+    so a fragment rendered from the old data while the game was changing
+    is stored under a key that is never read again. Fragments are copied
+    on the way out, the cached ones are never shared.
+    """
+
+    def __init__(self, max_size, ttl):
+        super().__init__(max_size)
+        self.ttl = ttl
+        self._epoch = 0
+        self._versions = {}
+        self._versions_lock = threading.Lock()
+
+    def __key(self, game_id):
+        return (catalog_version.get()[0], self._epoch, game_id,
+                self._versions.get(game_id, 0))
+
+    def render(self, game, render):
+        """Return the cached fragment of a game, rendering it on a miss"""
+        key = self.__key(game.pk)
+        fragment = self.get(key)
+        if fragment is None:
+            fragment = copy_fragment(render(game))
+            self.set(key, fragment, time.time() + self.ttl)
+        return copy_fragment(fragment)
+
+    def invalidate(self, game_id):
+        """Stop serving the cached fragment of a game"""
+        with self._versions_lock:
+            self._versions[game_id] = self._versions.get(game_id, 0) + 1
+
+    def invalidate_all(self):
+        """Stop serving every cached fragment"""
+        with self._versions_lock:
+            self._epoch += 1
+            self._versions = {}
+
+
+game_fragments = GameFragmentCache(GAME_FRAGMENT_CACHE_SIZE,
+                                   GAME_FRAGMENT_CACHE_TTL)
@@ -0,0 +1,75 @@
+import threading
+import numpy as np
+from game.catalog import catalog_version
+from game.models import Game
+
+
+class GenreIndex:
+    """
+    Bitmap index of the games of every genre. Each genre maps to a
+    Python int with the bit of every game id of the genre set, so a
+    multi genre query is a few bitwise operations.
+    """
+
+    def __init__(self, version, pairs):
+        self.version = version
+        pairs = list(pairs)
+        size = (max((game_id for _, game_id in pairs), default=0) >> 3) + 1
+
+        bitmaps = {}
+        for genre_id, game_id in pairs:
+            bitmap = bitmaps.get(genre_id)
+            if bitmap is None:
+                bitmap = bitmaps[genre_id] = bytearray(size)
+            bitmap[game_id >> 3] |= 1 << (game_id & 7)
+
+        self.bitmaps = {genre_id: int.from_bytes(bitmap, 'little')
+                        for genre_id, bitmap in bitmaps.items()}
+
+    @classmethod
+    def load(cls, version):
+        """Read the game genre pairs from the through table"""
+        return cls(version, Game.genre.through.objects.values_list(
+            'genre_id', 'game_id').iterator())
+
+    def match(self, genre_ids, match_all=False):
+        """Return the bitmap of the games of any or all of the genres"""
+        bitmaps = [self.bitmaps.get(genre_id, 0) for genre_id in genre_ids]
+        if not bitmaps:
+            return 0
+
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            result = result & bitmap if match_all else result | bitmap
+        return result
+
+    @staticmethod
+    def game_ids(bitmap):
+        """Return the sorted game ids of a bitmap"""
+        data = np.frombuffer(
+            bitmap.to_bytes((bitmap.bit_length() + 7) >> 3, 'little'),
+            dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(data, bitorder='little')).tolist()
+
+
+class GenreIndexCache:
+    """Holder of the genre index, rebuilt when the catalog changes"""
+
+    def __init__(self):
+        self._index = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the index of the current catalog version"""
+        version = catalog_version.get()
+        index = self._index
+        if index is not None and index.version == version:
+            return index
+
+        with self._lock:
+            if self._index is None or self._index.version != version:
+                self._index = GenreIndex.load(version)
+            return self._index
+
+
+genre_index = GenreIndexCache()
@@ -0,0 +1,80 @@
+import timeit
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from common.parsers import ORJSONParser
+from common.renderers import ORJSONRenderer
+
+
+def game_payload(rows):
+    """Build a /games page of `rows` games"""
+    return [
+        {
+            'name': f'Game {i}',
+            'genre': [{'id': j, 'name': f'Genre {j}'} for j in range(i % 4)],
+        }
+        for i in range(rows)
+    ]
+
+
+def play_session_payload(rows):
+    """Build a /playsessions page of `rows` play sessions"""
+    start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    birthdate_field = serializers.DateField()
+    creation_time_field = serializers.DateTimeField()
+    return [
+        {
+            'user': {
+                'id': i % 1000,
+                'email': f'user{i % 1000}@example.com',
+                'username': f'user{i % 1000}',
+                'birthdate': birthdate_field.to_representation(
+                    date(1980, 1, 1) + timedelta(days=i % 5000)),
+                'image': None,
+                'thumbnails': None,
+            },
+            'game': game,
+            'creation_time': creation_time_field.to_representation(
+                start + timedelta(seconds=i)),
+        }
+        for i, game in enumerate(game_payload(rows))
+    ]
+
+
+class Command(BaseCommand):
+    """Django Command to compare the JSON renderers and parsers"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=10000,
+            help='Number of objects per payload')
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Number of timed runs, the best one is kept')
+
+    def handle(self, *args, **options):
+        payloads = {
+            'games': game_payload(options['rows']),
+            'playsessions': play_session_payload(options['rows']),
+        }
+
+        for name, payload in payloads.items():
+            self.stdout.write(f'/{name} ({options["rows"]} objects)')
+            for label, renderer, parser in (
+                ('default', JSONRenderer(), JSONParser()),
+                ('orjson', ORJSONRenderer(), ORJSONParser()),
+            ):
+                body = renderer.render(payload)
+                render = min(timeit.repeat(
+                    lambda: renderer.render(payload),
+                    number=1, repeat=options['repeat']))
+                parse = min(timeit.repeat(
+                    lambda: parser.parse(BytesIO(body)),
+                    number=1, repeat=options['repeat']))
+                self.stdout.write(
+                    f'  {label:8} render {render * 1000:8.2f}ms  '
+                    f'parse {parse * 1000:8.2f}ms  {len(body)} bytes')
@@ -0,0 +1,63 @@
+import csv
+import json
+from django.core.management.base import BaseCommand, CommandError
+from common.date_utils import convert_date_str
+from game.analytics import cohort_retention
+from game.models import PlaySession
+
+
+PERIODS = {'day': 1, 'week': 7}
+
+
+class Command(BaseCommand):
+    """Django Command to compute the retention of the player cohorts"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=30,
+            help='Last day N of the day-N retention (at most 63)')
+        parser.add_argument(
+            '--period', choices=PERIODS, default='day',
+            help='Group the players by the day or week of their first play')
+        parser.add_argument(
+            '--game', type=int,
+            help='Only use the play sessions of this game')
+        parser.add_argument(
+            '--format', choices=('csv', 'json'), default='csv')
+        parser.add_argument(
+            '--output', help='File to write instead of the standard output')
+        parser.add_argument(
+            '--chunk-size', type=int, default=100000,
+            help='Number of play sessions read per query')
+
+    def handle(self, *args, **options):
+        queryset = PlaySession.objects.all()
+        if options['game']:
+            queryset = queryset.filter(game_id=options['game'])
+
+        try:
+            cohorts = cohort_retention(queryset, options['days'],
+                                       PERIODS[options['period']],
+                                       options['chunk_size'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                self.__write(output, cohorts, options)
+        else:
+            self.__write(self.stdout, cohorts, options)
+
+    def __write(self, output, cohorts, options):
+        """Write the cohorts as CSV or JSON"""
+        if options['format'] == 'json':
+            json.dump([{**cohort, 'cohort': convert_date_str(
+                cohort['cohort'])} for cohort in cohorts], output)
+            return
+
+        writer = csv.writer(output)
+        writer.writerow(['cohort', 'users'] + [
+            f'day_{day}' for day in range(options['days'] + 1)])
+        for cohort in cohorts:
+            writer.writerow([convert_date_str(cohort['cohort']),
+                             cohort['users']] + cohort['retention'])
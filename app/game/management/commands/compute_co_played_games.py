@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from app.settings import RECOMMENDATION_TOP_N, RECOMMENDATION_CHUNK_SIZE, \
+    RECOMMENDATION_MAX_BASKET, RECOMMENDATION_PAIR_BUDGET
+from game.recommendations import refresh_co_plays
+
+
+class Command(BaseCommand):
+    """Django Command to precompute the games played together"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-n', type=int, default=RECOMMENDATION_TOP_N,
+            help='Number of co-played games kept per game')
+        parser.add_argument(
+            '--chunk-size', type=int, default=RECOMMENDATION_CHUNK_SIZE,
+            help='Number of users read per query')
+        parser.add_argument(
+            '--max-basket', type=int, default=RECOMMENDATION_MAX_BASKET,
+            help='Leave out the users who played more games than this')
+        parser.add_argument(
+            '--partitions', type=int, default=1,
+            help='Split the pair counts in this many passes to save memory')
+        parser.add_argument(
+            '--pair-budget', type=int, default=RECOMMENDATION_PAIR_BUDGET,
+            help='Largest number of game pairs expanded at once')
+
+    def handle(self, *args, **options):
+        stored = refresh_co_plays(options['top_n'], options['chunk_size'],
+                                  options['max_basket'],
+                                  options['partitions'],
+                                  options['pair_budget'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{stored} co-played games stored!'))
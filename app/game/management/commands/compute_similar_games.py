@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from app.settings import SIMILAR_GAMES_K, SIMILARITY_BLOCK_SIZE
+from game.similarity import refresh_game_neighbours, METRICS
+
+
+class Command(BaseCommand):
+    """Django Command to precompute the most similar games by genres"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--k', type=int, default=SIMILAR_GAMES_K,
+            help='Number of neighbours kept per game')
+        parser.add_argument(
+            '--block-size', type=int, default=SIMILARITY_BLOCK_SIZE,
+            help='Number of games compared with the catalog at a time')
+        parser.add_argument(
+            '--metric', choices=METRICS, default='jaccard')
+
+    def handle(self, *args, **options):
+        stored = refresh_game_neighbours(options['k'],
+                                         options['block_size'],
+                                         options['metric'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{stored} game neighbours stored!'))
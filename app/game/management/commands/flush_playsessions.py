@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from app.settings import PLAYSESSION_BULK_BATCH_SIZE
+from game.spool import playsession_spool
+
+
+class Command(BaseCommand):
+    """Django Command to store the play sessions queued in the spool"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=PLAYSESSION_BULK_BATCH_SIZE,
+            help='Number of play sessions inserted per query')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep flushing the spool until interrupted')
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Seconds to wait between flushes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            stats = playsession_spool.flush(options['batch_size'])
+            self.stdout.write(
+                f"Flushed {stats['last_flush_events']} play sessions in "
+                f"{stats['last_flush_seconds']:.3f}s, "
+                f"{playsession_spool.depth()} pending")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from app.settings import ROLLUP_BATCH_SIZE, ROLLUP_RESCAN_DAYS
+from game.rollups import materialize_game_play_daily, \
+    materialize_game_player_sketches
+
+
+class Command(BaseCommand):
+    """Django Command to fold new play sessions into the rollup tables"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=ROLLUP_BATCH_SIZE,
+            help='Number of play sessions processed per transaction')
+        parser.add_argument(
+            '--rescan-days', type=int, default=ROLLUP_RESCAN_DAYS,
+            help='Number of recent days recomputed from the sessions')
+
+    def handle(self, *args, **options):
+        for name, materialize in (
+            ('daily plays', materialize_game_play_daily),
+            ('player sketches', materialize_game_player_sketches),
+        ):
+            processed = materialize(options['batch_size'],
+                                    options['rescan_days'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{processed} play sessions materialized into {name}!'))
@@ -0,0 +1,21 @@
+# Generated by Django 3.1.7 on 2026-10-18 19:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('game', '0005_auto_20210722_1511'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='playsession',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='play_sessions', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
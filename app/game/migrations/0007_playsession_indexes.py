@@ -0,0 +1,25 @@
+# Generated by Django 3.1.7 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_auto_20261018_1939'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playsession',
+            index=models.Index(fields=['user', '-creation_time'], name='playsession_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playsession',
+            index=models.Index(fields=['game', 'creation_time'], name='playsession_game_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playsession',
+            index=models.Index(fields=['creation_time', 'id'], name='playsession_time_id_idx'),
+        ),
+    ]
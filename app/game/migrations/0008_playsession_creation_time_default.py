@@ -0,0 +1,19 @@
+# Generated by Django 3.1.7 on 2026-10-18 19:48
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0007_playsession_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='playsession',
+            name='creation_time',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
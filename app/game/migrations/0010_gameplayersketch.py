@@ -0,0 +1,26 @@
+# Generated by Django 3.1.7 on 2026-10-18 19:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0009_gameplaydaily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GamePlayerSketch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('registers', models.BinaryField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='player_sketches', to='game.game')),
+            ],
+            options={
+                'unique_together': {('game', 'day')},
+            },
+        ),
+    ]
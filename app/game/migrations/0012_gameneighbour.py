@@ -0,0 +1,27 @@
+# Generated by Django 3.1.7 on 2026-10-18 20:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0011_catalogversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameNeighbour',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='game.game')),
+                ('neighbour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.game')),
+            ],
+            options={
+                'unique_together': {('game', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.7 on 2026-10-18 20:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0012_gameneighbour'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameCoPlay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('players', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='co_plays', to='game.game')),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.game')),
+            ],
+            options={
+                'unique_together': {('game', 'rank')},
+            },
+        ),
+    ]
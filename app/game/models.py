@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from app.settings import AUTH_USER_MODEL
 
 
@@ -22,10 +23,107 @@ class Game(models.Model):
 class PlaySession(models.Model):
     """Play session model"""
     user = models.ForeignKey(AUTH_USER_MODEL,
-                             related_name='last_played_session',
+                             related_name='play_sessions',
                              on_delete=models.CASCADE)
     game = models.ForeignKey(Game, on_delete=models.PROTECT)
-    creation_time = models.DateTimeField(auto_now_add=True)
+    creation_time = models.DateTimeField(default=timezone.now,
+                                         editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-creation_time'],
+                         name='playsession_user_time_idx'),
+            models.Index(fields=['game', 'creation_time'],
+                         name='playsession_game_time_idx'),
+            models.Index(fields=['creation_time', 'id'],
+                         name='playsession_time_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.game}({self.creation_time})"
+
+
+class GamePlayDaily(models.Model):
+    """Daily play session rollup of a game"""
+    game = models.ForeignKey(Game,
+                             related_name='daily_plays',
+                             on_delete=models.CASCADE)
+    day = models.DateField()
+    sessions = models.PositiveIntegerField(default=0)
+    unique_players = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('game', 'day')
+
+    def __str__(self):
+        return f"{self.game}({self.day})"
+
+
+class MaterializationWatermark(models.Model):
+    """Last play session id processed by an incremental job"""
+    name = models.CharField(max_length=100, unique=True)
+    last_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}({self.last_id})"
+
+
+class GamePlayerSketch(models.Model):
+    """HyperLogLog sketch of the players of a game in one day"""
+    game = models.ForeignKey(Game,
+                             related_name='player_sketches',
+                             on_delete=models.CASCADE)
+    day = models.DateField()
+    registers = models.BinaryField()
+
+    class Meta:
+        unique_together = ('game', 'day')
+
+    def __str__(self):
+        return f"{self.game}({self.day})"
+
+
+class CatalogVersion(models.Model):
+    """Counter bumped on every change of the game catalog"""
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.version}({self.updated_at})"
+
+
+class GameNeighbour(models.Model):
+    """Precomputed most similar game of a game, by genres"""
+    game = models.ForeignKey(Game,
+                             related_name='neighbours',
+                             on_delete=models.CASCADE)
+    neighbour = models.ForeignKey(Game,
+                                  related_name='+',
+                                  on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('game', 'rank')
+
+    def __str__(self):
+        return f"{self.game}({self.rank}: {self.neighbour})"
+
+
+class GameCoPlay(models.Model):
+    """Precomputed game most often played by the players of a game"""
+    game = models.ForeignKey(Game,
+                             related_name='co_plays',
+                             on_delete=models.CASCADE)
+    other = models.ForeignKey(Game,
+                              related_name='+',
+                              on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    players = models.PositiveIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('game', 'rank')
+
+    def __str__(self):
+        return f"{self.game}({self.rank}: {self.other})"
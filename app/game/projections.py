@@ -0,0 +1,82 @@
+from collections import defaultdict
+from rest_framework import serializers
+from game.models import Game, Genre, PlaySession
+from user.avatars import image_url, thumbnail_urls
+
+
+GAME_COLUMNS = ('id', 'name')
+PLAY_SESSION_COLUMNS = (
+    'id',
+    'creation_time',
+    'game_id',
+    'game__name',
+    'user_id',
+    'user__email',
+    'user__username',
+    'user__birthdate',
+    'user__image',
+    'user__image_thumbnailed',
+)
+
+creation_time_field = serializers.DateTimeField()
+birthdate_field = serializers.DateField()
+
+
+def game_rows():
+    """Return the game rows the game projection is built from"""
+    return Game.objects.values(*GAME_COLUMNS)
+
+
+def play_session_rows():
+    """Return the play session rows the projection is built from"""
+    return PlaySession.objects.values(*PLAY_SESSION_COLUMNS)
+
+
+def genres_by_game(game_ids):
+    """Return the genre dicts of games grouped by game id, in one query"""
+    genres = defaultdict(list)
+    interned = {}
+    rows = Genre.objects.filter(game__in=game_ids).values_list(
+        'game', 'id', 'name')
+    for game_id, genre_id, name in rows:
+        genre = interned.get(genre_id)
+        if genre is None:
+            genre = interned[genre_id] = {'id': genre_id, 'name': name}
+        genres[game_id].append(genre)
+    return genres
+
+
+def project_games(rows):
+    """Build the GameSerializer output of game rows"""
+    genres = genres_by_game({row['id'] for row in rows})
+    return [
+        {'name': row['name'], 'genre': genres.get(row['id'], [])}
+        for row in rows
+    ]
+
+
+def project_play_sessions(rows, request=None):
+    """Build the PlaySessionSerializer output of play session rows"""
+    genres = genres_by_game({row['game_id'] for row in rows})
+    return [
+        {
+            'user': {
+                'id': row['user_id'],
+                'email': row['user__email'],
+                'username': row['user__username'],
+                'birthdate': birthdate_field.to_representation(
+                    row['user__birthdate']),
+                'image': image_url(row['user__image'], request),
+                'thumbnails': thumbnail_urls(
+                    row['user__image'], row['user__image_thumbnailed'],
+                    request),
+            },
+            'game': {
+                'name': row['game__name'],
+                'genre': genres.get(row['game_id'], []),
+            },
+            'creation_time': creation_time_field.to_representation(
+                row['creation_time']),
+        }
+        for row in rows
+    ]
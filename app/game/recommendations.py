@@ -0,0 +1,230 @@
+from collections import defaultdict
+from itertools import chain
+import numpy as np
+from django.db import transaction
+from app.settings import RECOMMENDATION_TOP_N, RECOMMENDATION_CHUNK_SIZE, \
+    RECOMMENDATION_MAX_BASKET, RECOMMENDATION_HISTORY, \
+    RECOMMENDATION_PAIR_BUDGET
+from game.models import Game, GameCoPlay, PlaySession
+from user.models import User
+
+
+def stream_baskets(game_ids, chunk_size, max_basket):
+    """
+    Yield the distinct games played by chunks of chunk_size users, as
+    (user index, game index) arrays sorted by user. Users are read by
+    primary key ranges so every chunk holds whole baskets. Baskets larger
+    than max_basket are left out, their pairs would outweigh everyone.
+    """
+    last_id = 0
+    while True:
+        user_ids = list(User.objects.filter(pk__gt=last_id).order_by(
+            'pk').values_list('pk', flat=True)[:chunk_size])
+        if not user_ids:
+            return
+        last_id = user_ids[-1]
+
+        rows = PlaySession.objects.filter(
+            user_id__gte=user_ids[0], user_id__lte=last_id,
+        ).values_list('user_id', 'game_id').distinct().order_by()
+        pairs = np.fromiter(
+            chain.from_iterable(rows.iterator(chunk_size=10000)),
+            dtype=np.int64).reshape(-1, 2)
+        if not len(pairs):
+            continue
+
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        users, sizes = np.unique(pairs[:, 0], return_counts=True)
+        keep = np.repeat(sizes <= max_basket, sizes)
+        yield (np.repeat(np.arange(len(users)), sizes)[keep],
+               np.searchsorted(game_ids, pairs[keep, 1]))
+
+
+def basket_bounds(users):
+    """Return the start and size of the baskets of sorted user indexes"""
+    starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+    return starts, np.diff(np.r_[starts, len(users)])
+
+
+def basket_pairs(users, games, left_games=None):
+    """
+    Return the ordered (game, other game) pairs of the same baskets. Only
+    the games selected by the left_games mask are expanded on the left.
+    """
+    starts, sizes = basket_bounds(users)
+    element_sizes = np.repeat(sizes, sizes)
+    element_starts = np.repeat(starts, sizes)
+    left = games
+    if left_games is not None:
+        left = games[left_games]
+        element_sizes = element_sizes[left_games]
+        element_starts = element_starts[left_games]
+
+    first = np.repeat(np.cumsum(element_sizes) - element_sizes,
+                      element_sizes)
+    left = np.repeat(left, element_sizes)
+    right = games[np.repeat(element_starts, element_sizes)
+                  + np.arange(len(left)) - first]
+
+    distinct = left != right
+    return left[distinct], right[distinct]
+
+
+def pair_batches(users, left_games, pair_budget):
+    """
+    Yield the (start, end) element ranges splitting the baskets of a
+    chunk in batches expanding to at most pair_budget pairs, or to a
+    single basket when it is larger
+    """
+    if not len(users):
+        return
+    starts, sizes = basket_bounds(users)
+    pairs = np.add.reduceat(left_games.astype(np.int64), starts) * sizes
+    total = np.r_[0, np.cumsum(pairs)]
+    ends = np.r_[starts[1:], len(users)]
+
+    basket = 0
+    while basket < len(starts):
+        last = np.searchsorted(total, total[basket] + pair_budget,
+                               side='right') - 1
+        last = max(last, basket + 1)
+        yield starts[basket], ends[last - 1]
+        basket = last
+
+
+def merge_counts(*parts):
+    """Merge (keys, counts) arrays, adding up the counts of equal keys"""
+    keys, inverse = np.unique(np.concatenate([keys for keys, _ in parts]),
+                              return_inverse=True)
+    counts = np.bincount(
+        inverse, weights=np.concatenate([counts for _, counts in parts]),
+        minlength=len(keys))
+    return keys, counts
+
+
+class PairCounter:
+    """
+    Count keys added in batches. The counts of every batch wait until
+    they are as many as the totals and are then merged in a single sort,
+    so every key is sorted a logarithmic number of times.
+    """
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0)
+        self._pending = []
+        self._pending_size = 0
+
+    def add(self, keys):
+        """Count the occurrences of a batch of keys"""
+        keys, counts = np.unique(keys, return_counts=True)
+        self._pending.append((keys, counts))
+        self._pending_size += len(keys)
+        if self._pending_size >= len(self.keys):
+            self.__merge()
+
+    def __merge(self):
+        if self._pending:
+            self.keys, self.counts = merge_counts(
+                (self.keys, self.counts), *self._pending)
+            self._pending = []
+            self._pending_size = 0
+
+    def totals(self):
+        """Return the distinct keys and their counts"""
+        self.__merge()
+        return self.keys, self.counts
+
+
+def compute_co_plays(top_n=RECOMMENDATION_TOP_N,
+                     chunk_size=RECOMMENDATION_CHUNK_SIZE,
+                     max_basket=RECOMMENDATION_MAX_BASKET, partitions=1,
+                     pair_budget=RECOMMENDATION_PAIR_BUDGET):
+    """
+    Yield the GameCoPlay rows of every game: the top_n games most played
+    by its players, scored by the cosine of their player sets. One pass
+    over the play sessions per partition of the games counts the pairs
+    whose left game is in the partition. Baskets are expanded in batches
+    of at most pair_budget pairs, so memory is bounded by the budget and
+    the distinct pairs of one partition.
+    """
+    game_ids = np.array(sorted(Game.objects.values_list('id', flat=True)),
+                        dtype=np.int64)
+    size = len(game_ids)
+    if not size:
+        return
+
+    for partition in range(partitions):
+        players = np.zeros(size)
+        counter = PairCounter()
+        for users, games in stream_baskets(game_ids, chunk_size,
+                                           max_basket):
+            players += np.bincount(games, minlength=size)
+            in_partition = games % partitions == partition
+            for start, end in pair_batches(users, in_partition,
+                                           pair_budget):
+                left, right = basket_pairs(users[start:end],
+                                           games[start:end],
+                                           in_partition[start:end])
+                counter.add(left * size + right)
+
+        keys, counts = counter.totals()
+        left, right = np.divmod(keys, size)
+        scores = counts / np.sqrt(players[left] * players[right])
+        order = np.lexsort((game_ids[right], -scores, left))
+        left, right = left[order], right[order]
+        counts, scores = counts[order], scores[order]
+
+        starts = np.flatnonzero(np.r_[True, left[1:] != left[:-1]])
+        ranks = np.arange(len(left)) - np.repeat(
+            starts, np.diff(np.r_[starts, len(left)]))
+        for i in np.flatnonzero(ranks < top_n):
+            yield GameCoPlay(game_id=int(game_ids[left[i]]),
+                             other_id=int(game_ids[right[i]]),
+                             rank=int(ranks[i]),
+                             players=int(counts[i]),
+                             score=round(float(scores[i]), 6))
+
+
+@transaction.atomic
+def refresh_co_plays(top_n=RECOMMENDATION_TOP_N,
+                     chunk_size=RECOMMENDATION_CHUNK_SIZE,
+                     max_basket=RECOMMENDATION_MAX_BASKET, partitions=1,
+                     pair_budget=RECOMMENDATION_PAIR_BUDGET,
+                     batch_size=1000):
+    """Replace the co-play table, readers see the old or new table"""
+    GameCoPlay.objects.all().delete()
+    co_plays = compute_co_plays(top_n, chunk_size, max_basket, partitions,
+                                pair_budget)
+
+    stored = 0
+    while True:
+        batch = [co_play for _, co_play in zip(range(batch_size), co_plays)]
+        if not batch:
+            return stored
+        GameCoPlay.objects.bulk_create(batch)
+        stored += len(batch)
+
+
+def recommend_games(user_id, limit, history=RECOMMENDATION_HISTORY):
+    """
+    Return the (game id, name, score) of the games co-played with the
+    last games of a user that the user did not play, best first
+    """
+    recent = PlaySession.objects.filter(user_id=user_id).order_by(
+        '-creation_time', '-id').values_list('game_id',
+                                             flat=True)[:history * 10]
+    played = set(list(dict.fromkeys(recent))[:history])
+
+    scores = defaultdict(float)
+    names = {}
+    for other_id, name, score in GameCoPlay.objects.filter(
+        game_id__in=played
+    ).values_list('other_id', 'other__name', 'score'):
+        if other_id not in played:
+            scores[other_id] += score
+            names[other_id] = name
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return [(game_id, names[game_id], round(score, 6))
+            for game_id, score in ranked[:limit]]
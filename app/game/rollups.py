@@ -0,0 +1,190 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from app.settings import ROLLUP_BATCH_SIZE, ROLLUP_RESCAN_DAYS, \
+    HLL_PRECISION
+from common.hyperloglog import HyperLogLog
+from game.models import GamePlayDaily, GamePlayerSketch, \
+    MaterializationWatermark, PlaySession
+
+
+GAME_PLAY_DAILY = 'game_play_daily'
+GAME_PLAYER_SKETCH = 'game_player_sketch'
+
+
+def day_range(day):
+    """Return the datetime bounds of a UTC day"""
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def recent_days(days, today=None):
+    """Return the last `days` UTC days, today first"""
+    today = today or timezone.now().date()
+    return [today - timedelta(days=offset) for offset in range(days)]
+
+
+def fold_new_sessions(name, fold, batch_size):
+    """
+    Call fold with every batch of play sessions stored since its last run.
+    The id of the last session processed is kept as a watermark, so a run
+    costs what was added since the previous one. The batches are
+    (id, game_id, user_id, creation_time) tuples and each one is folded
+    in its own transaction. Returns the number of sessions processed.
+
+    Ids are not committed in order, a session committed after a higher
+    id was folded is skipped here, as are deletions. The materialize
+    functions recompute the last days from the sessions to catch them.
+    """
+    processed = 0
+    while True:
+        with transaction.atomic():
+            watermark, _ = MaterializationWatermark.objects.\
+                select_for_update().get_or_create(name=name)
+
+            rows = list(PlaySession.objects.filter(
+                id__gt=watermark.last_id
+            ).order_by('id').values_list(
+                'id', 'game_id', 'user_id', 'creation_time')[:batch_size])
+            if not rows:
+                return processed
+
+            fold(rows)
+
+            watermark.last_id = rows[-1][0]
+            watermark.save(update_fields=['last_id'])
+            processed += len(rows)
+
+
+def refresh_game_play_daily(day, game_ids=None):
+    """Recompute the rollup of some games, or all of them, for one day"""
+    start, end = day_range(day)
+    sessions = PlaySession.objects.filter(creation_time__gte=start,
+                                          creation_time__lt=end)
+    rollups = GamePlayDaily.objects.filter(day=day)
+    if game_ids is not None:
+        sessions = sessions.filter(game__in=game_ids)
+        rollups = rollups.filter(game__in=game_ids)
+
+    rows = sessions.values('game').annotate(
+        sessions=Count('id'),
+        unique_players=Count('user', distinct=True),
+    ).order_by()
+
+    counted = set()
+    for row in rows:
+        GamePlayDaily.objects.update_or_create(
+            game_id=row['game'],
+            day=day,
+            defaults={
+                'sessions': row['sessions'],
+                'unique_players': row['unique_players'],
+            },
+        )
+        counted.add(row['game'])
+
+    # Every session of these games was deleted
+    rollups.exclude(game__in=counted).delete()
+
+
+def fold_game_play_daily(rows):
+    """
+    Recompute the (game, day) buckets touched by new sessions through
+    the (game, creation_time) index
+    """
+    buckets = defaultdict(set)
+    for _, game_id, _, creation_time in rows:
+        buckets[creation_time.date()].add(game_id)
+    for day, game_ids in buckets.items():
+        refresh_game_play_daily(day, game_ids)
+
+
+def fold_game_player_sketches(rows):
+    """Add the players of new sessions to their (game, day) sketches"""
+    players = defaultdict(set)
+    for _, game_id, user_id, creation_time in rows:
+        players[(game_id, creation_time.date())].add(user_id)
+
+    sketches = {
+        (sketch.game_id, sketch.day): sketch
+        for sketch in GamePlayerSketch.objects.filter(
+            game__in={game_id for game_id, _ in players},
+            day__in={day for _, day in players},
+        )
+    }
+
+    new_sketches = []
+    for (game_id, day), user_ids in players.items():
+        sketch = sketches.get((game_id, day))
+        if sketch:
+            hll = HyperLogLog.from_bytes(sketch.registers)
+        else:
+            hll = HyperLogLog(HLL_PRECISION)
+            sketch = GamePlayerSketch(game_id=game_id, day=day)
+            new_sketches.append(sketch)
+
+        for user_id in user_ids:
+            hll.add(user_id)
+        sketch.registers = hll.to_bytes()
+
+    GamePlayerSketch.objects.bulk_create(new_sketches)
+    GamePlayerSketch.objects.bulk_update(
+        [sketch for sketch in sketches.values()
+         if (sketch.game_id, sketch.day) in players],
+        ['registers'],
+    )
+
+
+def rebuild_game_player_sketches(day):
+    """Replace the sketches of one day by sketches of its sessions"""
+    start, end = day_range(day)
+    sketches = defaultdict(lambda: HyperLogLog(HLL_PRECISION))
+    players = PlaySession.objects.filter(
+        creation_time__gte=start, creation_time__lt=end,
+    ).values_list('game_id', 'user_id').distinct().order_by()
+    for game_id, user_id in players.iterator(chunk_size=ROLLUP_BATCH_SIZE):
+        sketches[game_id].add(user_id)
+
+    GamePlayerSketch.objects.filter(day=day).delete()
+    GamePlayerSketch.objects.bulk_create([
+        GamePlayerSketch(game_id=game_id, day=day,
+                         registers=hll.to_bytes())
+        for game_id, hll in sketches.items()
+    ])
+
+
+def rescan_recent_days(name, rescan, days, today=None):
+    """
+    Recompute the last days of a rollup from the sessions, under the lock
+    of its watermark so no fold runs meanwhile. This catches the sessions
+    the watermark skipped and the deleted ones, as long as they were
+    committed or deleted within `days` days of their creation time.
+    """
+    for day in recent_days(days, today):
+        with transaction.atomic():
+            MaterializationWatermark.objects.select_for_update(
+            ).get_or_create(name=name)
+            rescan(day)
+
+
+def materialize_game_play_daily(batch_size=ROLLUP_BATCH_SIZE,
+                                rescan_days=ROLLUP_RESCAN_DAYS, today=None):
+    """Fold the new play sessions into GamePlayDaily"""
+    processed = fold_new_sessions(GAME_PLAY_DAILY, fold_game_play_daily,
+                                  batch_size)
+    rescan_recent_days(GAME_PLAY_DAILY, refresh_game_play_daily,
+                       rescan_days, today)
+    return processed
+
+
+def materialize_game_player_sketches(batch_size=ROLLUP_BATCH_SIZE,
+                                     rescan_days=ROLLUP_RESCAN_DAYS,
+                                     today=None):
+    """Fold the new play sessions into GamePlayerSketch"""
+    processed = fold_new_sessions(GAME_PLAYER_SKETCH,
+                                  fold_game_player_sketches, batch_size)
+    rescan_recent_days(GAME_PLAYER_SKETCH, rebuild_game_player_sketches,
+                       rescan_days, today)
+    return processed
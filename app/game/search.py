@@ -0,0 +1,168 @@
+import heapq
+import math
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from django.db.models import Sum
+from app.settings import SEARCH_INDEX_TTL, SEARCH_FUZZY_THRESHOLD, \
+    SEARCH_CACHE_SIZE
+from common.cache import ExpiringLRUCache
+from game.catalog import catalog_version
+from game.models import Game, GamePlayDaily
+
+NAME_START, WORD_START, FUZZY = range(3)
+
+
+def normalize(text):
+    """Casefold a text, strip its accents and collapse its spaces"""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.split())
+
+
+def trigrams(text):
+    """Return the trigrams of the words of a normalized text"""
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class GameSearchIndex:
+    """
+    In-memory search index over the game names. Every name is stored
+    from the start of each of its words in one sorted array, so the
+    games matching a prefix are a contiguous range found by bisection,
+    like the subtree of a trie. A trigram index finds the names close
+    to a misspelled query.
+    """
+
+    def __init__(self, version, names, popularity):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.names = names
+        self.popularity = popularity
+
+        entries = []
+        self.postings = {}
+        self.trigram_counts = {}
+        self.results = ExpiringLRUCache(SEARCH_CACHE_SIZE)
+        for game_id, name in names.items():
+            normalized = normalize(name)
+            position = 0
+            for index, word in enumerate(normalized.split(' ')):
+                entries.append((normalized[position:], index, game_id))
+                position += len(word) + 1
+
+            grams = trigrams(normalized)
+            self.trigram_counts[game_id] = len(grams)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(game_id)
+
+        entries.sort()
+        self.keys = [key for key, _, _ in entries]
+        self.key_games = [(game_id, index) for _, index, game_id in entries]
+
+    @classmethod
+    def load(cls, version):
+        """Read the game names and their total play sessions"""
+        names = dict(Game.objects.values_list('id', 'name'))
+        popularity = dict(GamePlayDaily.objects.values('game_id').annotate(
+            sessions=Sum('sessions')).values_list('game_id', 'sessions'))
+        return cls(version, names, popularity)
+
+    def __prefix_matches(self, query):
+        """Return the games with a name or a word starting with query"""
+        matches = {}
+        index = bisect_left(self.keys, query)
+        while index < len(self.keys) and self.keys[index].startswith(query):
+            game_id, word = self.key_games[index]
+            tier = NAME_START if word == 0 else WORD_START
+            matches[game_id] = min(matches.get(game_id, tier), tier)
+            index += 1
+        return matches
+
+    def __fuzzy_matches(self, query):
+        """Return the trigram similarity of the names close to query"""
+        grams = trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        matches = {}
+        for game_id, count in shared.items():
+            similarity = count / (len(grams) + self.trigram_counts[game_id]
+                                  - count)
+            if similarity >= SEARCH_FUZZY_THRESHOLD:
+                matches[game_id] = similarity
+        return matches
+
+    def search(self, query, limit):
+        """
+        Return the (game id, name) of the best matches, names starting
+        with the query first, then names with a word starting with it,
+        then close names, the most played first within each group
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        result = self.results.get((query, limit))
+        if result is None:
+            result = self.__search(query, limit)
+            self.results.set((query, limit), result, math.inf)
+        return result
+
+    def __search(self, query, limit):
+        ranked = [
+            (tier, 0, -self.popularity.get(game_id, 0), game_id)
+            for game_id, tier in self.__prefix_matches(query).items()
+        ]
+        if len(ranked) < limit and len(query) >= 3:
+            prefixed = {game_id for _, _, _, game_id in ranked}
+            ranked += [
+                (FUZZY, -similarity, -self.popularity.get(game_id, 0),
+                 game_id)
+                for game_id, similarity in self.__fuzzy_matches(query).items()
+                if game_id not in prefixed
+            ]
+
+        return [(game_id, self.names[game_id])
+                for _, _, _, game_id in heapq.nsmallest(limit, ranked)]
+
+
+class GameSearchIndexCache:
+    """
+    Holder of the search index, rebuilt when the catalog changes and
+    every `ttl` seconds to pick up the popularity changes
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._index = None
+        self._lock = threading.Lock()
+
+    def __is_current(self, index, version):
+        return (
+            index is not None
+            and index.version == version
+            and time.monotonic() - index.built_at < self.ttl
+        )
+
+    def get(self):
+        """Return the index of the current catalog version"""
+        version = catalog_version.get()
+        index = self._index
+        if self.__is_current(index, version):
+            return index
+
+        with self._lock:
+            if not self.__is_current(self._index, version):
+                self._index = GameSearchIndex.load(version)
+            return self._index
+
+
+game_search = GameSearchIndexCache(SEARCH_INDEX_TTL)
@@ -1,9 +1,18 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from rest_framework import serializers
-from game.models import Game, PlaySession, Genre
+from rest_framework.settings import api_settings
+from app.settings import PLAYSESSION_BULK_MAX_SIZE, \
+    PLAYSESSION_BULK_BATCH_SIZE
+from common.sparse_fields import SparseFieldsMixin
+from game.fragments import game_fragments
+from game.models import Game, PlaySession, Genre, GamePlayDaily
+from game.trending import trending_games
+from user.models import User
 from user.serializers import UserSerializer
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for genre object"""
 
     class Meta:
@@ -11,7 +20,7 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ('id', 'name')
 
 
-class GameSerializer(serializers.ModelSerializer):
+class GameSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for game object"""
     genre = GenreSerializer(many=True)
 
@@ -20,21 +29,118 @@ class GameSerializer(serializers.ModelSerializer):
         fields = ('name', 'genre')
         depth = 1
 
+    def to_representation(self, instance):
+        """Render the game from the fragment cache unless it is sparse"""
+        if (
+            self.selected_fields is not None
+            or self.expanded_fields is not None
+        ):
+            return super().to_representation(instance)
+        return game_fragments.render(instance, super().to_representation)
+
+
+class PlaySessionListSerializerStore(serializers.ListSerializer):
+    """Serializer for a batch of play session objects"""
+    default_error_messages = {
+        'max_length': 'Ensure this list has no more than {max_length} items.',
+    }
+
+    def to_internal_value(self, data):
+        """Validate every item and look up all their games in one query"""
+        if (
+            isinstance(data, list)
+            and len(data) > PLAYSESSION_BULK_MAX_SIZE
+        ):
+            message = self.error_messages['max_length'].format(
+                max_length=PLAYSESSION_BULK_MAX_SIZE)
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [message]
+            }, code='max_length')
+
+        if not isinstance(data, list) or not data:
+            return super().to_internal_value(data)
+
+        items = []
+        for item in data:
+            try:
+                items.append((self.child.run_validation(item), {}))
+            except serializers.ValidationError as exc:
+                items.append((None, exc.detail))
+
+        games = Game.objects.in_bulk(
+            {attrs['game'] for attrs, _ in items if attrs})
+        message = self.child.fields['game'].error_messages['does_not_exist']
+
+        ret = []
+        errors = []
+        for attrs, error in items:
+            if attrs and attrs['game'] not in games:
+                error = {'game': [message.format(pk_value=attrs['game'])]}
+            elif attrs:
+                ret.append({**attrs, 'game': games[attrs['game']]})
+            errors.append(error)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return ret
+
+    @transaction.atomic
+    def create(self, validated_data):
+        user = self.context.get('request').user
+        play_sessions = PlaySession.objects.bulk_create(
+            [PlaySession(**attrs, user=user) for attrs in validated_data],
+            batch_size=PLAYSESSION_BULK_BATCH_SIZE,
+        )
+        User.objects.refresh_last_played(User.objects.filter(pk=user.pk))
+        return play_sessions
+
+
+class PlaySessionGameField(serializers.PrimaryKeyRelatedField):
+    """
+    Game primary key field that only checks the key type when it is
+    validated as part of a batch. The batch then looks up every game
+    at once instead of running one query per item.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(self.parent.parent,
+                          PlaySessionListSerializerStore):
+            return super().to_internal_value(data)
+
+        try:
+            return Game._meta.pk.to_python(data)
+        except (TypeError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
 
 class PlaySessionSerializerStore(serializers.ModelSerializer):
     """Serializer for play session object"""
+    game = PlaySessionGameField(queryset=Game.objects.all())
 
     class Meta:
         model = PlaySession
         fields = ('user', 'game', 'creation_time')
         read_only_fields = ('user', )
+        list_serializer_class = PlaySessionListSerializerStore
 
+    @transaction.atomic
     def create(self, validated_data, **kwargs):
         validated_data['user'] = self.context.get('request').user
-        return PlaySession.objects.create(**validated_data)
+        play_session = PlaySession.objects.create(**validated_data)
+        User.objects.record_play_session(play_session)
+        transaction.on_commit(lambda: trending_games.record(play_session))
+        return play_session
 
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        play_session = super().update(instance, validated_data)
+        User.objects.refresh_last_played(
+            User.objects.filter(pk=play_session.user_id))
+        return play_session
 
-class PlaySessionSerializer(serializers.ModelSerializer):
+
+class PlaySessionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for play session object"""
     user = UserSerializer()
     game = GameSerializer()
@@ -44,3 +150,18 @@ class PlaySessionSerializer(serializers.ModelSerializer):
         fields = ('user', 'game', 'creation_time')
         read_only_fields = ('user', )
         depth = 2
+
+
+class GamePlayDailySerializer(serializers.ModelSerializer):
+    """Serializer for the daily game rollup object"""
+
+    class Meta:
+        model = GamePlayDaily
+        fields = ('day', 'sessions', 'unique_players')
+
+
+class PlaySessionHistorySerializer(PlaySessionSerializer):
+    """Serializer for the play sessions of a single user"""
+
+    class Meta(PlaySessionSerializer.Meta):
+        fields = ('game', 'creation_time')
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from game.catalog import catalog_version
+from game.fragments import game_fragments
+from game.models import Game, Genre
+
+
+def invalidate_now_and_on_commit(invalidate, *args):
+    """
+    Invalidate right away and again once the transaction commits, so a
+    fragment rendered from the uncommitted rows is not served either
+    """
+    invalidate(*args)
+    transaction.on_commit(lambda: invalidate(*args))
+
+
+def bump_catalog_version():
+    """Bump the catalog version within the transaction of the change"""
+    catalog_version.bump()
+    transaction.on_commit(catalog_version.expire)
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def invalidate_game_fragment(sender, instance, **kwargs):
+    """Drop the cached fragment of a changed game"""
+    invalidate_now_and_on_commit(game_fragments.invalidate, instance.pk)
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_fragments(sender, instance, **kwargs):
+    """Drop every cached fragment when a genre changes"""
+    invalidate_now_and_on_commit(game_fragments.invalidate_all)
+    bump_catalog_version()
+
+
+@receiver(m2m_changed, sender=Game.genre.through)
+def invalidate_game_genre_fragments(sender, instance, action, reverse,
+                                    pk_set, **kwargs):
+    """Drop the cached fragments of the games whose genres changed"""
+    if not action.startswith("post_"):
+        return
+
+    bump_catalog_version()
+    if not reverse:
+        game_ids = [instance.pk]
+    elif pk_set is not None:
+        game_ids = pk_set
+    else:
+        # A genre was cleared from all its games
+        invalidate_now_and_on_commit(game_fragments.invalidate_all)
+        return
+
+    for game_id in game_ids:
+        invalidate_now_and_on_commit(game_fragments.invalidate, game_id)
@@ -0,0 +1,100 @@
+import numpy as np
+from django.db import transaction
+from app.settings import SIMILAR_GAMES_K, SIMILARITY_BLOCK_SIZE
+from game.models import Game, GameNeighbour
+
+# Number of bits set in every byte value
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)],
+                    dtype=np.uint8)
+METRICS = ('jaccard', 'cosine')
+
+
+def genre_matrix():
+    """
+    Return the sorted game ids and their genres as a bit-packed matrix,
+    one row of ceil(genres / 8) bytes per game
+    """
+    game_ids = np.array(sorted(Game.objects.values_list('id', flat=True)),
+                        dtype=np.int64)
+    pairs = np.array(list(Game.genre.through.objects.values_list(
+        'game_id', 'genre_id')), dtype=np.int64).reshape(-1, 2)
+
+    genre_ids, genre_columns = np.unique(pairs[:, 1], return_inverse=True)
+    incidence = np.zeros((len(game_ids), len(genre_ids)), dtype=bool)
+    incidence[np.searchsorted(game_ids, pairs[:, 0]), genre_columns] = True
+    return game_ids, np.packbits(incidence, axis=1)
+
+
+def similarity_block(block, matrix, counts, block_counts, metric):
+    """Return the similarity of a block of rows with every row"""
+    shared = POPCOUNT[block[:, np.newaxis, :] & matrix[np.newaxis, :, :]]
+    shared = shared.sum(axis=2, dtype=np.float64)
+
+    if metric == 'cosine':
+        norms = np.sqrt(np.outer(block_counts, counts))
+    else:
+        norms = block_counts[:, np.newaxis] + counts[np.newaxis, :] - shared
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(norms > 0, shared / norms, 0.0)
+
+
+def top_neighbours(scores, game_ids, k):
+    """
+    Return the (column, score) pairs of the k best scores of a row, the
+    lowest game id first among equal scores
+    """
+    k = min(k, np.count_nonzero(scores > 0))
+    if k == 0:
+        return []
+
+    threshold = np.partition(scores, -k)[-k]
+    candidates = np.flatnonzero(scores >= threshold)
+    order = np.lexsort((game_ids[candidates], -scores[candidates]))[:k]
+    return [(column, scores[column]) for column in candidates[order]]
+
+
+def compute_game_neighbours(k=SIMILAR_GAMES_K,
+                            block_size=SIMILARITY_BLOCK_SIZE,
+                            metric='jaccard'):
+    """
+    Yield the GameNeighbour rows of every game, comparing block_size games
+    at a time with the whole catalog so memory stays bounded by
+    block_size * games bytes
+    """
+    if metric not in METRICS:
+        raise ValueError(f"The metric must be one of {', '.join(METRICS)}.")
+
+    game_ids, matrix = genre_matrix()
+    counts = POPCOUNT[matrix].sum(axis=1, dtype=np.float64)
+
+    for start in range(0, len(game_ids), block_size):
+        stop = start + block_size
+        scores = similarity_block(matrix[start:stop], matrix, counts,
+                                  counts[start:stop], metric)
+        for row, game_scores in enumerate(scores):
+            game_scores[start + row] = 0
+            for rank, (column, score) in enumerate(
+                top_neighbours(game_scores, game_ids, k)
+            ):
+                yield GameNeighbour(game_id=int(game_ids[start + row]),
+                                    neighbour_id=int(game_ids[column]),
+                                    rank=rank,
+                                    score=round(float(score), 6))
+
+
+@transaction.atomic
+def refresh_game_neighbours(k=SIMILAR_GAMES_K,
+                            block_size=SIMILARITY_BLOCK_SIZE,
+                            metric='jaccard', batch_size=1000):
+    """Replace the neighbour table, readers see the old or new table"""
+    GameNeighbour.objects.all().delete()
+    neighbours = compute_game_neighbours(k, block_size, metric)
+
+    stored = 0
+    while True:
+        batch = [neighbour for _, neighbour in zip(range(batch_size),
+                                                   neighbours)]
+        if not batch:
+            return stored
+        GameNeighbour.objects.bulk_create(batch)
+        stored += len(batch)
@@ -0,0 +1,162 @@
+import sys
+import orjson
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from rest_framework.response import Response
+from common.renderers import ORJSONRenderer
+from game.catalog import catalog_version
+from game.projections import game_rows, project_games
+
+
+SnapshotGame = namedtuple('SnapshotGame', ('id', 'data', 'body'))
+
+renderer = ORJSONRenderer()
+
+
+class SnapshotRows:
+    """
+    Read-only, queryset-like list of snapshot games sorted by id. It
+    supports what the cursor paginator and the filter backends use:
+    ordering by id, filtering on id and slicing.
+    """
+
+    def __init__(self, games, ids, reverse=False):
+        self.games = games
+        self.ids = ids
+        self.reverse = reverse
+
+    def order_by(self, *ordering):
+        if ordering not in (('id',), ('-id',)):
+            raise ValueError(f'Unsupported snapshot ordering {ordering}')
+        return SnapshotRows(self.games, self.ids, ordering == ('-id',))
+
+    def filter(self, id__gt=None, id__lt=None, id__in=None):
+        start, stop = 0, len(self.ids)
+        if id__gt is not None:
+            start = bisect_right(self.ids, int(id__gt))
+        if id__lt is not None:
+            stop = bisect_left(self.ids, int(id__lt))
+        games, ids = self.games[start:stop], self.ids[start:stop]
+
+        if id__in is not None:
+            id__in = set(id__in)
+            games = tuple(game for game in games if game.id in id__in)
+            ids = array('q', (game.id for game in games))
+        return SnapshotRows(games, ids, self.reverse)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __len__(self):
+        return len(self.games)
+
+    def __getitem__(self, key):
+        games = self.games[::-1] if self.reverse else self.games
+        return games[key]
+
+
+class CatalogSnapshot:
+    """
+    Immutable in-memory copy of the game catalog at a catalog version:
+    the sorted game ids, the serialized game of every id with interned
+    genre names, and its rendered JSON body
+    """
+
+    def __init__(self, version, games):
+        self.version = version
+        self.games = tuple(
+            SnapshotGame(game_id, data, renderer.render(data))
+            for game_id, data in games)
+        self.ids = array('q', (game.id for game in self.games))
+
+    @classmethod
+    def load(cls, version):
+        """Read the catalog with one query for games and one for genres"""
+        rows = list(game_rows().order_by('id'))
+        games = project_games(rows)
+        for genre in {id(genre): genre for game in games
+                      for genre in game['genre']}.values():
+            genre['name'] = sys.intern(genre['name'])
+        return cls(version, zip((row['id'] for row in rows), games))
+
+    def rows(self):
+        """Return the games as a queryset-like window"""
+        return SnapshotRows(self.games, self.ids)
+
+    def get(self, game_id):
+        """Return the snapshot game of an id or None"""
+        try:
+            game_id = int(game_id)
+        except (TypeError, ValueError):
+            return None
+
+        index = bisect_left(self.ids, game_id)
+        if index < len(self.ids) and self.ids[index] == game_id:
+            return self.games[index]
+        return None
+
+    @staticmethod
+    def page_body(games, next_link, previous_link):
+        """Render a paginated list of snapshot games from their bodies"""
+        return b''.join((
+            b'{"next":', orjson.dumps(next_link),
+            b',"previous":', orjson.dumps(previous_link),
+            b',"results":[', b','.join(game.body for game in games), b']}',
+        ))
+
+    @staticmethod
+    def list_body(games):
+        """Render an unpaginated list of snapshot games"""
+        return b'[' + b','.join(game.body for game in games) + b']'
+
+
+class CatalogSnapshotCache:
+    """
+    Holder of the current catalog snapshot. A snapshot is loaded when the
+    catalog version changed and swapped in at once, readers keep using
+    the snapshot they got.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the snapshot of the current catalog version"""
+        version = catalog_version.get()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = CatalogSnapshot.load(version)
+            return self._snapshot
+
+
+class PrerenderedResponse(Response):
+    """
+    Response carrying its JSON body already rendered. The body is used
+    as is when plain JSON is negotiated, the data is rendered otherwise.
+    """
+
+    def __init__(self, data, body, **kwargs):
+        super().__init__(data, **kwargs)
+        self.body = body
+
+    @property
+    def rendered_content(self):
+        renderer = getattr(self, 'accepted_renderer', None)
+        if (
+            not isinstance(renderer, ORJSONRenderer)
+            or self.accepted_media_type != renderer.media_type
+        ):
+            return super().rendered_content
+
+        self['Content-Type'] = renderer.media_type
+        return self.body
+
+
+catalog_snapshot = CatalogSnapshotCache()
@@ -0,0 +1,227 @@
+import fcntl
+import json
+import os
+import time
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from app.settings import PLAYSESSION_SPOOL_DIR, PLAYSESSION_SPOOL_MAX_BYTES
+from game.models import Game, PlaySession
+from user.models import User
+
+
+class SpoolFull(Exception):
+    """Raised when the spool reached its size limit"""
+
+
+class PlaySessionSpool:
+    """
+    Durable spool of play session events on the local disk.
+    Requests append JSON lines to the active file and a flush renames it
+    to a pending file before storing its events, so writers never wait
+    for the database. Events are stored at least once.
+    """
+    active_name = 'active.jsonl'
+    pending_prefix = 'pending-'
+    stats_name = 'stats.json'
+    depth_sample_bytes = 64 * 1024
+
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+
+    def __path(self, name):
+        return os.path.join(self.directory, name)
+
+    def __spool_files(self):
+        """Return the paths of the pending files and the active file"""
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return []
+
+        paths = [self.__path(name) for name in names
+                 if name.startswith(self.pending_prefix)]
+        if self.active_name in names:
+            paths.append(self.__path(self.active_name))
+        return paths
+
+    def size(self):
+        """Return the number of bytes waiting to be flushed"""
+        size = 0
+        for path in self.__spool_files():
+            try:
+                size += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return size
+
+    def depth(self):
+        """
+        Return the number of events waiting to be flushed.
+        The count is exact while the spool fits in one sample, beyond that
+        it is the spooled bytes divided by the average size of the sampled
+        events, so it never reads more than depth_sample_bytes.
+        """
+        paths = self.__spool_files()
+        size = 0
+        sample = b''
+        for path in paths:
+            try:
+                size += os.path.getsize(path)
+                if len(sample) < self.depth_sample_bytes:
+                    with open(path, 'rb') as spool:
+                        sample += spool.read(
+                            self.depth_sample_bytes - len(sample))
+            except FileNotFoundError:
+                pass
+
+        lines = sample.count(b'\n')
+        if len(sample) >= size or not lines:
+            return lines
+        # Only count the complete lines of the sample in the average
+        record_size = (sample.rindex(b'\n') + 1) / lines
+        return round(size / record_size)
+
+    def append(self, events):
+        """Durably append events to the spool"""
+        data = ''.join(json.dumps(event) + '\n' for event in events).encode()
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.__path(self.active_name)
+        while True:
+            with open(path, 'ab') as spool:
+                fcntl.flock(spool, fcntl.LOCK_EX)
+                if not self.__is_current(spool, path):
+                    # The file was rotated while we were waiting for it
+                    continue
+                # Checked under the lock so concurrent appenders can not
+                # all pass the limit at once
+                if self.size() + len(data) > self.max_bytes:
+                    raise SpoolFull()
+                spool.write(data)
+                spool.flush()
+                os.fsync(spool.fileno())
+                return
+
+    @staticmethod
+    def __is_current(spool, path):
+        """Check that an open file is still the one at path"""
+        try:
+            return os.fstat(spool.fileno()).st_ino == os.stat(path).st_ino
+        except FileNotFoundError:
+            return False
+
+    def rotate(self):
+        """Turn the active file into a pending file"""
+        pending_name = f'{self.pending_prefix}{time.time_ns()}.jsonl'
+        try:
+            os.rename(self.__path(self.active_name),
+                      self.__path(pending_name))
+        except FileNotFoundError:
+            pass
+
+    def pending_files(self):
+        """Return the pending file paths, oldest first"""
+        return [path for path in self.__spool_files()
+                if not path.endswith(self.active_name)]
+
+    @staticmethod
+    def read(path, chunk_size):
+        """Yield the events of a pending file in chunks"""
+        with open(path, 'rb') as spool:
+            # Wait for writers that opened the file before the rotation
+            fcntl.flock(spool, fcntl.LOCK_EX)
+            chunk = []
+            for line in spool:
+                try:
+                    chunk.append(json.loads(line))
+                except ValueError:
+                    # Partial line left by a crashed writer
+                    continue
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    def flush(self, batch_size):
+        """Store every spooled event, one transaction per pending file"""
+        started = time.monotonic()
+        self.rotate()
+
+        flushed = 0
+        for path in self.pending_files():
+            with transaction.atomic():
+                user_ids = set()
+                for events in self.read(path, batch_size):
+                    play_sessions = store_events(events, batch_size)
+                    user_ids.update(play_session.user_id
+                                    for play_session in play_sessions)
+                    flushed += len(play_sessions)
+                refresh_last_played(user_ids, batch_size)
+            os.remove(path)
+
+        stats = {
+            'last_flush_at': time.time(),
+            'last_flush_seconds': time.monotonic() - started,
+            'last_flush_events': flushed,
+        }
+        self.__write_stats(stats)
+        return stats
+
+    def __write_stats(self, stats):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.__path(f'{self.stats_name}.tmp')
+        with open(tmp_path, 'w') as stats_file:
+            json.dump(stats, stats_file)
+        os.replace(tmp_path, self.__path(self.stats_name))
+
+    def stats(self):
+        """Return the queue depth and the metrics of the last flush"""
+        try:
+            with open(self.__path(self.stats_name)) as stats_file:
+                stats = json.load(stats_file)
+        except FileNotFoundError:
+            stats = {}
+
+        return {
+            'depth': self.depth(),
+            'bytes': self.size(),
+            'max_bytes': self.max_bytes,
+            **stats,
+        }
+
+
+def store_events(events, batch_size):
+    """Insert spooled events whose user and game still exist"""
+    game_ids = set(Game.objects.filter(
+        pk__in={event['game'] for event in events}
+    ).values_list('pk', flat=True))
+    user_ids = set(User.objects.filter(
+        pk__in={event['user'] for event in events}
+    ).values_list('pk', flat=True))
+
+    return PlaySession.objects.bulk_create(
+        [
+            PlaySession(
+                user_id=event['user'],
+                game_id=event['game'],
+                creation_time=parse_datetime(event['creation_time']),
+            )
+            for event in events
+            if event['game'] in game_ids and event['user'] in user_ids
+        ],
+        batch_size=batch_size,
+    )
+
+
+def refresh_last_played(user_ids, batch_size):
+    """Recompute the last played columns of the given users in batches"""
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), batch_size):
+        User.objects.refresh_last_played(
+            User.objects.filter(pk__in=user_ids[start:start + batch_size]))
+
+
+playsession_spool = PlaySessionSpool(PLAYSESSION_SPOOL_DIR,
+                                     PLAYSESSION_SPOOL_MAX_BYTES)
@@ -0,0 +1,92 @@
+import json
+from datetime import datetime
+from io import StringIO
+from common.date_utils import convert_str_date
+from common.tests.utils import create_user, create_game
+from game.analytics import cohort_retention
+from game.models import PlaySession
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+
+BIRTHDATE = convert_str_date("1987-09-10")
+
+
+def create_play_session(user, game, day):
+    """Create a play session at a given day"""
+    creation_time = datetime.combine(
+        convert_str_date(day), datetime.min.time()).replace(
+            hour=12, tzinfo=timezone.utc)
+    return PlaySession.objects.create(user=user, game=game,
+                                      creation_time=creation_time)
+
+
+class CohortRetentionTests(TestCase):
+    """Test the cohort retention analytics"""
+
+    def setUp(self):
+        self.users = [
+            create_user(
+                get_user_model().objects.create_user,
+                email=f"user{i}@b.com",
+                password="12345",
+                username=f"user{i}",
+                birthdate=BIRTHDATE,
+            )
+            for i in range(3)
+        ]
+        self.game = create_game()
+        # user0 and user1 start on Monday 2024-01-01, user2 on Wednesday
+        create_play_session(self.users[0], self.game, "2024-01-01")
+        create_play_session(self.users[0], self.game, "2024-01-02")
+        create_play_session(self.users[0], self.game, "2024-01-02")
+        create_play_session(self.users[1], self.game, "2024-01-01")
+        create_play_session(self.users[1], self.game, "2024-01-03")
+        create_play_session(self.users[2], self.game, "2024-01-03")
+        create_play_session(self.users[2], self.game, "2024-01-04")
+
+    def test_daily_cohorts(self):
+        """Users are grouped by the day of their first session"""
+        cohorts = cohort_retention(PlaySession.objects.all(), max_days=2,
+                                   chunk_size=2)
+
+        self.assertEqual(cohorts, [
+            {"cohort": convert_str_date("2024-01-01"), "users": 2,
+             "retention": [1.0, 0.5, 0.5]},
+            {"cohort": convert_str_date("2024-01-03"), "users": 1,
+             "retention": [1.0, 1.0, 0.0]},
+        ])
+
+    def test_weekly_cohorts(self):
+        """Users are grouped by the week of their first session"""
+        cohorts = cohort_retention(PlaySession.objects.all(), max_days=1,
+                                   period=7)
+
+        self.assertEqual(cohorts, [
+            {"cohort": convert_str_date("2024-01-01"), "users": 3,
+             "retention": [1.0, 0.6667]},
+        ])
+
+    def test_cohort_retention_command_csv(self):
+        """The command writes the retention matrix as CSV"""
+        out = StringIO()
+        call_command("cohort_retention", days=1, stdout=out)
+
+        self.assertEqual(out.getvalue().splitlines(), [
+            "cohort,users,day_0,day_1",
+            "2024-01-01,2,1.0,0.5",
+            "2024-01-03,1,1.0,1.0",
+        ])
+
+    def test_cohort_retention_command_json(self):
+        """The command writes the retention matrix as JSON"""
+        out = StringIO()
+        call_command("cohort_retention", days=0, format="json",
+                     game=self.game.id, stdout=out)
+
+        self.assertEqual(json.loads(out.getvalue()), [
+            {"cohort": "2024-01-01", "users": 2, "retention": [1.0]},
+            {"cohort": "2024-01-03", "users": 1, "retention": [1.0]},
+        ])
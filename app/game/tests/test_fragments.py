@@ -0,0 +1,106 @@
+from unittest.mock import patch
+from common.date_utils import convert_str_date
+from common.tests.utils import create_user, create_game, create_genres, \
+    create_expected_data
+from game.catalog import catalog_version
+from game.fragments import GameFragmentCache, game_fragments
+from game.models import CatalogVersion, Game, Genre, PlaySession
+from game.serializers import GameSerializer, PlaySessionSerializer
+from django.db.models import F
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+
+BIRTHDATE = convert_str_date("1987-09-10")
+
+
+class GameFragmentCacheTests(TestCase):
+    """Test the serialized game fragment cache"""
+
+    def setUp(self):
+        game_fragments.clear()
+        self.game = create_game()
+        self.game.genre.set(create_genres())
+
+    def serialize(self):
+        return GameSerializer(self.game).data
+
+    def test_render_once(self):
+        """A game is serialized once for all the sessions that played it"""
+        user = create_user(
+            get_user_model().objects.create_user,
+            email="nuno@b.com",
+            password="12345",
+            username="nuno",
+            birthdate=BIRTHDATE,
+        )
+        for _ in range(10):
+            PlaySession.objects.create(user=user, game=self.game)
+
+        with patch.object(GameFragmentCache, "set",
+                          wraps=game_fragments.set) as cache_set:
+            data = PlaySessionSerializer(
+                PlaySession.objects.all(), many=True).data
+
+        self.assertEqual(cache_set.call_count, 1)
+        for item in data:
+            self.assertEqual(item["game"], create_expected_data(self.game))
+
+    def test_save_game(self):
+        """Saving a game drops its fragment"""
+        self.serialize()
+        self.game.name = "Renamed"
+        self.game.save()
+
+        self.assertEqual(self.serialize()["name"], "Renamed")
+
+    def test_change_game_genres(self):
+        """Changing the genres of a game drops its fragment"""
+        self.serialize()
+        genre = Genre.objects.create(name="Racing")
+        self.game.genre.add(genre)
+        self.assertIn({"id": genre.id, "name": "Racing"},
+                      self.serialize()["genre"])
+
+        genre.game_set.remove(self.game)
+        self.assertNotIn({"id": genre.id, "name": "Racing"},
+                         self.serialize()["genre"])
+
+        self.game.genre.clear()
+        self.assertEqual(self.serialize()["genre"], [])
+
+    def test_save_genre(self):
+        """Renaming a genre drops the fragments of its games"""
+        self.serialize()
+        genre = self.game.genre.first()
+        genre.name = "Renamed"
+        genre.save()
+
+        self.assertIn({"id": genre.id, "name": "Renamed"},
+                      self.serialize()["genre"])
+
+    def test_sparse_game_is_not_cached(self):
+        """Sparse serializations do not read nor fill the cache"""
+        self.serialize()
+        data = GameSerializer(self.game, fields={"name": {}}).data
+
+        self.assertEqual(data, {"name": self.game.name})
+
+    def test_change_from_another_process(self):
+        """A catalog version bumped elsewhere drops the fragments"""
+        self.serialize()
+        Game.objects.filter(pk=self.game.pk).update(name="Renamed")
+        CatalogVersion.objects.update(version=F("version") + 1)
+        # Another process changed the game, no signal ran here
+        catalog_version.expire()
+
+        self.game.refresh_from_db()
+        self.assertEqual(self.serialize()["name"], "Renamed")
+
+    def test_fragments_are_not_shared(self):
+        """Changing a rendered game does not change the cached one"""
+        data = self.serialize()
+        data["name"] = "Changed"
+        data["genre"][0]["name"] = "Changed"
+
+        self.assertEqual(self.serialize(), create_expected_data(self.game))
@@ -6,7 +6,12 @@ from common.tests.utils import (
     create_expected_data,
     create_expected_data_list,
 )
-from game.models import Genre
+from common.pagination import IdCursorPagination
+from game.catalog import catalog_version
+from game.genre_index import GenreIndex
+from game.models import CatalogVersion, Game, Genre
+from unittest.mock import patch
+from django.db.models import F
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
@@ -50,7 +55,7 @@ class PublicGameAPITests(TestCase):
         expected_data = create_expected_data_list(False, None, game1, game2)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, expected_data)
+        self.assertEqual(res.data["results"], expected_data)
 
     def test_get_detail_of_games(self):
         """Retrieve the datail of selected game"""
@@ -95,7 +100,7 @@ class PrivateGameAPITests(TestCase):
         expected_data = create_expected_data_list(False, None, game1, game2)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, expected_data)
+        self.assertEqual(res.data["results"], expected_data)
 
     def test_get_detail_of_games_user(self):
         """Retrieve the datail of selected game with authenticated user"""
@@ -118,7 +123,7 @@ class PrivateGameAPITests(TestCase):
         expected_data = create_expected_data_list(False, None, game1, game2)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, expected_data)
+        self.assertEqual(res.data["results"], expected_data)
 
     def test_get_detail_of_games_suser(self):
         """Retrieve the game datail with authenticated super user"""
@@ -131,3 +136,263 @@ class PrivateGameAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, expected_data)
+
+
+class GamePaginationAPITests(TestCase):
+    """Test the game list cursor pagination"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.games = [create_game(f"Game{i}") for i in range(5)]
+
+    def test_list_games_page_size(self):
+        """The list is cut to the requested page size"""
+        res = self.client.get(GAME_LIST_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([game["name"] for game in res.data["results"]],
+                         ["Game0", "Game1"])
+        self.assertNotIn("count", res.data)
+        self.assertIsNotNone(res.data["next"])
+
+    def test_list_games_follow_cursor(self):
+        """Following the next cursor walks every game once"""
+        names = []
+        url = GAME_LIST_URL + "?page_size=2"
+        while url:
+            res = self.client.get(url)
+            names += [game["name"] for game in res.data["results"]]
+            url = res.data["next"]
+
+        self.assertEqual(names, [game.name for game in self.games])
+
+    def test_list_games_max_page_size(self):
+        """The requested page size is capped"""
+        with patch.object(IdCursorPagination, "max_page_size", 3):
+            res = self.client.get(GAME_LIST_URL, {"page_size": 100})
+
+        self.assertEqual(len(res.data["results"]), 3)
+
+
+class GameSparseFieldsAPITests(TestCase):
+    """Test the ?fields= and ?expand= game list parameters"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.game1, self.game2 = create_games()
+
+    def test_list_games_fields(self):
+        """Only the selected fields are rendered"""
+        res = self.client.get(GAME_LIST_URL, {"fields": "name"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"],
+                         [{"name": "Game1"}, {"name": "Game2"}])
+
+    def test_list_games_nested_fields(self):
+        """Nested fields are selected with a dotted path"""
+        res = self.client.get(game_detail_url(self.game2.id),
+                              {"fields": "genre.name"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"genre": [{"name": "teste1"}]})
+
+    def test_list_games_not_expanded(self):
+        """Nested objects not expanded are rendered as primary keys"""
+        res = self.client.get(game_detail_url(self.game1.id), {"expand": ""})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        genre_ids = self.game1.genre.order_by("id").values_list("id",
+                                                                flat=True)
+        self.assertEqual(res.data["genre"], list(genre_ids))
+
+    def test_list_games_unknown_field(self):
+        """Selecting an unknown field is rejected"""
+        res = self.client.get(GAME_LIST_URL, {"fields": "name,price"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_games_queries(self):
+        """Unselected relations are not fetched"""
+        # The catalog version is read once per CATALOG_VERSION_TTL
+        catalog_version.get()
+        with self.assertNumQueries(1):
+            res = self.client.get(GAME_LIST_URL, {"fields": "name"})
+
+        self.assertEqual(len(res.data["results"]), 2)
+
+
+class GameConditionalGetAPITests(TestCase):
+    """Test the catalog ETag and Last-Modified headers"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.game1, self.game2 = create_games()
+
+    def test_list_games_etag(self):
+        """The game list has an ETag and a Last-Modified"""
+        res = self.client.get(GAME_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", res)
+
+    def test_list_games_not_modified(self):
+        """A matching If-None-Match returns 304 without any query"""
+        etag = self.client.get(GAME_LIST_URL)["ETag"]
+
+        with self.assertNumQueries(0):
+            res = self.client.get(GAME_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b"")
+
+    def test_detail_game_not_modified(self):
+        """A matching If-None-Match on a game returns 304"""
+        url = game_detail_url(self.game1.id)
+        res = self.client.get(url)
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_games_if_modified_since(self):
+        """A current If-Modified-Since returns 304"""
+        res = self.client.get(GAME_LIST_URL)
+
+        res = self.client.get(GAME_LIST_URL,
+                              HTTP_IF_MODIFIED_SINCE=res["Last-Modified"])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_depends_on_the_request(self):
+        """Different pages and games have different ETags"""
+        etags = {
+            self.client.get(GAME_LIST_URL)["ETag"],
+            self.client.get(GAME_LIST_URL, {"page_size": 1})["ETag"],
+            self.client.get(game_detail_url(self.game1.id))["ETag"],
+            self.client.get(game_detail_url(self.game2.id))["ETag"],
+        }
+
+        self.assertEqual(len(etags), 4)
+
+    def test_catalog_changes(self):
+        """Game, genre and game genre changes all change the ETag"""
+        etag = self.client.get(GAME_LIST_URL)["ETag"]
+        genre = Genre.objects.create(name="Racing")
+        for change in (
+            lambda: self.game1.genre.add(genre),
+            lambda: Genre.objects.filter(pk=genre.pk).first().save(),
+            lambda: self.game2.save(),
+            lambda: genre.game_set.clear(),
+        ):
+            change()
+            res = self.client.get(GAME_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(res["ETag"], etag)
+            etag = res["ETag"]
+
+    def test_change_from_another_process(self):
+        """A new catalog version never sends the previous body"""
+        url = game_detail_url(self.game1.id)
+        etag = self.client.get(url)["ETag"]
+        Game.objects.filter(pk=self.game1.pk).update(name="Renamed")
+        CatalogVersion.objects.update(version=F("version") + 1)
+        # Another process changed the game, no signal ran here
+        catalog_version.expire()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertEqual(res.data["name"], "Renamed")
+
+
+class GameGenreFilterAPITests(TestCase):
+    """Test the ?genre= game list filter"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.action = create_genre("Action")
+        self.racing = create_genre("Racing")
+        self.puzzle = create_genre("Puzzle")
+        self.game1 = create_game("Game1")
+        self.game1.genre.set([self.action, self.racing])
+        self.game2 = create_game("Game2")
+        self.game2.genre.set([self.racing])
+        self.game3 = create_game("Game3")
+
+    def get_names(self, **params):
+        res = self.client.get(GAME_LIST_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [game["name"] for game in res.data["results"]]
+
+    def test_filter_any_genre(self):
+        """Games of any of the genres are listed"""
+        genres = f"{self.action.id},{self.racing.id}"
+
+        self.assertEqual(self.get_names(genre=genres), ["Game1", "Game2"])
+        self.assertEqual(self.get_names(genre=self.action.id), ["Game1"])
+
+    def test_filter_all_genres(self):
+        """Games of all the genres are listed with genre_match=all"""
+        genres = f"{self.action.id},{self.racing.id}"
+
+        self.assertEqual(self.get_names(genre=genres, genre_match="all"),
+                         ["Game1"])
+
+    def test_filter_unknown_genre(self):
+        """A genre without games matches nothing"""
+        self.assertEqual(self.get_names(genre=self.puzzle.id), [])
+        self.assertEqual(self.get_names(genre=1000), [])
+
+    def test_filter_invalid(self):
+        """Invalid genre filters are rejected"""
+        for params in ({"genre": "a,1"}, {"genre": "1", "genre_match": "x"}):
+            res = self.client.get(GAME_LIST_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_follows_genre_changes(self):
+        """The index follows the game genre changes"""
+        self.assertEqual(self.get_names(genre=self.puzzle.id), [])
+
+        self.game3.genre.add(self.puzzle)
+        self.assertEqual(self.get_names(genre=self.puzzle.id), ["Game3"])
+
+        self.puzzle.game_set.clear()
+        self.assertEqual(self.get_names(genre=self.puzzle.id), [])
+
+    def test_filter_paths(self):
+        """The projection and snapshot paths filter the same way"""
+        genres = f"{self.action.id},{self.racing.id}"
+        for setting in ("PROJECTION_READ_PATH", "CATALOG_SNAPSHOT"):
+            with patch(f"game.views.{setting}", True):
+                self.assertEqual(self.get_names(genre=genres),
+                                 ["Game1", "Game2"])
+                res = self.client.get(GAME_LIST_URL,
+                                      {"genre": genres, "page_size": 1})
+                res = self.client.get(res.data["next"])
+                self.assertEqual(res.data["results"][0]["name"], "Game2")
+                self.assertIsNone(res.data["next"])
+
+    def test_filter_detail(self):
+        """The filter only applies to the list"""
+        res = self.client.get(game_detail_url(self.game3.id),
+                              {"genre": self.action.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class GenreIndexTests(TestCase):
+    """Test the genre bitmap index"""
+
+    def test_match(self):
+        """Bitmaps are combined with OR and AND"""
+        index = GenreIndex(None, [(1, 3), (1, 70000), (2, 70000), (2, 8)])
+
+        self.assertEqual(index.game_ids(index.match([1, 2])),
+                         [3, 8, 70000])
+        self.assertEqual(index.game_ids(index.match([1, 2], True)),
+                         [70000])
+        self.assertEqual(index.game_ids(index.match([3])), [])
+        self.assertEqual(index.game_ids(index.match([])), [])
@@ -1,12 +1,23 @@
+import json
+from base64 import b64decode, b64encode
+from datetime import timedelta
+from urllib.parse import parse_qs, urlencode, urlparse
+from unittest.mock import patch
 from game.models import PlaySession
+from game.serializers import PlaySessionSerializer
+from game.views import PlaySessionViewSet
 from common.date_utils import convert_str_date
+from common.pagination import PlaySessionCursorPagination
 from common.tests.utils import (
     create_user,
     create_game,
     create_genres,
+    create_expected_data,
     create_expected_data_list,
+    assert_indexed_query,
 )
 from django.test import TestCase
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -14,6 +25,7 @@ from rest_framework import status
 
 
 PLAY_SESSION_URL = reverse("game:playsession-list")
+MY_PLAY_SESSION_URL = reverse("game:my-playsession-list")
 BIRTHDATE = convert_str_date("1987-09-10")
 
 
@@ -22,6 +34,11 @@ def detail_url(play_session_id):
     return reverse("game:playsession-detail", args=[play_session_id])
 
 
+def user_play_session_url(user_id):
+    """Return the play session history url of a user"""
+    return reverse("game:user-playsession-list", args=[user_id])
+
+
 def get_play_session(id):
     """Retreive a play session based on id"""
     return PlaySession.objects.get(pk=id)
@@ -108,10 +125,10 @@ class PrivatePlaySession(TestCase):
 
         res = self.client.get(PLAY_SESSION_URL)
         expected_data = create_expected_data_list(
-            res.data, self.user, self.game)
+            res.data["results"], self.user, self.game)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, expected_data)
+        self.assertEqual(res.data["results"], expected_data)
 
     def test_detail_play_session_user(self):
         """Get play session as authenticated user"""
@@ -164,10 +181,10 @@ class PrivatePlaySession(TestCase):
 
         res = self.client.get(PLAY_SESSION_URL)
         expected_data = create_expected_data_list(
-            res.data, self.super_user, self.game)
+            res.data["results"], self.super_user, self.game)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, expected_data)
+        self.assertEqual(res.data["results"], expected_data)
 
     def test_detail_play_session_super_user(self):
         """Get play session as authenticated super user"""
@@ -204,3 +221,325 @@ class PrivatePlaySession(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(len(PlaySession.objects.all()), 0)
+
+
+class BulkPlaySession(TestCase):
+    """Test the play session bulk create api"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            get_user_model().objects.create_user,
+            email="nuno@b.com",
+            password="12345",
+            username="nuno",
+            birthdate=BIRTHDATE,
+        )
+        self.game1 = create_game()
+        self.game2 = create_game("Game2")
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_create_play_sessions(self):
+        """Create many play sessions with a single request"""
+        payload = [{"game": self.game1.id}, {"game": self.game2.id},
+                   {"game": self.game2.id}]
+
+        res = self.client.post(PLAY_SESSION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(
+            PlaySession.objects.filter(user=self.user).count(), 3)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_played_game, self.game2)
+
+    def test_bulk_create_looks_up_games_once(self):
+        """The games of a batch are validated with a single query"""
+        payload = [{"game": self.game1.id}] * 10 + [{"game": self.game2.id}]
+
+        # savepoint, games lookup, insert, last played update, release
+        with self.assertNumQueries(5):
+            self.client.post(PLAY_SESSION_URL, payload, format="json")
+
+    def test_bulk_create_reports_item_errors(self):
+        """Invalid items are reported by position and nothing is stored"""
+        payload = [{"game": self.game1.id}, {"game": 9999}, {},
+                   {"game": "abc"}]
+
+        res = self.client.post(PLAY_SESSION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn("game", res.data[1])
+        self.assertIn("game", res.data[2])
+        self.assertIn("game", res.data[3])
+        self.assertEqual(PlaySession.objects.count(), 0)
+
+    @patch("game.serializers.PLAYSESSION_BULK_MAX_SIZE", 2)
+    def test_bulk_create_max_size(self):
+        """Batches larger than the limit are rejected"""
+        payload = [{"game": self.game1.id}] * 3
+
+        res = self.client.post(PLAY_SESSION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PlaySession.objects.count(), 0)
+
+
+class PlaySessionHistory(TestCase):
+    """Test the streamed play session history api"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            get_user_model().objects.create_user,
+            email="nuno@b.com",
+            password="12345",
+            username="nuno",
+            birthdate=BIRTHDATE,
+        )
+        self.super_user = create_user(
+            get_user_model().objects.create_superuser,
+            email="b@b.com",
+            password="12345",
+            username="b",
+            birthdate=BIRTHDATE,
+        )
+        self.game = create_game()
+        self.game.genre.set(create_genres())
+        self.play_sessions = [create_play_session(self.user, self.game)
+                              for _ in range(3)]
+        create_play_session(self.super_user, self.game)
+
+    def get_history(self, url):
+        """Return the status and decoded body of a streamed response"""
+        res = self.client.get(url)
+        if not res.streaming:
+            return res.status_code, None
+        return res.status_code, json.loads(
+            b"".join(res.streaming_content))
+
+    def test_my_play_sessions(self):
+        """Only the sessions of the authenticated user are streamed"""
+        self.client.force_authenticate(user=self.user)
+
+        status_code, data = self.get_history(MY_PLAY_SESSION_URL)
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        expected_data = [
+            {"game": create_expected_data(self.game),
+             "creation_time": PlaySessionSerializer(
+                 play_session).data["creation_time"]}
+            for play_session in reversed(self.play_sessions)
+        ]
+        self.assertEqual(data, expected_data)
+
+    def test_my_play_sessions_empty(self):
+        """Users without sessions get an empty list"""
+        PlaySession.objects.all().delete()
+        self.client.force_authenticate(user=self.user)
+
+        status_code, data = self.get_history(MY_PLAY_SESSION_URL)
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(data, [])
+
+    def test_my_play_sessions_anonymous(self):
+        """Anonymous users have no history"""
+        status_code, _ = self.get_history(MY_PLAY_SESSION_URL)
+
+        self.assertEqual(status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_play_sessions_staff(self):
+        """Staff users can stream the sessions of any user"""
+        self.client.force_authenticate(user=self.super_user)
+
+        status_code, data = self.get_history(
+            user_play_session_url(self.user.id))
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(len(data), 3)
+
+    def test_user_play_sessions_not_staff(self):
+        """Regular users can not stream the sessions of other users"""
+        self.client.force_authenticate(user=self.user)
+
+        status_code, _ = self.get_history(
+            user_play_session_url(self.super_user.id))
+
+        self.assertEqual(status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PlaySessionSparseFieldsTests(TestCase):
+    """Test the ?fields= and ?expand= play session parameters"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            get_user_model().objects.create_user,
+            email="nuno@b.com",
+            password="12345",
+            username="nuno",
+            birthdate=BIRTHDATE,
+        )
+        self.game = create_game()
+        self.game.genre.set(create_genres())
+        self.play_session = create_play_session(self.user, self.game)
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_play_session_fields(self):
+        """Only the selected fields are rendered"""
+        res = self.client.get(PLAY_SESSION_URL,
+                              {"fields": "game.name,creation_time"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"], [{
+            "game": {"name": self.game.name},
+            "creation_time": res.data["results"][0]["creation_time"],
+        }])
+
+    def test_list_play_session_expand(self):
+        """Only the expanded objects are nested, others are keys"""
+        res = self.client.get(PLAY_SESSION_URL, {"expand": "game"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        result = res.data["results"][0]
+        self.assertEqual(result["user"], self.user.id)
+        self.assertEqual(result["game"]["name"], self.game.name)
+        self.assertEqual(len(result["game"]["genre"]),
+                         self.game.genre.count())
+
+    def test_detail_play_session_not_expanded(self):
+        """A play session without expansion only needs one query"""
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(self.play_session.id),
+                                  {"expand": ""})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["user"], self.user.id)
+        self.assertEqual(res.data["game"], self.game.id)
+
+    def test_list_play_session_select_related(self):
+        """An expanded game without genres is joined, not prefetched"""
+        with self.assertNumQueries(1):
+            res = self.client.get(PLAY_SESSION_URL,
+                                  {"fields": "game.name", "expand": "game"})
+
+        self.assertEqual(res.data["results"],
+                         [{"game": {"name": self.game.name}}])
+
+
+class PlaySessionQueryPlanTests(TestCase):
+    """Test the play session queries are answered from an index"""
+
+    def setUp(self):
+        self.user = create_user(
+            get_user_model().objects.create_user,
+            email="nuno@b.com",
+            password="12345",
+            username="nuno",
+            birthdate=BIRTHDATE,
+        )
+        self.game = create_game()
+        for _ in range(20):
+            create_play_session(self.user, self.game)
+
+    def test_latest_session_for_user(self):
+        """The latest session of a user is read from an index"""
+        queryset = PlaySession.objects.filter(
+            user=self.user).order_by("-creation_time")[:1]
+        assert_indexed_query(self, queryset)
+
+    def test_game_sessions_in_time_range(self):
+        """The sessions of a game in a time range are read from an index"""
+        now = timezone.now()
+        queryset = PlaySession.objects.filter(
+            game=self.game,
+            creation_time__range=(now - timedelta(days=1), now),
+        ).order_by("creation_time")
+        assert_indexed_query(self, queryset)
+
+    def test_list_play_session_page(self):
+        """A play session list page is read from an index"""
+        queryset = PlaySessionViewSet.queryset.order_by(
+            "creation_time", "id")[:50]
+        assert_indexed_query(self, queryset)
+
+
+class PlaySessionPaginationTests(TestCase):
+    """Test the play session list keyset pagination"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            get_user_model().objects.create_superuser,
+            email="nuno@b.com",
+            password="12345",
+            username="nuno",
+            birthdate=BIRTHDATE,
+        )
+        self.client.force_authenticate(user=self.user)
+        # Sessions stored by one bulk request share their creation time
+        creation_time = timezone.now()
+        for i in range(5):
+            PlaySession.objects.create(user=self.user,
+                                       game=create_game(f"Game{i}"),
+                                       creation_time=creation_time)
+        self.names = list(PlaySession.objects.order_by("id")
+                          .values_list("game__name", flat=True))
+
+    def follow(self, url, link):
+        """Return the games of every page reached following a link"""
+        pages = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            cursor = parse_qs(urlparse(url).query).get("cursor")
+            if cursor:
+                # Ties are paged by position, never by an offset
+                self.assertNotIn("o=", b64decode(cursor[0]).decode())
+            pages.append([session["game"]["name"]
+                          for session in res.data["results"]])
+            url = res.data[link]
+        return pages
+
+    def test_list_play_sessions_with_the_same_creation_time(self):
+        """Following the cursors walks every tied session once"""
+        pages = self.follow(PLAY_SESSION_URL + "?page_size=2", "next")
+
+        self.assertEqual(pages, [self.names[0:2], self.names[2:4],
+                                 self.names[4:]])
+
+    def test_list_play_sessions_previous_pages(self):
+        """Following the previous cursors walks the ties back"""
+        res = self.client.get(PLAY_SESSION_URL, {"page_size": 2})
+        res = self.client.get(res.data["next"])
+        res = self.client.get(res.data["next"])
+
+        pages = self.follow(res.data["previous"], "previous")
+
+        self.assertEqual(pages, [self.names[2:4], self.names[0:2]])
+
+    def test_list_play_sessions_invalid_cursor(self):
+        """A forged cursor is rejected"""
+        positions = ("x", '["x", "1"]', '["2021-01-01T00:00:00Z", "x"]')
+        for position in positions:
+            cursor = b64encode(urlencode({"p": position}).encode()).decode()
+            res = self.client.get(PLAY_SESSION_URL, {"cursor": cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_play_session_keyset_page(self):
+        """A following page is read from the (creation_time, id) index"""
+        pagination = PlaySessionCursorPagination()
+        play_session = PlaySession.objects.get(game__name=self.names[1])
+        position = pagination._get_position_from_instance(
+            play_session, pagination.ordering)
+
+        queryset = PlaySessionViewSet.queryset.filter(
+            pagination.keyset_filter(position, False)
+        ).order_by("creation_time", "id")[:50]
+
+        self.assertEqual([session.game.name for session in queryset],
+                         self.names[2:])
+        assert_indexed_query(self, queryset)
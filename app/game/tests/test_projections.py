@@ -0,0 +1,87 @@
+from datetime import datetime
+from unittest.mock import patch
+from common.date_utils import convert_str_date
+from common.tests.utils import create_user, create_game, create_genres
+from game.models import Game, PlaySession
+from game.projections import game_rows, play_session_rows, \
+    project_games, project_play_sessions
+from game.serializers import GameSerializer, PlaySessionSerializer
+from game.tests import test_games, test_play_sessions
+from django.test import TestCase, RequestFactory
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+
+BIRTHDATE = convert_str_date("1987-09-10")
+
+
+class GameProjectionTests(TestCase):
+    """Test the projection read path renders like the serializers"""
+
+    def setUp(self):
+        self.request = RequestFactory().get("/")
+        self.user = create_user(
+            get_user_model().objects.create_user,
+            email="nuno@b.com",
+            password="12345",
+            username="nuno",
+            birthdate=BIRTHDATE,
+        )
+        self.user.image = "uploads/user/avatar.jpg"
+        self.user.image_thumbnailed = True
+        self.user.save()
+        genres = create_genres()
+        self.game1 = create_game()
+        self.game1.genre.set(genres)
+        self.game2 = create_game("Game2")
+        self.game3 = create_game("Game3")
+        self.game3.genre.set(genres[:1])
+        PlaySession.objects.create(
+            user=self.user, game=self.game1,
+            creation_time=datetime(2021, 3, 4, 5, 6, 7, 891011,
+                                   tzinfo=timezone.utc))
+        PlaySession.objects.create(user=self.user, game=self.game3)
+
+    def test_project_games(self):
+        """Game rows render like GameSerializer"""
+        expected = GameSerializer(
+            Game.objects.prefetch_related("genre").order_by("id"),
+            many=True).data
+
+        self.assertEqual(project_games(list(game_rows().order_by("id"))),
+                         expected)
+
+    def test_project_play_sessions(self):
+        """Play session rows render like PlaySessionSerializer"""
+        expected = PlaySessionSerializer(
+            PlaySession.objects.order_by("id"), many=True,
+            context={"request": self.request}).data
+
+        rows = list(play_session_rows().order_by("id"))
+        self.assertEqual(project_play_sessions(rows, self.request), expected)
+
+    def test_project_play_sessions_queries(self):
+        """A page of play sessions costs the rows and one genre query"""
+        rows = list(play_session_rows())
+        with self.assertNumQueries(1):
+            project_play_sessions(rows)
+
+
+@patch("game.views.PROJECTION_READ_PATH", True)
+class ProjectedPublicGameAPITests(test_games.PublicGameAPITests):
+    """Rerun the public game tests on the projection read path"""
+
+
+@patch("game.views.PROJECTION_READ_PATH", True)
+class ProjectedPrivateGameAPITests(test_games.PrivateGameAPITests):
+    """Rerun the private game tests on the projection read path"""
+
+
+@patch("game.views.PROJECTION_READ_PATH", True)
+class ProjectedGamePaginationAPITests(test_games.GamePaginationAPITests):
+    """Rerun the game pagination tests on the projection read path"""
+
+
+@patch("game.views.PROJECTION_READ_PATH", True)
+class ProjectedPrivatePlaySession(test_play_sessions.PrivatePlaySession):
+    """Rerun the private play session tests on the projection read path"""
@@ -0,0 +1,237 @@
+from io import StringIO
+from itertools import permutations
+import numpy as np
+from common.date_utils import convert_str_date
+from common.tests.utils import create_user, create_game
+from game.models import GameCoPlay, PlaySession
+from game.recommendations import basket_pairs, pair_batches, \
+    merge_counts, PairCounter, compute_co_plays, refresh_co_plays, \
+    recommend_games
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+
+MY_RECOMMENDATIONS_URL = reverse("game:my-recommendation-list")
+
+
+class CoPlayFunctionsTests(TestCase):
+    """Test the array helpers of the co-play computation"""
+
+    def test_basket_pairs(self):
+        """Every ordered pair of games of the same basket is returned"""
+        users = np.array([0, 0, 0, 1, 2, 2])
+        games = np.array([1, 4, 7, 3, 2, 5])
+        left, right = basket_pairs(users, games)
+
+        self.assertEqual(
+            sorted(zip(left.tolist(), right.tolist())),
+            sorted(list(permutations([1, 4, 7], 2))
+                   + list(permutations([2, 5], 2))),
+        )
+
+    def test_basket_pairs_of_selected_games(self):
+        """Only the selected games are paired on the left"""
+        users = np.array([0, 0, 0, 1, 1])
+        games = np.array([1, 4, 7, 3, 2])
+        left, right = basket_pairs(
+            users, games, np.array([True, False, True, False, False]))
+
+        self.assertEqual(sorted(zip(left.tolist(), right.tolist())),
+                         [(1, 4), (1, 7), (7, 1), (7, 4)])
+
+    def test_pair_batches(self):
+        """Batches hold whole baskets and stay within the budget"""
+        users = np.repeat(np.arange(5), [3, 1, 4, 2, 2])
+        left_games = np.ones(len(users), dtype=bool)
+
+        self.assertEqual(
+            [(int(start), int(end))
+             for start, end in pair_batches(users, left_games, 10)],
+            [(0, 4), (4, 8), (8, 12)],
+        )
+        # A basket larger than the budget is a batch of its own
+        self.assertEqual(
+            [(int(start), int(end))
+             for start, end in pair_batches(users, left_games, 1)],
+            [(0, 3), (3, 4), (4, 8), (8, 10), (10, 12)],
+        )
+
+    def test_merge_counts(self):
+        """Counts of the same keys are added up"""
+        keys, counts = merge_counts(
+            (np.array([2, 5]), np.array([1.0, 3.0])),
+            (np.array([2, 5, 9]), np.array([1, 2, 2])),
+        )
+
+        self.assertEqual(keys.tolist(), [2, 5, 9])
+        self.assertEqual(counts.tolist(), [2, 5, 2])
+
+    def test_pair_counter(self):
+        """Batches counted apart add up like a single count"""
+        rng = np.random.default_rng(0)
+        batches = [rng.integers(0, 50, size) for size in (3, 40, 1, 200, 7)]
+        counter = PairCounter()
+        for batch in batches:
+            counter.add(batch)
+
+        keys, counts = counter.totals()
+        expected_keys, expected_counts = np.unique(
+            np.concatenate(batches), return_counts=True)
+        self.assertEqual(keys.tolist(), expected_keys.tolist())
+        self.assertEqual(counts.tolist(), expected_counts.tolist())
+
+
+class GameCoPlayTests(TestCase):
+    """Test the precomputed games played together"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.games = [create_game(f"Game{i}") for i in range(8)]
+        self.users = [
+            create_user(
+                get_user_model().objects.create_user,
+                email=f"user{i}@a.com",
+                password="12345",
+                username=f"user{i}",
+                birthdate=convert_str_date("1987-09-10"),
+            )
+            for i in range(10)
+        ]
+        self.baskets = {}
+        for i, user in enumerate(self.users):
+            games = [game for j, game in enumerate(self.games)
+                     if (i + j) % 3 == 0 or j == i % 4]
+            self.baskets[user.id] = {game.id for game in games}
+            # Played twice, only counted once
+            for game in games + games[:1]:
+                PlaySession.objects.create(user=user, game=game)
+
+    def expected_co_plays(self, top_n, max_basket):
+        """Count the players of every pair of games one basket at a time"""
+        baskets = [basket for basket in self.baskets.values()
+                   if len(basket) <= max_basket]
+        players = {game.id: sum(game.id in basket for basket in baskets)
+                   for game in self.games}
+
+        scores = {game.id: [] for game in self.games}
+        for a, b in permutations(players, 2):
+            shared = sum(a in basket and b in basket for basket in baskets)
+            if shared:
+                score = shared / (players[a] * players[b]) ** 0.5
+                scores[a].append((-round(score, 6), b, shared))
+
+        return {
+            (game_id, rank, other_id, shared, -score)
+            for game_id, game_scores in scores.items()
+            for rank, (score, other_id, shared) in enumerate(
+                sorted(game_scores)[:top_n])
+        }
+
+    def test_co_plays_match_pairwise_counts(self):
+        """Chunked and partitioned counts are the same as pairwise ones"""
+        for top_n, max_basket in ((3, 100), (10, 100), (3, 3)):
+            expected = self.expected_co_plays(top_n, max_basket)
+            self.assertTrue(expected)
+            for chunk_size, partitions, pair_budget in (
+                (1, 1, 10 ** 7), (3, 3, 10 ** 7), (100, 1, 1),
+                (100, 3, 20), (3, 1, 30),
+            ):
+                co_plays = {
+                    (c.game_id, c.rank, c.other_id, c.players, c.score)
+                    for c in compute_co_plays(top_n, chunk_size,
+                                              max_basket, partitions,
+                                              pair_budget)
+                }
+                self.assertEqual(co_plays, expected)
+
+    def test_refresh_replaces_co_plays(self):
+        """The co-play table is replaced by the command"""
+        GameCoPlay.objects.create(game=self.games[0], other=self.games[1],
+                                  rank=0, players=99, score=1)
+        out = StringIO()
+        call_command("compute_co_played_games", "--top-n", "2",
+                     "--chunk-size", "4", "--partitions", "2", stdout=out)
+
+        self.assertIn("16 co-played games stored", out.getvalue())
+        self.assertFalse(GameCoPlay.objects.filter(players=99).exists())
+        self.assertEqual(refresh_co_plays(2, batch_size=3), 16)
+
+    def test_recommendations_skip_played_games(self):
+        """Recommendations sum the scores of the games played together"""
+        refresh_co_plays(top_n=10)
+        user = self.users[0]
+        played = self.baskets[user.id]
+
+        scores = {}
+        for co_play in GameCoPlay.objects.filter(game_id__in=played):
+            if co_play.other_id not in played:
+                scores[co_play.other_id] = (scores.get(co_play.other_id, 0)
+                                            + co_play.score)
+        expected = sorted(scores, key=lambda game_id: (-scores[game_id],
+                                                       game_id))
+
+        recommendations = recommend_games(user.id, 10)
+        self.assertEqual([game_id for game_id, _, _ in recommendations],
+                         expected)
+        self.assertTrue(expected)
+        self.assertFalse(played & set(expected))
+
+    def test_recommendations_of_the_last_games(self):
+        """Only the last played games are used"""
+        refresh_co_plays(top_n=10)
+        user = self.users[0]
+        last_game = PlaySession.objects.filter(user=user).latest(
+            "creation_time", "id").game_id
+
+        expected = GameCoPlay.objects.filter(game_id=last_game).exclude(
+            other_id=last_game).order_by("rank").values_list(
+            "other_id", flat=True)
+
+        recommendations = recommend_games(user.id, 10, history=1)
+        self.assertEqual([game_id for game_id, _, _ in recommendations],
+                         list(expected))
+
+    def test_recommendations_endpoint(self):
+        """The endpoint renders the recommendations of the user"""
+        refresh_co_plays(top_n=10)
+        user = self.users[1]
+        self.client.force_authenticate(user=user)
+
+        res = self.client.get(MY_RECOMMENDATIONS_URL, {"limit": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {"id": game_id, "name": name, "score": score}
+            for game_id, name, score in recommend_games(user.id, 2)
+        ])
+
+    def test_recommendations_endpoint_without_sessions(self):
+        """A user without play sessions gets no recommendations"""
+        user = create_user(
+            get_user_model().objects.create_user,
+            email="new@a.com",
+            password="12345",
+            username="new",
+            birthdate=convert_str_date("1987-09-10"),
+        )
+        self.client.force_authenticate(user=user)
+
+        res = self.client.get(MY_RECOMMENDATIONS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_recommendations_endpoint_bad_limit(self):
+        """A limit that is not a number is rejected"""
+        self.client.force_authenticate(user=self.users[0])
+        res = self.client.get(MY_RECOMMENDATIONS_URL, {"limit": "ten"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recommendations_endpoint_anonymous(self):
+        """Anonymous users have no recommendations"""
+        res = self.client.get(MY_RECOMMENDATIONS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,181 @@
+from datetime import datetime
+from io import StringIO
+from common.date_utils import convert_str_date
+from common.tests.utils import create_user, create_game
+from game.models import GamePlayDaily, GamePlayerSketch, \
+    MaterializationWatermark, PlaySession
+from game.rollups import materialize_game_play_daily, \
+    materialize_game_player_sketches, GAME_PLAY_DAILY, GAME_PLAYER_SKETCH
+from common.hyperloglog import HyperLogLog
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+
+BIRTHDATE = convert_str_date("1987-09-10")
+
+
+def game_stats_url(game_id):
+    """Return game stats url"""
+    return reverse("game:game-stats", args=[game_id])
+
+
+def game_players_url(game_id):
+    """Return game players url"""
+    return reverse("game:game-players", args=[game_id])
+
+
+def create_play_session(user, game, day, hour=12):
+    """Create a play session at a given day"""
+    creation_time = datetime.combine(
+        convert_str_date(day), datetime.min.time()).replace(
+            hour=hour, tzinfo=timezone.utc)
+    return PlaySession.objects.create(user=user, game=game,
+                                      creation_time=creation_time)
+
+
+class GamePlayDailyTests(TestCase):
+    """Test the daily game rollup"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user1 = create_user(
+            get_user_model().objects.create_user,
+            email="nuno@b.com",
+            password="12345",
+            username="nuno",
+            birthdate=BIRTHDATE,
+        )
+        self.user2 = create_user(
+            get_user_model().objects.create_user,
+            email="b@b.com",
+            password="12345",
+            username="b",
+            birthdate=BIRTHDATE,
+        )
+        self.game = create_game()
+        create_play_session(self.user1, self.game, "2024-01-01", 1)
+        create_play_session(self.user1, self.game, "2024-01-01", 2)
+        create_play_session(self.user2, self.game, "2024-01-01", 23)
+        create_play_session(self.user2, self.game, "2024-01-02")
+
+    def test_materialize_rollup(self):
+        """Sessions are counted per game and day"""
+        call_command("materialize_rollups", stdout=StringIO())
+
+        rollup = GamePlayDaily.objects.get(
+            game=self.game, day=convert_str_date("2024-01-01"))
+        self.assertEqual(rollup.sessions, 3)
+        self.assertEqual(rollup.unique_players, 2)
+
+    def test_materialize_rollup_incremental(self):
+        """Only sessions newer than the watermark are processed"""
+        self.assertEqual(materialize_game_play_daily(), 4)
+        create_play_session(self.user1, self.game, "2024-01-02")
+
+        self.assertEqual(materialize_game_play_daily(batch_size=1), 1)
+        rollup = GamePlayDaily.objects.get(
+            game=self.game, day=convert_str_date("2024-01-02"))
+        self.assertEqual(rollup.sessions, 2)
+        self.assertEqual(rollup.unique_players, 2)
+
+    def skip_sessions(self, name):
+        """Move a watermark past sessions committed out of id order"""
+        late = create_play_session(self.user1, self.game, "2024-01-02")
+        MaterializationWatermark.objects.update_or_create(
+            name=name, defaults={"last_id": late.id})
+
+    def test_rescan_late_sessions(self):
+        """Sessions skipped by the watermark are counted by the rescan"""
+        self.skip_sessions(GAME_PLAY_DAILY)
+        day = convert_str_date("2024-01-02")
+
+        self.assertEqual(materialize_game_play_daily(rescan_days=0), 0)
+        self.assertFalse(GamePlayDaily.objects.filter(day=day).exists())
+
+        materialize_game_play_daily(rescan_days=2, today=day)
+        rollup = GamePlayDaily.objects.get(game=self.game, day=day)
+        self.assertEqual(rollup.sessions, 2)
+        self.assertEqual(rollup.unique_players, 2)
+        # Older days are out of the window
+        self.assertFalse(GamePlayDaily.objects.filter(
+            day=convert_str_date("2023-12-31")).exists())
+
+    def test_rescan_deleted_sessions(self):
+        """Deleted sessions are forgotten within the rescan window"""
+        materialize_game_play_daily()
+        PlaySession.objects.filter(
+            creation_time__date=convert_str_date("2024-01-02")).delete()
+        PlaySession.objects.filter(user=self.user2).delete()
+
+        materialize_game_play_daily(today=convert_str_date("2024-01-02"))
+
+        rollup = GamePlayDaily.objects.get(
+            game=self.game, day=convert_str_date("2024-01-01"))
+        self.assertEqual(rollup.sessions, 2)
+        self.assertEqual(rollup.unique_players, 1)
+        self.assertFalse(GamePlayDaily.objects.filter(
+            day=convert_str_date("2024-01-02")).exists())
+
+    def test_rescan_sketches(self):
+        """Sketches are rebuilt from the sessions of the rescan window"""
+        self.skip_sessions(GAME_PLAYER_SKETCH)
+        PlaySession.objects.filter(user=self.user2).delete()
+
+        materialize_game_player_sketches(
+            today=convert_str_date("2024-01-02"))
+
+        sketches = {
+            sketch.day.isoformat(): HyperLogLog.from_bytes(
+                sketch.registers).estimate()
+            for sketch in GamePlayerSketch.objects.filter(game=self.game)
+        }
+        self.assertEqual({day: round(estimate)
+                          for day, estimate in sketches.items()},
+                         {"2024-01-01": 1, "2024-01-02": 1})
+
+    def test_get_game_stats(self):
+        """The stats endpoint reads the rollup in a date range"""
+        materialize_game_play_daily()
+
+        res = self.client.get(game_stats_url(self.game.id),
+                              {"from": "2024-01-02", "to": "2024-01-31"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["sessions"], 1)
+        self.assertEqual(res.data["days"], [
+            {"day": "2024-01-02", "sessions": 1, "unique_players": 1}])
+
+    def test_get_game_stats_invalid_date(self):
+        """Invalid dates are rejected"""
+        res = self.client.get(game_stats_url(self.game.id), {"from": "x"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_game_stats_missing_game(self):
+        """Unknown games return not found"""
+        res = self.client.get(game_stats_url(9999))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_game_players(self):
+        """Unique players are estimated from the merged sketches"""
+        materialize_game_player_sketches(batch_size=3)
+        create_play_session(self.user1, self.game, "2024-01-03")
+        materialize_game_player_sketches()
+
+        res = self.client.get(game_players_url(self.game.id),
+                              {"from": "2024-01-02"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["unique_players"], 2)
+        self.assertLessEqual(res.data["lower"], 2)
+        self.assertGreaterEqual(res.data["upper"], 2)
+        self.assertEqual(res.data["days"], [
+            {"day": "2024-01-02", "unique_players": 1},
+            {"day": "2024-01-03", "unique_players": 1},
+        ])
@@ -0,0 +1,95 @@
+from datetime import date
+from common.tests.utils import create_game
+from game.models import GamePlayDaily
+from game.search import GameSearchIndex, normalize, trigrams
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+
+GAME_SEARCH_URL = reverse("game:game-search")
+
+
+class GameSearchIndexTests(SimpleTestCase):
+    """Test the in-memory game name index"""
+
+    def setUp(self):
+        self.index = GameSearchIndex(None, {
+            1: "Call of Duty",
+            2: "Duty Calls",
+            3: "Calling",
+            4: "Pokémon Red",
+            5: "Halo",
+        }, {1: 10, 2: 50, 3: 100})
+
+    def search(self, query, limit=10):
+        return [game_id for game_id, _ in self.index.search(query, limit)]
+
+    def test_normalize(self):
+        """Case, accents and spaces are ignored"""
+        self.assertEqual(normalize("  PokéMON   Red "), "pokemon red")
+        self.assertEqual(trigrams("ab"), {"  a", " ab", "ab "})
+
+    def test_name_prefix_first(self):
+        """Names starting with the query rank before word matches"""
+        self.assertEqual(self.search("call"), [3, 1, 2])
+
+    def test_word_prefix(self):
+        """Any word of a name can match"""
+        self.assertEqual(self.search("duty"), [2, 1])
+        self.assertEqual(self.search("of d"), [1])
+
+    def test_popularity(self):
+        """The most played games come first within a group"""
+        self.assertEqual(self.search("c"), [3, 1, 2])
+
+    def test_accents(self):
+        """Queries match regardless of case and accents"""
+        self.assertEqual(self.search("POKEMON"), [4])
+
+    def test_fuzzy(self):
+        """Misspelled names are found after the prefix matches"""
+        self.assertEqual(self.search("hallo"), [5])
+        self.assertEqual(self.search("pokmon red"), [4])
+
+    def test_limit(self):
+        """The result is cut to the limit"""
+        self.assertEqual(self.search("c", 1), [3])
+        self.assertEqual(self.search(""), [])
+
+
+class GameSearchAPITests(TestCase):
+    """Test the game search API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.game1 = create_game("Game One")
+        self.game2 = create_game("Game Two")
+        GamePlayDaily.objects.create(game=self.game2, day=date(2021, 1, 1),
+                                     sessions=5)
+
+    def test_search_games(self):
+        """The matching games are returned, the most played first"""
+        res = self.client.get(GAME_SEARCH_URL, {"q": "game"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {"id": self.game2.id, "name": "Game Two"},
+            {"id": self.game1.id, "name": "Game One"},
+        ])
+
+    def test_search_new_game(self):
+        """The index follows the catalog changes"""
+        self.client.get(GAME_SEARCH_URL, {"q": "zelda"})
+        game = create_game("Zelda")
+
+        res = self.client.get(GAME_SEARCH_URL, {"q": "zel"})
+
+        self.assertEqual(res.data, [{"id": game.id, "name": "Zelda"}])
+
+    def test_search_invalid_limit(self):
+        """An invalid limit is rejected"""
+        res = self.client.get(GAME_SEARCH_URL, {"q": "game", "limit": "a"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
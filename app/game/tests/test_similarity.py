@@ -0,0 +1,102 @@
+from io import StringIO
+from itertools import combinations
+from common.tests.utils import create_game
+from game.models import Genre, GameNeighbour
+from game.similarity import compute_game_neighbours, refresh_game_neighbours
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+
+def game_similar_url(game_id):
+    """Return game similar url"""
+    return reverse("game:game-similar", args=[game_id])
+
+
+class GameNeighbourTests(TestCase):
+    """Test the precomputed similar games"""
+
+    def setUp(self):
+        self.client = APIClient()
+        genres = [Genre.objects.create(name=f"Genre{i}") for i in range(10)]
+        self.games = [create_game(f"Game{i}") for i in range(12)]
+        for i, game in enumerate(self.games):
+            game.genre.set([genre for j, genre in enumerate(genres)
+                            if (i + 1) & (1 << (j % 4)) and j < 9 - i % 3])
+        self.genres = {game.id: set(game.genre.values_list("id", flat=True))
+                       for game in self.games}
+
+    def expected_neighbours(self, k, metric):
+        """Compute the neighbours of every game pair by pair"""
+        scores = {game_id: [] for game_id in self.genres}
+        for a, b in combinations(sorted(self.genres), 2):
+            shared = len(self.genres[a] & self.genres[b])
+            if metric == "jaccard":
+                union = len(self.genres[a] | self.genres[b])
+                score = shared / union if union else 0
+            else:
+                norm = (len(self.genres[a]) * len(self.genres[b])) ** 0.5
+                score = shared / norm if norm else 0
+            if score > 0:
+                scores[a].append((-round(score, 6), b))
+                scores[b].append((-round(score, 6), a))
+
+        return {
+            (game_id, rank, neighbour_id, -score)
+            for game_id, game_scores in scores.items()
+            for rank, (score, neighbour_id) in enumerate(
+                sorted(game_scores)[:k])
+        }
+
+    def test_neighbours_match_pairwise_scores(self):
+        """Blocked neighbours are the same as pairwise ones"""
+        self.assertEqual(len(self.expected_neighbours(3, "jaccard")), 36)
+        for metric in ("jaccard", "cosine"):
+            for block_size in (1, 5, 100):
+                neighbours = {
+                    (n.game_id, n.rank, n.neighbour_id, n.score)
+                    for n in compute_game_neighbours(3, block_size, metric)
+                }
+                self.assertEqual(neighbours,
+                                 self.expected_neighbours(3, metric))
+
+    def test_refresh_replaces_the_table(self):
+        """The neighbour table is replaced on every run"""
+        refresh_game_neighbours(k=2)
+        stored = refresh_game_neighbours(k=3)
+
+        self.assertEqual(GameNeighbour.objects.count(), stored)
+        self.assertEqual(stored, len(self.expected_neighbours(3, "jaccard")))
+
+    def test_similar_games(self):
+        """The neighbours of a game are read from the table"""
+        call_command("compute_similar_games", k=3, stdout=StringIO())
+        game = self.games[0]
+
+        res = self.client.get(game_similar_url(game.id), {"limit": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = {game.id: game.name for game in self.games}
+        expected = sorted(
+            (rank, neighbour_id, score)
+            for game_id, rank, neighbour_id, score
+            in self.expected_neighbours(2, "jaccard") if game_id == game.id)
+        self.assertEqual(res.data, [
+            {"id": neighbour_id, "name": names[neighbour_id], "score": score}
+            for _, neighbour_id, score in expected
+        ])
+
+    def test_similar_games_not_found(self):
+        """Unknown games are not found"""
+        res = self.client.get(game_similar_url(1000))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_similar_games_invalid_id(self):
+        """Ids that are not numbers are rejected"""
+        for params in ({}, {"limit": "ten"}):
+            res = self.client.get(game_similar_url("abc"), params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,133 @@
+from unittest.mock import patch
+from common.tests.utils import create_game, create_genres
+from game.catalog import catalog_version
+from game.models import Genre
+from game.snapshot import catalog_snapshot
+from game.tests import test_games
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+
+GAME_LIST_URL = reverse("game:game-list")
+
+
+def game_detail_url(game_id):
+    """Return game detail url"""
+    return reverse("game:game-detail", args=[game_id])
+
+
+def walk_pages(client, url):
+    """Return the bodies of every page forward then backward"""
+    bodies = []
+    for link in ("next", "previous"):
+        while url:
+            res = client.get(url)
+            bodies.append(res.content)
+            next_url = res.json()[link]
+            if not next_url:
+                break
+            url = next_url
+    return bodies
+
+
+class CatalogSnapshotTests(TestCase):
+    """Test the game catalog is served from the snapshot"""
+
+    def setUp(self):
+        self.client = APIClient()
+        genres = create_genres()
+        self.games = [create_game(f"Game{i}") for i in range(7)]
+        for i, game in enumerate(self.games):
+            game.genre.set(genres[:i % 3])
+
+    def test_pages_match_the_database(self):
+        """The snapshot pages are the same bytes as the database pages"""
+        url = GAME_LIST_URL + "?page_size=3"
+        expected = walk_pages(self.client, url)
+
+        with patch("game.views.CATALOG_SNAPSHOT", True):
+            bodies = walk_pages(self.client, url)
+
+        self.assertEqual(len(bodies), 6)
+        self.assertEqual(bodies, expected)
+
+    @patch("game.views.CATALOG_SNAPSHOT", True)
+    def test_list_without_queries(self):
+        """A loaded snapshot is served without any query"""
+        self.client.get(GAME_LIST_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(GAME_LIST_URL)
+
+        self.assertEqual(len(res.data["results"]), 7)
+
+    @patch("game.views.CATALOG_SNAPSHOT", True)
+    def test_detail_game(self):
+        """A game is served from the snapshot"""
+        game = self.games[2]
+        expected = self.client.get(game_detail_url(game.id),
+                                   {"fields": "name,genre"})
+        catalog_snapshot.get()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(game_detail_url(game.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, expected.content)
+
+    @patch("game.views.CATALOG_SNAPSHOT", True)
+    def test_detail_game_not_found(self):
+        """Unknown games are not found"""
+        for game_id in (0, 1000):
+            res = self.client.get(game_detail_url(game_id))
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch("game.views.CATALOG_SNAPSHOT", True)
+    def test_reload_on_change(self):
+        """A catalog change swaps in a new snapshot"""
+        snapshot = catalog_snapshot.get()
+        Genre.objects.filter(pk=self.games[1].genre.first().pk).update(
+            name="Renamed")
+        self.games[1].save()
+
+        res = self.client.get(game_detail_url(self.games[1].id))
+
+        self.assertIsNot(catalog_snapshot.get(), snapshot)
+        self.assertEqual(snapshot.get(self.games[1].id).data["genre"][0]
+                         ["name"], "Shooter")
+        self.assertEqual(res.data["genre"][0]["name"], "Renamed")
+
+    @patch("game.views.CATALOG_SNAPSHOT", True)
+    def test_browsable_api(self):
+        """Other renderers render the snapshot data"""
+        res = self.client.get(GAME_LIST_URL, HTTP_ACCEPT="text/html")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(b"Game6", res.content)
+
+    @patch("game.views.CATALOG_SNAPSHOT", True)
+    def test_not_modified(self):
+        """A matching If-None-Match still returns 304"""
+        catalog_version.expire()
+        etag = self.client.get(GAME_LIST_URL)["ETag"]
+
+        res = self.client.get(GAME_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+@patch("game.views.CATALOG_SNAPSHOT", True)
+class SnapshotPublicGameAPITests(test_games.PublicGameAPITests):
+    """Rerun the public game tests on the catalog snapshot"""
+
+
+@patch("game.views.CATALOG_SNAPSHOT", True)
+class SnapshotPrivateGameAPITests(test_games.PrivateGameAPITests):
+    """Rerun the private game tests on the catalog snapshot"""
+
+
+@patch("game.views.CATALOG_SNAPSHOT", True)
+class SnapshotGamePaginationAPITests(test_games.GamePaginationAPITests):
+    """Rerun the game pagination tests on the catalog snapshot"""
@@ -0,0 +1,123 @@
+import fcntl
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+from common.date_utils import convert_str_date
+from common.tests.utils import create_user, create_game
+from game.models import PlaySession
+from game.spool import PlaySessionSpool
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+
+PLAY_SESSION_URL = reverse("game:playsession-list")
+BIRTHDATE = convert_str_date("1987-09-10")
+
+
+class WriteBehindPlaySession(TestCase):
+    """Test the write-behind play session pipeline"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            get_user_model().objects.create_user,
+            email="nuno@b.com",
+            password="12345",
+            username="nuno",
+            birthdate=BIRTHDATE,
+        )
+        self.game = create_game()
+        self.client.force_authenticate(user=self.user)
+
+        self.spool_dir = tempfile.TemporaryDirectory()
+        self.spool = PlaySessionSpool(self.spool_dir.name, 1024)
+        patchers = [
+            patch("game.views.PLAYSESSION_WRITE_BEHIND", True),
+            patch("game.views.playsession_spool", self.spool),
+            patch("game.management.commands.flush_playsessions."
+                  "playsession_spool", self.spool),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.spool_dir.cleanup)
+
+    def test_create_play_session_is_queued(self):
+        """Play sessions are queued instead of stored"""
+        res = self.client.post(PLAY_SESSION_URL, {"game": self.game.id})
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(PlaySession.objects.count(), 0)
+        self.assertEqual(self.spool.depth(), 1)
+
+    def test_create_invalid_play_session_is_rejected(self):
+        """Play sessions are validated before they are queued"""
+        res = self.client.post(PLAY_SESSION_URL, {"game": 9999})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.spool.depth(), 0)
+
+    def test_flush_play_sessions(self):
+        """The flush command stores the queued play sessions"""
+        self.client.post(PLAY_SESSION_URL, {"game": self.game.id})
+        self.client.post(PLAY_SESSION_URL, [{"game": self.game.id}] * 2,
+                         format="json")
+
+        call_command("flush_playsessions", stdout=StringIO())
+
+        self.assertEqual(PlaySession.objects.count(), 3)
+        self.assertEqual(self.spool.depth(), 0)
+        self.assertEqual(self.spool.stats()["last_flush_events"], 3)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_played_game, self.game)
+
+    def test_full_spool_is_rejected(self):
+        """Requests are rejected once the spool is full"""
+        self.spool.max_bytes = 1
+
+        res = self.client.post(PLAY_SESSION_URL, {"game": self.game.id})
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn("Retry-After", res)
+
+    def test_spool_limit_is_checked_under_the_lock(self):
+        """Concurrent appenders can not all pass the size limit at once"""
+        active_path = os.path.join(self.spool_dir.name,
+                                   PlaySessionSpool.active_name)
+        size = self.spool.size
+        locked = []
+
+        def checked_size():
+            with open(active_path, "ab") as spool:
+                try:
+                    fcntl.flock(spool, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    locked.append(False)
+                except BlockingIOError:
+                    locked.append(True)
+            return size()
+
+        with patch.object(self.spool, "size", side_effect=checked_size):
+            self.client.post(PLAY_SESSION_URL, {"game": self.game.id})
+
+        self.assertEqual(locked, [True])
+
+    def test_depth_of_a_large_spool_is_estimated(self):
+        """The depth of a spool larger than the sample is estimated"""
+        self.spool.max_bytes = 1024 * 1024
+        for _ in range(100):
+            self.client.post(PLAY_SESSION_URL, {"game": self.game.id})
+        self.spool.rotate()
+        self.client.post(PLAY_SESSION_URL, [{"game": self.game.id}] * 50,
+                         format="json")
+
+        self.assertEqual(self.spool.depth(), 150)
+        self.spool.depth_sample_bytes = 1024
+        with patch("builtins.open", wraps=open) as opened:
+            self.assertEqual(self.spool.depth(), 150)
+        self.assertEqual(opened.call_count, 1)
@@ -0,0 +1,164 @@
+from datetime import timedelta
+from common.date_utils import convert_str_date
+from common.tests.utils import create_user, create_game
+from game.models import PlaySession
+from game.trending import SpaceSaving, TrendingGames, trending_games
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+
+TRENDING_URL = reverse("game:game-trending")
+BIRTHDATE = convert_str_date("1987-09-10")
+
+
+def create_play_sessions(user, game, count, age=timedelta()):
+    """Create play sessions of a game some time ago"""
+    return [
+        PlaySession.objects.create(user=user, game=game,
+                                   creation_time=timezone.now() - age)
+        for _ in range(count)
+    ]
+
+
+class SpaceSavingTests(TestCase):
+    """Test the space-saving sketch"""
+
+    def test_counters_are_bounded(self):
+        """The sketch keeps at most its capacity and the heavy hitters"""
+        sketch = SpaceSaving(2)
+        for key in ["a"] * 5 + ["b", "c", "d"]:
+            sketch.add(key)
+
+        self.assertEqual(len(sketch.counters), 2)
+        self.assertEqual(sketch.counters["a"], 5)
+
+
+class TrendingGamesTests(TestCase):
+    """Test the trending games API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            get_user_model().objects.create_user,
+            email="nuno@b.com",
+            password="12345",
+            username="nuno",
+            birthdate=BIRTHDATE,
+        )
+        self.game1 = create_game()
+        self.game2 = create_game("Game2")
+        trending_games.reset()
+
+    def test_get_trending_games(self):
+        """Games are ranked by sessions in the window"""
+        create_play_sessions(self.user, self.game1, 1)
+        create_play_sessions(self.user, self.game2, 2)
+        create_play_sessions(self.user, self.game1, 5, timedelta(hours=3))
+
+        res = self.client.get(TRENDING_URL, {"window": "1h"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {"id": self.game2.id, "name": "Game2", "sessions": 2},
+            {"id": self.game1.id, "name": "Game1", "sessions": 1},
+        ])
+
+    def test_get_trending_games_limit(self):
+        """The number of games is limited"""
+        create_play_sessions(self.user, self.game1, 1)
+        create_play_sessions(self.user, self.game2, 2)
+
+        res = self.client.get(TRENDING_URL, {"window": "1d", "limit": 1})
+
+        self.assertEqual([game["id"] for game in res.data], [self.game2.id])
+
+    def test_get_trending_games_invalid_window(self):
+        """Invalid windows are rejected"""
+        res = self.client.get(TRENDING_URL, {"window": "abc"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_record_play_session(self):
+        """Sessions recorded in sequence are counted without a refresh"""
+        trending = TrendingGames(60, 3600, 10, refresh_seconds=3600)
+        trending.top(3600, 10)
+        play_session = create_play_sessions(self.user, self.game1, 1)[0]
+
+        trending.record(play_session)
+
+        self.assertEqual(trending.top(3600, 10), [(self.game1.id, 1)])
+
+    def test_refresh_picks_up_other_sessions(self):
+        """Sessions stored elsewhere are read from the db once"""
+        trending = TrendingGames(60, 3600, 10, refresh_seconds=0)
+        trending.top(3600, 10)
+        play_session = create_play_sessions(self.user, self.game1, 1)[0]
+
+        self.assertEqual(trending.top(3600, 10), [(self.game1.id, 1)])
+        trending.record(play_session)
+        self.assertEqual(trending.top(3600, 10), [(self.game1.id, 1)])
+
+    def test_refresh_picks_up_sessions_committed_late(self):
+        """A lower id committed after a higher one is still counted"""
+        trending = TrendingGames(60, 3600, 10, refresh_seconds=0,
+                                 safety_lag=3600)
+        trending.top(3600, 10)
+        late, _ = create_play_sessions(self.user, self.game1, 2)
+        late_id = late.id
+        late.delete()
+
+        self.assertEqual(trending.top(3600, 10), [(self.game1.id, 1)])
+        PlaySession.objects.create(id=late_id, user=self.user,
+                                   game=self.game2)
+        self.assertEqual(trending.top(3600, 10),
+                         [(self.game1.id, 1), (self.game2.id, 1)])
+
+    def test_record_out_of_sequence(self):
+        """Sessions recorded in any order are counted once"""
+        trending = TrendingGames(60, 3600, 10, refresh_seconds=3600)
+        trending.top(3600, 10)
+        first, second = create_play_sessions(self.user, self.game1, 2)
+
+        trending.record(second)
+        trending.record(first)
+        trending.record(second)
+
+        self.assertEqual(trending.top(3600, 10), [(self.game1.id, 2)])
+
+    def test_safe_id_forgets_seen_ids(self):
+        """Ids older than the safety lag are not read nor kept again"""
+        trending = TrendingGames(60, 3600, 10, refresh_seconds=0,
+                                 safety_lag=0)
+        create_play_sessions(self.user, self.game1, 3)
+
+        # max id, safe id and the sessions
+        with self.assertNumQueries(3):
+            self.assertEqual(trending.top(3600, 10), [(self.game1.id, 3)])
+        self.assertEqual(trending.top(3600, 10), [(self.game1.id, 3)])
+        self.assertEqual(trending._seen, set())
+
+    def test_rebuild_moves_the_safe_id(self):
+        """A refresh after the rebuild only reads the recent ids again"""
+        trending = TrendingGames(60, 4 * 3600, 10, refresh_seconds=0,
+                                 safety_lag=3600)
+        settled = create_play_sessions(self.user, self.game1, 3,
+                                       timedelta(hours=2))
+        recent = create_play_sessions(self.user, self.game2, 2)
+
+        self.assertEqual(trending.top(4 * 3600, 10),
+                         [(self.game1.id, 3), (self.game2.id, 2)])
+        self.assertEqual(trending._safe_id, settled[-1].id)
+        self.assertEqual(trending._seen,
+                         {play_session.id for play_session in recent})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(trending.top(4 * 3600, 10),
+                             [(self.game1.id, 3), (self.game2.id, 2)])
+        read = queries.captured_queries[-1]["sql"]
+        self.assertIn(f'"id" > {settled[-1].id}', read)
@@ -0,0 +1,213 @@
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from django.db.models import Max
+from common.streaming import iterate_chunks
+from app.settings import TRENDING_BUCKET_SECONDS, TRENDING_CAPACITY, \
+    TRENDING_MAX_WINDOW, TRENDING_REFRESH_SECONDS, TRENDING_SAFETY_LAG
+from game.models import PlaySession
+
+
+class SpaceSaving:
+    """
+    Space-saving heavy hitters sketch with at most `capacity` counters.
+    When it is full, a new key replaces the smallest counter and inherits
+    its count, so frequent keys are never underestimated.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counters = {}
+
+    def add(self, key, count=1):
+        """Count a key"""
+        if key in self.counters or len(self.counters) < self.capacity:
+            self.counters[key] = self.counters.get(key, 0) + count
+            return
+
+        victim = min(self.counters, key=self.counters.get)
+        self.counters[key] = self.counters.pop(victim) + count
+
+
+class TrendingGames:
+    """
+    Sliding window of play session counts per game, made of one
+    space-saving sketch per time bucket. Memory is bounded by the number
+    of buckets times the sketch capacity, whatever the catalog size.
+
+    The create path feeds the sessions it stores. Sessions stored by
+    other processes, in bulk or by the write-behind flush are read from
+    the database once the window is older than `refresh_seconds`, and
+    the whole window is rebuilt from the database on first use.
+
+    Ids are not committed in order, so every refresh reads again the ids
+    above `_safe_id`, the highest id seen by a refresh at least
+    `safety_lag` seconds earlier. Ids above it already counted are kept
+    in `_seen`, so it holds about `safety_lag` seconds of sessions.
+    Sessions committed more than `safety_lag` seconds after a higher id
+    was read are missed.
+    """
+
+    chunk_size = 2000
+
+    def __init__(self, bucket_seconds, max_window, capacity,
+                 refresh_seconds, safety_lag=TRENDING_SAFETY_LAG):
+        self.bucket_seconds = bucket_seconds
+        self.max_window = max_window
+        self.capacity = capacity
+        self.refresh_seconds = refresh_seconds
+        self.safety_lag = safety_lag
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop every count, the next read rebuilds them from the db"""
+        with self._lock:
+            self._buckets = {}
+            self._safe_id = 0
+            self._seen = set()
+            self._checkpoints = deque()
+            self._refreshed_at = None
+            self._generation = getattr(self, '_generation', 0) + 1
+
+    def __bucket(self, timestamp):
+        return int(timestamp // self.bucket_seconds) * self.bucket_seconds
+
+    def __add(self, play_session_id, game_id, creation_time):
+        """Count a session once, the lock must be held"""
+        if play_session_id <= self._safe_id or play_session_id in self._seen:
+            return
+        self._seen.add(play_session_id)
+        self.__count(game_id, creation_time)
+
+    def __count(self, game_id, creation_time):
+        """Count a session in its bucket, the lock must be held"""
+        timestamp = creation_time.timestamp()
+        if timestamp < time.time() - self.max_window:
+            return
+
+        bucket = self.__bucket(timestamp)
+        if bucket not in self._buckets:
+            self._buckets[bucket] = SpaceSaving(self.capacity)
+        self._buckets[bucket].add(game_id)
+
+    def __expire(self):
+        oldest = self.__bucket(time.time() - self.max_window)
+        for bucket in [bucket for bucket in self._buckets
+                       if bucket < oldest]:
+            del self._buckets[bucket]
+
+    def __is_stale(self):
+        return (
+            self._refreshed_at is None
+            or time.monotonic() - self._refreshed_at >= self.refresh_seconds
+        )
+
+    def __refresh(self):
+        """
+        Count the sessions above the safe id. The database is read in
+        chunks without holding the lock, one thread at a time, and the
+        other threads keep reading the current counts meanwhile, except
+        on first use.
+
+        The first use rebuilds the window and moves the safe id to the
+        highest id created more than `safety_lag` seconds ago, so only
+        the ids above it are kept in `_seen` and read again.
+        """
+        with self._lock:
+            if not self.__is_stale():
+                return
+            first_use = self._refreshed_at is None
+
+        if not self._refresh_lock.acquire(blocking=first_use):
+            return
+        try:
+            with self._lock:
+                # Another thread may have refreshed while we waited
+                if not self.__is_stale():
+                    return
+                first_use = self._refreshed_at is None
+                read_from, generation = self._safe_id, self._generation
+
+            read_at = time.monotonic()
+            now = time.time()
+            since = datetime.fromtimestamp(now - self.max_window,
+                                           tz=timezone.utc)
+            max_id = PlaySession.objects.aggregate(
+                max_id=Max('id'))['max_id'] or 0
+            if first_use:
+                settled = datetime.fromtimestamp(now - self.safety_lag,
+                                                 tz=timezone.utc)
+                safe_id = PlaySession.objects.filter(
+                    creation_time__gte=since,
+                    creation_time__lt=settled,
+                    id__lte=max_id,
+                ).aggregate(max_id=Max('id'))['max_id'] or read_from
+            else:
+                safe_id = read_from
+
+            sessions = PlaySession.objects.filter(
+                id__gt=read_from,
+                id__lte=max_id,
+                creation_time__gte=since,
+            ).values_list('id', 'game_id', 'creation_time')
+            for chunk in iterate_chunks(sessions, self.chunk_size):
+                with self._lock:
+                    if generation != self._generation:
+                        return
+                    for play_session_id, game_id, creation_time in chunk:
+                        if play_session_id <= safe_id:
+                            # Read once by the rebuild, never read again
+                            self.__count(game_id, creation_time)
+                        else:
+                            self.__add(play_session_id, game_id,
+                                       creation_time)
+
+            with self._lock:
+                if generation != self._generation:
+                    return
+                self._safe_id = safe_id
+                self._checkpoints.append((read_at, max_id))
+                while (
+                    self._checkpoints
+                    and self._checkpoints[0][0] <= read_at - self.safety_lag
+                ):
+                    _, checkpoint_id = self._checkpoints.popleft()
+                    self._safe_id = max(self._safe_id, checkpoint_id)
+                self._seen = {play_session_id
+                              for play_session_id in self._seen
+                              if play_session_id > self._safe_id}
+                self._refreshed_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def record(self, play_session):
+        """Count a session stored by this process"""
+        with self._lock:
+            # Before the first refresh the window is rebuilt from the db
+            if self._refreshed_at is None:
+                return
+            self.__add(play_session.id, play_session.game_id,
+                       play_session.creation_time)
+
+    def top(self, window, limit):
+        """Return the (game id, sessions) pairs of the window, top first"""
+        self.__refresh()
+
+        with self._lock:
+            self.__expire()
+
+            since = self.__bucket(time.time() - min(window, self.max_window))
+            totals = Counter()
+            for bucket, sketch in self._buckets.items():
+                if bucket >= since:
+                    totals.update(sketch.counters)
+
+        return totals.most_common(limit)
+
+
+trending_games = TrendingGames(TRENDING_BUCKET_SECONDS, TRENDING_MAX_WINDOW,
+                               TRENDING_CAPACITY, TRENDING_REFRESH_SECONDS,
+                               TRENDING_SAFETY_LAG)
@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from game.views import GameViewSet, PlaySessionViewSet
+from game.views import GameViewSet, PlaySessionViewSet, \
+    MyPlaySessionHistoryView, UserPlaySessionHistoryView, \
+    MyRecommendationsView
 
 
 router = DefaultRouter()
@@ -12,4 +14,11 @@ app_name = "game"
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('users/me/playsessions/', MyPlaySessionHistoryView.as_view(),
+         name='my-playsession-list'),
+    path('users/me/recommendations/', MyRecommendationsView.as_view(),
+         name='my-recommendation-list'),
+    path('users/<int:pk>/playsessions/',
+         UserPlaySessionHistoryView.as_view(),
+         name='user-playsession-list'),
 ]
@@ -1,27 +1,214 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
-from game.models import Game, PlaySession
+from django.db import transaction
+from django.utils import timezone
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
+from app.settings import PLAYSESSION_WRITE_BEHIND, TRENDING_CAPACITY, \
+    HLL_PRECISION, STREAM_CHUNK_SIZE, PROJECTION_READ_PATH, \
+    CATALOG_SNAPSHOT, SEARCH_MAX_RESULTS, SIMILAR_GAMES_K, \
+    RECOMMENDATION_MAX_RESULTS
+from game.catalog import conditional_catalog_view
+from game.filters import GenreFilterBackend
+from game.models import Game, PlaySession, GamePlayDaily, \
+    GamePlayerSketch, GameNeighbour
 from game.serializers import (
+    GamePlayDailySerializer,
     GameSerializer,
+    PlaySessionHistorySerializer,
     PlaySessionSerializer,
     PlaySessionSerializerStore,
 )
+from common.date_utils import convert_str_date, convert_date_str, \
+    convert_str_duration
+from common.hyperloglog import HyperLogLog
 from common.jwt_utils import JWTAuthentication
+from common.pagination import PlaySessionCursorPagination
+from common.sparse_fields import SparseFieldsViewMixin
+from common.streaming import iterate_chunks, stream_json_list
+from game.projections import game_rows, play_session_rows, \
+    project_games, project_play_sessions
+from game.recommendations import recommend_games
+from game.search import game_search
+from game.snapshot import catalog_snapshot, CatalogSnapshot, \
+    PrerenderedResponse
+from game.spool import playsession_spool, SpoolFull
+from game.trending import trending_games
+from user.models import User
 
 
-class GameViewSet(viewsets.ReadOnlyModelViewSet):
+class GameViewSet(SparseFieldsViewMixin, viewsets.ReadOnlyModelViewSet):
     """This viewset automatically provides `list` and `retrieve` actions."""
 
     queryset = Game.objects.prefetch_related("genre").all()
     serializer_class = GameSerializer
+    filter_backends = [GenreFilterBackend]
 
+    @conditional_catalog_view
+    def list(self, request, *args, **kwargs):
+        """List the games, 304 when the catalog did not change"""
+        if self.has_sparse_selection():
+            return super().list(request, *args, **kwargs)
+        if CATALOG_SNAPSHOT:
+            return self.__list_snapshot()
+        if not PROJECTION_READ_PATH:
+            return super().list(request, *args, **kwargs)
 
-class PlaySessionViewSet(viewsets.ModelViewSet):
+        queryset = self.filter_queryset(game_rows())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(project_games(page))
+        return Response(project_games(list(queryset)))
+
+    @conditional_catalog_view
+    def retrieve(self, request, *args, **kwargs):
+        """Return a game, 304 when the catalog did not change"""
+        if not CATALOG_SNAPSHOT or self.has_sparse_selection():
+            return super().retrieve(request, *args, **kwargs)
+
+        game = catalog_snapshot.get().get(kwargs[self.lookup_field])
+        if game is None:
+            raise Http404
+        return PrerenderedResponse(game.data, game.body)
+
+    def __list_snapshot(self):
+        """List the games from the in-memory catalog snapshot"""
+        games = self.filter_queryset(catalog_snapshot.get().rows())
+        page = self.paginate_queryset(games)
+        if page is None:
+            return PrerenderedResponse([game.data for game in games],
+                                       CatalogSnapshot.list_body(games))
+
+        response = self.get_paginated_response(
+            [game.data for game in page])
+        return PrerenderedResponse(response.data, CatalogSnapshot.page_body(
+            page, response.data["next"], response.data["previous"]))
+
+    @action(detail=False, methods=["get"])
+    def trending(self, request):
+        """Return the most played games of a recent time window"""
+        try:
+            window = convert_str_duration(
+                request.query_params.get("window", "1h"))
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError as error:
+            return Response(str(error), status=status.HTTP_400_BAD_REQUEST)
+
+        top = trending_games.top(window, max(1, min(limit, TRENDING_CAPACITY)))
+        games = Game.objects.in_bulk([game_id for game_id, _ in top])
+
+        return Response([
+            {"id": game_id, "name": games[game_id].name, "sessions": sessions}
+            for game_id, sessions in top if game_id in games
+        ])
+
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """Return the games whose name matches a query, best first"""
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError as error:
+            return Response(str(error), status=status.HTTP_400_BAD_REQUEST)
+
+        matches = game_search.get().search(
+            request.query_params.get("q", ""),
+            max(1, min(limit, SEARCH_MAX_RESULTS)))
+
+        return Response([
+            {"id": game_id, "name": name} for game_id, name in matches
+        ])
+
+    @action(detail=True, methods=["get"])
+    def stats(self, request, pk=None):
+        """Return the daily play statistics of a game from the rollup"""
+        try:
+            daily_plays = self.__filter_days(
+                GamePlayDaily.objects.filter(game_id=pk), request, pk)
+        except ValueError as error:
+            return Response(str(error), status=status.HTTP_400_BAD_REQUEST)
+
+        days = GamePlayDailySerializer(daily_plays, many=True).data
+        return Response({
+            "sessions": sum(day["sessions"] for day in days),
+            "days": days,
+        })
+
+    @action(detail=True, methods=["get"])
+    def players(self, request, pk=None):
+        """Return the estimated unique players of a game from sketches"""
+        try:
+            sketches = self.__filter_days(
+                GamePlayerSketch.objects.filter(game_id=pk), request, pk)
+        except ValueError as error:
+            return Response(str(error), status=status.HTTP_400_BAD_REQUEST)
+
+        days = []
+        total = HyperLogLog(HLL_PRECISION)
+        for sketch in sketches:
+            hll = HyperLogLog.from_bytes(sketch.registers)
+            total.merge(hll)
+            days.append({
+                "day": convert_date_str(sketch.day),
+                "unique_players": round(hll.estimate()),
+            })
+
+        estimate = total.estimate()
+        return Response({
+            "unique_players": round(estimate),
+            "relative_error": total.relative_error,
+            "lower": round(estimate * (1 - 2 * total.relative_error)),
+            "upper": round(estimate * (1 + 2 * total.relative_error)),
+            "days": days,
+        })
+
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        """Return the precomputed most similar games of a game"""
+        try:
+            limit = int(request.query_params.get("limit", 10))
+            neighbours = GameNeighbour.objects.filter(
+                game_id=pk
+            ).select_related("neighbour").order_by("rank")[
+                :max(1, min(limit, SIMILAR_GAMES_K))]
+        except ValueError as error:
+            return Response(str(error), status=status.HTTP_400_BAD_REQUEST)
+
+        if not neighbours and not Game.objects.filter(pk=pk).exists():
+            raise Http404
+
+        return Response([
+            {
+                "id": neighbour.neighbour_id,
+                "name": neighbour.neighbour.name,
+                "score": neighbour.score,
+            }
+            for neighbour in neighbours
+        ])
+
+    def __filter_days(self, queryset, request, pk):
+        """Filter a per day queryset of a game with ?from= and ?to="""
+        if not Game.objects.filter(pk=pk).exists():
+            raise Http404
+
+        if request.query_params.get("from"):
+            queryset = queryset.filter(
+                day__gte=convert_str_date(request.query_params["from"]))
+        if request.query_params.get("to"):
+            queryset = queryset.filter(
+                day__lte=convert_str_date(request.query_params["to"]))
+
+        return queryset.order_by("day")
+
+
+class PlaySessionViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """This viewset automatically provides all actions."""
 
     queryset = PlaySession.objects.prefetch_related(
         "game__genre").select_related("user", "game").all()
     serializer_class = PlaySessionSerializerStore
+    pagination_class = PlaySessionCursorPagination
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
@@ -30,3 +217,112 @@ class PlaySessionViewSet(viewsets.ModelViewSet):
         if self.action == "list" or self.action == "retrieve":
             self.serializer_class = PlaySessionSerializer
         return self.serializer_class
+
+    def get_serializer(self, *args, **kwargs):
+        """Accept a JSON array to create play sessions in bulk"""
+        if self.action == "create" and isinstance(kwargs.get("data"), list):
+            kwargs["many"] = True
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        """List the play sessions, from plain rows on the projection path"""
+        if not PROJECTION_READ_PATH or self.has_sparse_selection():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(play_session_rows())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                project_play_sessions(page, request))
+        return Response(project_play_sessions(list(queryset), request))
+
+    def create(self, request, *args, **kwargs):
+        """Store the play sessions or queue them in write-behind mode"""
+        if not PLAYSESSION_WRITE_BEHIND:
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        validated_data = serializer.validated_data
+        if not isinstance(validated_data, list):
+            validated_data = [validated_data]
+
+        creation_time = timezone.now().isoformat()
+        events = [
+            {
+                "user": request.user.pk,
+                "game": attrs["game"].pk,
+                "creation_time": creation_time,
+            }
+            for attrs in validated_data
+        ]
+
+        try:
+            playsession_spool.append(events)
+        except SpoolFull:
+            msg = "Too many pending play sessions, retry later"
+            return Response(msg,
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            headers={"Retry-After": "1"})
+
+        return Response({"queued": len(events)},
+                        status=status.HTTP_202_ACCEPTED)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Delete the play session and repoint the user last played game"""
+        user_id = instance.user_id
+        instance.delete()
+        User.objects.refresh_last_played(User.objects.filter(pk=user_id))
+
+
+class MyPlaySessionHistoryView(generics.GenericAPIView):
+    """Stream the play sessions of the authenticated user, newest first"""
+    serializer_class = PlaySessionHistorySerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_user_id(self):
+        """Return the id of the user whose sessions are streamed"""
+        return self.request.user.pk
+
+    def get(self, request, *args, **kwargs):
+        queryset = PlaySession.objects.filter(
+            user_id=self.get_user_id()
+        ).select_related("game").order_by("-creation_time", "-id")
+
+        return stream_json_list(
+            self.get_serializer_class(),
+            iterate_chunks(queryset, STREAM_CHUNK_SIZE, "game__genre"),
+            context=self.get_serializer_context(),
+        )
+
+
+class UserPlaySessionHistoryView(MyPlaySessionHistoryView):
+    """Stream the play sessions of any user, newest first"""
+    permission_classes = [IsAdminUser]
+
+    def get_user_id(self):
+        """Return the id of the user whose sessions are streamed"""
+        return get_object_or_404(User, pk=self.kwargs["pk"]).pk
+
+
+class MyRecommendationsView(generics.GenericAPIView):
+    """Recommend games co-played with the games of the authenticated user"""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError as error:
+            return Response(str(error), status=status.HTTP_400_BAD_REQUEST)
+
+        recommendations = recommend_games(
+            request.user.pk, max(1, min(limit, RECOMMENDATION_MAX_RESULTS)))
+
+        return Response([
+            {"id": game_id, "name": name, "score": score}
+            for game_id, name, score in recommendations
+        ])
@@ -0,0 +1,239 @@
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from django.db import close_old_connections
+from django.utils import timezone
+from app.settings import AVATAR_THUMBNAIL_SIZES, AVATAR_THUMBNAIL_FORMATS, \
+    AVATAR_THUMBNAIL_QUALITY, AVATAR_THUMBNAIL_WORKERS, MEDIA_GC_MIN_AGE
+from common.jwt_utils import JWTAuthentication
+from user.models import MediaFile, User, USER_IMAGE_DIR
+from user.thumbnails import render_thumbnails, thumbnail_name
+
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SUFFIX = re.compile(r'_\d+$')
+
+
+def image_storage():
+    return User._meta.get_field('image').storage
+
+
+def image_url(name, request=None):
+    """Render an image column the way the serializer ImageField does"""
+    if not name:
+        return None
+    url = image_storage().url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def thumbnail_urls(name, ready, request=None):
+    """
+    Return the thumbnail URLs of an image per size label and format,
+    None while they are not generated
+    """
+    if not name or not ready:
+        return None
+    return {
+        label: {
+            image_format.lower(): image_url(
+                thumbnail_name(name, size, image_format), request)
+            for image_format in AVATAR_THUMBNAIL_FORMATS
+        }
+        for label, size in AVATAR_THUMBNAIL_SIZES.items()
+    }
+
+
+class AvatarPipeline:
+    """
+    Generate the thumbnails of uploaded user images in a pool of worker
+    processes, so resizing never holds a request thread or the GIL.
+    The user is marked as thumbnailed once they are written, unless the
+    image changed in the meantime. With no workers they are generated
+    in the calling thread.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def __executor_instance(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers do not inherit the locks and database
+                # connections of the threads of the server
+                self._executor = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    @staticmethod
+    def targets(name):
+        """Return the (path, size, format) of the thumbnails of an image"""
+        storage = image_storage()
+        return [
+            (storage.path(thumbnail_name(name, size, image_format)), size,
+             image_format)
+            for size in AVATAR_THUMBNAIL_SIZES.values()
+            for image_format in AVATAR_THUMBNAIL_FORMATS
+        ]
+
+    def rendered(self, name):
+        """
+        Check if the thumbnails exist, identical images share them.
+        Reused thumbnails are touched, so the garbage collection sees
+        them as recent as the upload of their image.
+        """
+        try:
+            for path, _, _ in self.targets(name):
+                os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    @staticmethod
+    def mark_ready(user_id, name):
+        """Mark the user thumbnails ready if the image is still the same"""
+        updated = User.objects.filter(pk=user_id, image=name).update(
+            image_thumbnailed=True)
+        # The update skips the signals dropping the cached user
+        JWTAuthentication.invalidate_user(user_id)
+        return updated
+
+    def process(self, user_id, name):
+        """Generate the thumbnails of a user image in this thread"""
+        render_thumbnails(image_storage().path(name), self.targets(name),
+                          AVATAR_THUMBNAIL_QUALITY)
+        return self.mark_ready(user_id, name)
+
+    def submit(self, user_id, name):
+        """Queue the thumbnails of a user image, return their future"""
+        if self.rendered(name):
+            self.mark_ready(user_id, name)
+            return None
+
+        if not self.workers:
+            try:
+                self.process(user_id, name)
+            except Exception:
+                logger.exception('Could not generate the thumbnails of %s',
+                                 name)
+            return None
+
+        future = self.__executor_instance().submit(
+            render_thumbnails, image_storage().path(name),
+            self.targets(name), AVATAR_THUMBNAIL_QUALITY)
+        future.add_done_callback(
+            lambda done: self.__done(done, user_id, name))
+        return future
+
+    def __done(self, future, user_id, name):
+        """Mark the thumbnails ready from the executor thread"""
+        try:
+            future.result()
+            self.mark_ready(user_id, name)
+        except Exception:
+            logger.exception('Could not generate the thumbnails of %s', name)
+        finally:
+            close_old_connections()
+
+    def shutdown(self):
+        """Wait for the queued thumbnails and stop the workers"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def backfill(self, batch_size=1000):
+        """
+        Submit the users with an image and no thumbnails, the ones that
+        uploaded it before the pipeline or whose thumbnails failed, and
+        wait for them. Return the number of users submitted.
+        """
+        submitted = 0
+        last_id = 0
+        while True:
+            users = list(User.objects.filter(
+                pk__gt=last_id, image_thumbnailed=False,
+            ).exclude(image__isnull=True).exclude(image='').order_by(
+                'pk').values_list('pk', 'image')[:batch_size])
+            if not users:
+                break
+
+            for user_id, name in users:
+                self.submit(user_id, name)
+            submitted += len(users)
+            last_id = users[-1][0]
+
+        self.shutdown()
+        return submitted
+
+
+def walk_storage(storage, directory):
+    """Yield the names of the files below a storage directory"""
+    try:
+        directories, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+
+    for name in files:
+        yield os.path.join(directory, name)
+    for subdirectory in directories:
+        yield from walk_storage(storage, os.path.join(directory,
+                                                      subdirectory))
+
+
+def collect_media_garbage(min_age=MEDIA_GC_MIN_AGE, dry_run=False,
+                          batch_size=1000):
+    """
+    Delete the user images without references, their thumbnails and the
+    files left by interrupted writes. Files changed in the last min_age
+    seconds are kept, their upload may not be committed yet. Return the
+    deleted names.
+    """
+    storage = image_storage()
+    since = timezone.now() - timedelta(seconds=min_age)
+
+    referenced = set(MediaFile.objects.filter(
+        references__gt=0).values_list('name', flat=True))
+    # Images are checked too, in case a count drifted from the users
+    referenced.update(User.objects.exclude(image__isnull=True).exclude(
+        image='').values_list('image', flat=True).distinct())
+    kept = {os.path.splitext(name)[0] for name in referenced}
+
+    candidates = []
+    recent = set()
+    for name in walk_storage(storage, USER_IMAGE_DIR):
+        stem = os.path.splitext(name)[0]
+        owner = THUMBNAIL_SUFFIX.sub('', stem)
+        if stem in kept or owner in kept:
+            continue
+        if storage.get_modified_time(name) > since:
+            recent.add(stem)
+            continue
+        candidates.append((name, owner))
+
+    # A recent image may be reused by an upload not committed yet, its
+    # thumbnails are kept with it
+    deleted = [name for name, owner in candidates if owner not in recent]
+    if not dry_run:
+        for name in deleted:
+            storage.delete(name)
+
+    if not dry_run:
+        for start in range(0, len(deleted), batch_size):
+            MediaFile.objects.filter(
+                name__in=deleted[start:start + batch_size],
+                references=0).delete()
+
+    return deleted
+
+
+avatar_pipeline = AvatarPipeline(AVATAR_THUMBNAIL_WORKERS)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from user.models import User
+
+
+class Command(BaseCommand):
+    """Django Command to backfill the user last played columns"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of users updated per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write('Backfilling last played sessions...')
+
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(User.objects.filter(pk__gt=last_id).order_by(
+                'pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+
+            with transaction.atomic():
+                updated += User.objects.refresh_last_played(
+                    User.objects.filter(pk__in=ids))
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'{updated} users updated!'))
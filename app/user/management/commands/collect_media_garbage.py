@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from app.settings import MEDIA_GC_MIN_AGE
+from user.avatars import collect_media_garbage
+
+
+class Command(BaseCommand):
+    """Django Command to delete the user images no user references"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=MEDIA_GC_MIN_AGE,
+            help='Keep the files changed in the last seconds')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='List the files without deleting them')
+
+    def handle(self, *args, **options):
+        deleted = collect_media_garbage(options['min_age'],
+                                        options['dry_run'])
+        for name in deleted:
+            self.stdout.write(name)
+
+        verb = 'would be deleted' if options['dry_run'] else 'deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(deleted)} media files {verb}!'))
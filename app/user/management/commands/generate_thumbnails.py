@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from user.avatars import avatar_pipeline
+
+
+class Command(BaseCommand):
+    """Django Command to generate the missing user image thumbnails"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of users read per query')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Generating the missing thumbnails...')
+        submitted = avatar_pipeline.backfill(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{submitted} users thumbnailed!'))
@@ -0,0 +1,30 @@
+# Generated by Django 3.1.7 on 2026-10-18 19:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_auto_20261018_1939'),
+        ('user', '0008_auto_20210730_1705'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='last_played_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='last_played_game',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='game.game'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='last_played_session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='game.playsession'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.7 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0010_refreshtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='image_thumbnailed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
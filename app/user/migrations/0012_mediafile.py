@@ -0,0 +1,37 @@
+# Generated by Django 3.1.7 on 2026-10-18 20:25
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_user_images(apps, schema_editor):
+    """Count the references to the images already uploaded"""
+    User = apps.get_model('user', 'User')
+    MediaFile = apps.get_model('user', 'MediaFile')
+    images = User.objects.exclude(image__isnull=True).exclude(
+        image='').values('image').annotate(references=Count('id'))
+    MediaFile.objects.bulk_create(
+        [MediaFile(name=row['image'], references=row['references'])
+         for row in images.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0011_user_image_thumbnailed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('references', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(count_user_images, migrations.RunPython.noop),
+    ]
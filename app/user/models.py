@@ -1,16 +1,23 @@
-from django.db import models
+from datetime import timedelta
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+from app.settings import REFRESH_TOKEN_LIFETIME
 from django.contrib.auth.models import AbstractBaseUser, \
     BaseUserManager, PermissionsMixin
+from game.models import PlaySession
 import uuid
 import os
 
 
+USER_IMAGE_DIR = 'uploads/user/'
+
+
 def user_image_path(instance, filename):
-    """Generate file name for new user image"""
-    extension = filename.split('.')[-1]
-    filename = f'{uuid.uuid4()}.{extension}'
+    """Generate file name for new user image, the storage hashes it"""
+    extension = filename.split('.')[-1].lower()
 
-    return os.path.join('uploads/user/', filename)
+    return os.path.join(USER_IMAGE_DIR, f'image.{extension}')
 
 
 class UserManager(BaseUserManager):
@@ -38,6 +45,32 @@ class UserManager(BaseUserManager):
 
         return user
 
+    def record_play_session(self, play_session):
+        """Point the user last played columns to a new play session"""
+        return self.filter(
+            Q(last_played_at__isnull=True)
+            | Q(last_played_at__lte=play_session.creation_time),
+            pk=play_session.user_id,
+        ).update(
+            last_played_session_id=play_session.id,
+            last_played_game_id=play_session.game_id,
+            last_played_at=play_session.creation_time,
+        )
+
+    def refresh_last_played(self, queryset=None):
+        """Recompute the user last played columns from the play sessions"""
+        if queryset is None:
+            queryset = self.all()
+
+        latest = PlaySession.objects.filter(
+            user=OuterRef('pk')).order_by('-creation_time', '-id')
+
+        return queryset.update(
+            last_played_session=Subquery(latest.values('id')[:1]),
+            last_played_game=Subquery(latest.values('game')[:1]),
+            last_played_at=Subquery(latest.values('creation_time')[:1]),
+        )
+
 
 class User(AbstractBaseUser, PermissionsMixin, models.Model):
     """Custom user model based on Django user to use email"""
@@ -47,8 +80,100 @@ class User(AbstractBaseUser, PermissionsMixin, models.Model):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     image = models.ImageField(upload_to=user_image_path, null=True)
+    image_thumbnailed = models.BooleanField(default=False)
+    last_played_session = models.ForeignKey('game.PlaySession',
+                                            related_name='+',
+                                            null=True,
+                                            blank=True,
+                                            on_delete=models.SET_NULL)
+    last_played_game = models.ForeignKey('game.Game',
+                                         related_name='+',
+                                         null=True,
+                                         blank=True,
+                                         on_delete=models.SET_NULL)
+    last_played_at = models.DateTimeField(null=True, blank=True)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "birthdate"]
 
     objects = UserManager()
+
+
+class MediaFileManager(models.Manager):
+
+    def retain(self, name):
+        """Count a new reference to a media file"""
+        media_file, created = self.get_or_create(
+            name=name, defaults={'references': 1})
+        if not created:
+            self.filter(pk=media_file.pk).update(
+                references=F('references') + 1, updated_at=timezone.now())
+
+    def release(self, name):
+        """Drop a reference to a media file, the gc deletes it at zero"""
+        self.filter(name=name, references__gt=0).update(
+            references=F('references') - 1, updated_at=timezone.now())
+
+
+class MediaFile(models.Model):
+    """Number of references to a content addressed media file"""
+    name = models.CharField(max_length=255, unique=True)
+    references = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = MediaFileManager()
+
+
+class RefreshTokenManager(models.Manager):
+
+    def issue(self, user, family=None):
+        """Creates and saves a new refresh token for the user"""
+        return self.create(
+            user=user,
+            family=family or uuid.uuid4(),
+            expires_at=timezone.now() + timedelta(
+                seconds=REFRESH_TOKEN_LIFETIME),
+        )
+
+    def rotate(self, jti):
+        """
+        Consume a refresh token and issue the next one of its family.
+        A token presented twice means it leaked, so its whole family
+        is revoked. Returns None when the token can not be used.
+        """
+        with transaction.atomic():
+            try:
+                token = self.select_for_update().select_related(
+                    'user').get(jti=jti)
+            except (self.model.DoesNotExist, ValueError):
+                return None
+
+            if token.used_at:
+                self.filter(family=token.family).update(revoked=True)
+                return None
+
+            if (
+                token.revoked
+                or token.expires_at <= timezone.now()
+                or not token.user.is_active
+            ):
+                return None
+
+            token.used_at = timezone.now()
+            token.save(update_fields=['used_at'])
+
+            return self.issue(token.user, token.family)
+
+
+class RefreshToken(models.Model):
+    """Refresh token of a user, replaced by a new one on every use"""
+    jti = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    family = models.UUIDField(db_index=True)
+    user = models.ForeignKey(User,
+                             related_name='refresh_tokens',
+                             on_delete=models.CASCADE)
+    expires_at = models.DateTimeField()
+    used_at = models.DateTimeField(null=True, blank=True)
+    revoked = models.BooleanField(default=False)
+
+    objects = RefreshTokenManager()
@@ -3,15 +3,33 @@ from user.models import User
 from rest_framework import serializers
 
 from common.date_utils import calculate_age, valid_age
+from common.sparse_fields import SparseFieldsMixin
+from user.avatars import thumbnail_urls
 import datetime
 
 
-class UserSerializer(serializers.ModelSerializer):
+class ImageThumbnailsField(serializers.Field):
+    """Render the thumbnail URLs of the user image"""
+    extra_sources = ("image_thumbnailed", )
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "image"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return thumbnail_urls(value.name, value.instance.image_thumbnailed,
+                              self.context.get("request"))
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for the user object"""
+    thumbnails = ImageThumbnailsField()
 
     class Meta:
         model = User
-        fields = ("id", "email", "password", "username", "birthdate", "image")
+        fields = ("id", "email", "password", "username", "birthdate", "image",
+                  "thumbnails")
         extra_kwargs = {"password": {"write_only": True, "min_length": 5}}
 
     def create(self, validated_data):
@@ -37,27 +55,22 @@ class UserDetailSerializer(UserSerializer):
     """Serializer for the user object"""
     class Meta:
         model = User
-        fields = ("email", "username", "birthdate", "image")
+        fields = ("email", "username", "birthdate", "image", "thumbnails")
 
 
 class UserPlaySessionSerializer(serializers.ModelSerializer):
     """Serializer for the user and play session object"""
-    last_played_session = serializers.StringRelatedField(many=True)
+    last_played_session = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = ("email", "username", "birthdate", "last_played_session")
 
-    def to_representation(self, instance):
-        """Obtain the last user played game from PlaySession"""
-        representation = super().to_representation(instance)
-
-        last_played_session = representation.get("last_played_session")
-        if last_played_session and len(last_played_session) > 0:
-            representation['last_played_session'] = last_played_session[-1]
-        else:
-            representation['last_played_session'] = ""
-        return representation
+    def get_last_played_session(self, instance):
+        """Obtain the last user played game from the user columns"""
+        if not instance.last_played_game_id:
+            return ""
+        return f"{instance.last_played_game}({instance.last_played_at})"
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -66,3 +79,8 @@ class AuthTokenSerializer(serializers.Serializer):
 
     password = serializers.CharField(
         style={'input_type': 'password'}, trim_whitespace=False)
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for the refresh token object"""
+    refresh = serializers.CharField()
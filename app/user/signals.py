@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models import DEFERRED
+from django.db.models.signals import post_delete, post_init, post_save, \
+    pre_save
+from django.dispatch import receiver
+from common.jwt_utils import JWTAuthentication
+from user.avatars import avatar_pipeline
+from user.models import MediaFile, User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the authenticated user cache entry of a changed user"""
+    JWTAuthentication.invalidate_user(instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def reset_image_thumbnails(sender, instance, **kwargs):
+    """A new image has no thumbnails until the pipeline generates them"""
+    instance._image_uploaded = bool(instance.image) and \
+        not instance.image._committed
+    if instance._image_uploaded or not instance.image:
+        instance.image_thumbnailed = False
+
+
+@receiver(post_save, sender=User)
+def queue_image_thumbnails(sender, instance, **kwargs):
+    """Generate the thumbnails of a new image once it is committed"""
+    if getattr(instance, '_image_uploaded', False):
+        user_id, name = instance.pk, instance.image.name
+        transaction.on_commit(lambda: avatar_pipeline.submit(user_id, name))
+
+
+def image_name(value):
+    """Return the name of a raw or FieldFile image value"""
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_init, sender=User)
+def remember_loaded_image(sender, instance, **kwargs):
+    """Keep the image name the user was loaded with, if it was loaded"""
+    image = instance.__dict__.get('image', DEFERRED)
+    instance._loaded_image = DEFERRED if image is DEFERRED else \
+        image_name(image)
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_image(sender, instance, update_fields=None,
+                            **kwargs):
+    """Find the image replaced by the save, None when it is unchanged"""
+    instance._previous_image = None
+    image = instance.__dict__.get('image', DEFERRED)
+    if (
+        image is DEFERRED
+        or update_fields is not None and 'image' not in update_fields
+    ):
+        return
+
+    loaded = getattr(instance, '_loaded_image', DEFERRED)
+    if instance._state.adding:
+        loaded = ''
+    elif loaded is DEFERRED:
+        # Only read when the image was deferred then assigned
+        loaded = image_name(User.objects.filter(
+            pk=instance.pk).values_list('image', flat=True).first())
+
+    uploaded = not getattr(image, '_committed', True)
+    if uploaded or image_name(image) != loaded:
+        instance._previous_image = loaded
+
+
+@receiver(post_save, sender=User)
+def count_image_references(sender, instance, **kwargs):
+    """Move the reference of the previous image to the new one"""
+    previous = getattr(instance, '_previous_image', None)
+    if previous is None:
+        return
+
+    name = instance.image.name or ''
+    instance._loaded_image = name
+    if previous == name:
+        return
+
+    if name:
+        MediaFile.objects.retain(name)
+    if previous:
+        MediaFile.objects.release(previous)
+
+
+@receiver(post_delete, sender=User)
+def release_image(sender, instance, **kwargs):
+    """Drop the reference of the image of a deleted user"""
+    if instance.image:
+        MediaFile.objects.release(instance.image.name)
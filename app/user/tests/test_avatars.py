@@ -0,0 +1,385 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
+from PIL import Image
+from common.date_utils import convert_str_date
+from common.tests.utils import create_user
+from user.avatars import AvatarPipeline, avatar_pipeline, \
+    collect_media_garbage
+from user.models import MediaFile, User
+from user.thumbnails import render_thumbnails, thumbnail_name
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+
+USERS_URL = reverse("user:user-list")
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def detail_url(user_id):
+    """Return user detail url"""
+    return reverse("user:user-detail", args=[user_id])
+
+
+def create_image(size=(1200, 800), mode="RGB", image_format="JPEG"):
+    """Return the bytes of a noisy image, which compresses poorly"""
+    image = Image.effect_noise(size, 64).convert(mode)
+    data = BytesIO()
+    image.save(data, format=image_format, quality=95)
+    return data.getvalue()
+
+
+class ThumbnailTests(TestCase):
+    """Test the thumbnail rendering of the worker processes"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def render(self, data, extension, targets):
+        source = os.path.join(self.directory, f"source.{extension}")
+        with open(source, "wb") as image_file:
+            image_file.write(data)
+        return render_thumbnails(source, targets,
+                                 {"JPEG": 85, "WEBP": 80})
+
+    def test_thumbnail_name(self):
+        """Thumbnails are named after their image, size and format"""
+        self.assertEqual(thumbnail_name("uploads/user/a.png", 64, "WEBP"),
+                         "uploads/user/a_64.webp")
+        self.assertEqual(thumbnail_name("uploads/user/a.png", 256, "JPEG"),
+                         "uploads/user/a_256.jpg")
+
+    def test_render_square_thumbnails(self):
+        """Every target is written at its size and format"""
+        targets = [
+            (os.path.join(self.directory, "thumbs", f"a_{size}.{ext}"),
+             size, image_format)
+            for size in (64, 256)
+            for image_format, ext in (("JPEG", "jpg"), ("WEBP", "webp"))
+        ]
+        paths = self.render(create_image(), "jpg", targets)
+
+        self.assertEqual(paths, [path for path, _, _ in targets])
+        for path, size, image_format in targets:
+            with Image.open(path) as thumbnail:
+                self.assertEqual(thumbnail.size, (size, size))
+                self.assertEqual(thumbnail.format, image_format)
+        self.assertFalse([name for name in os.listdir(
+            os.path.join(self.directory, "thumbs")) if name.endswith(".tmp")])
+
+    def test_render_transparent_image(self):
+        """Transparency is kept in WebP and painted white in JPEG"""
+        image = Image.new("RGBA", (100, 50), (255, 0, 0, 0))
+        data = BytesIO()
+        image.save(data, format="PNG")
+        jpeg = os.path.join(self.directory, "a_32.jpg")
+        webp = os.path.join(self.directory, "a_32.webp")
+
+        self.render(data.getvalue(), "png",
+                    [(jpeg, 32, "JPEG"), (webp, 32, "WEBP")])
+
+        with Image.open(jpeg) as thumbnail:
+            self.assertEqual(thumbnail.mode, "RGB")
+            self.assertEqual(thumbnail.getpixel((16, 16)), (255, 255, 255))
+        with Image.open(webp) as thumbnail:
+            self.assertEqual(thumbnail.mode, "RGBA")
+            self.assertEqual(thumbnail.getpixel((16, 16))[3], 0)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AvatarPipelineTests(TestCase):
+    """Test the thumbnails of the uploaded user images"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            get_user_model().objects.create_superuser,
+            email="b@b.com",
+            password="12345",
+            username="b",
+            birthdate=convert_str_date("1987-09-10"),
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, data=None):
+        """Upload a user image, running the commit hooks right away"""
+        image = SimpleUploadedFile("avatar.jpg", data or create_image(),
+                                   content_type="image/jpeg")
+        with patch("user.signals.transaction.on_commit",
+                   side_effect=lambda func: func()):
+            res = self.client.patch(detail_url(self.user.id),
+                                    {"image": image}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        return res
+
+    def test_upload_generates_thumbnails(self):
+        """Thumbnails are smaller and listed by size and format"""
+        original = create_image()
+        with patch.object(avatar_pipeline, "workers", 0):
+            self.upload(original)
+
+        self.assertTrue(self.user.image_thumbnailed)
+        res = self.client.get(detail_url(self.user.id))
+        thumbnails = res.data["thumbnails"]
+        self.assertEqual(set(thumbnails), {"small", "medium"})
+        self.assertEqual(set(thumbnails["small"]), {"webp", "jpeg"})
+
+        name = thumbnail_name(self.user.image.name, 64, "WEBP")
+        self.assertTrue(thumbnails["small"]["webp"].endswith(name))
+        small = self.user.image.storage.size(name)
+        self.assertLess(small * 10, len(original))
+
+    def test_new_upload_resets_thumbnails(self):
+        """Thumbnails of a new image are not listed before they exist"""
+        with patch.object(avatar_pipeline, "workers", 0):
+            self.upload()
+        with patch.object(avatar_pipeline, "submit") as submit:
+            self.upload()
+
+        submit.assert_called_once_with(self.user.id, self.user.image.name)
+        self.assertFalse(self.user.image_thumbnailed)
+        res = self.client.get(detail_url(self.user.id))
+        self.assertIsNone(res.data["thumbnails"])
+
+    def test_stale_thumbnails_are_not_marked(self):
+        """Thumbnails of a replaced image do not mark the new one"""
+        with patch.object(avatar_pipeline, "submit"):
+            self.upload()
+        name = self.user.image.name
+        with patch.object(avatar_pipeline, "submit"):
+            self.upload()
+
+        self.assertEqual(AvatarPipeline(0).process(self.user.id, name), 0)
+        self.assertEqual(
+            AvatarPipeline(0).process(self.user.id, self.user.image.name), 1)
+
+    def test_process_pool_renders_thumbnails(self):
+        """Worker processes write the thumbnails"""
+        with patch.object(avatar_pipeline, "submit"):
+            self.upload()
+
+        pipeline = AvatarPipeline(1)
+        self.addCleanup(pipeline.shutdown)
+        with patch.object(pipeline, "mark_ready") as mark_ready:
+            pipeline.submit(self.user.id, self.user.image.name).result()
+            pipeline.shutdown()
+
+        mark_ready.assert_called_once_with(self.user.id,
+                                           self.user.image.name)
+        for path, size, _ in pipeline.targets(self.user.image.name):
+            with Image.open(path) as thumbnail:
+                self.assertEqual(thumbnail.size, (size, size))
+
+    def test_backfill_missing_thumbnails(self):
+        """Users whose thumbnails are missing are thumbnailed again"""
+        with patch.object(avatar_pipeline, "submit"):
+            self.upload()
+        self.assertFalse(self.user.image_thumbnailed)
+
+        out = StringIO()
+        with patch.object(avatar_pipeline, "workers", 0):
+            call_command("generate_thumbnails", "--batch-size", "1",
+                         stdout=out)
+
+        self.assertIn("1 users thumbnailed", out.getvalue())
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.image_thumbnailed)
+
+    def test_mark_ready_drops_cached_user(self):
+        """The authenticated user cache does not keep the old thumbnails"""
+        with patch.object(avatar_pipeline, "submit"):
+            self.upload()
+
+        with patch("user.avatars.JWTAuthentication.invalidate_user") as \
+                invalidate_user:
+            AvatarPipeline(0).process(self.user.id, self.user.image.name)
+
+        invalidate_user.assert_called_once_with(self.user.id)
+
+    def test_list_users_thumbnails_queries(self):
+        """Selecting the thumbnails does not load the users one by one"""
+        with patch.object(avatar_pipeline, "workers", 0):
+            self.upload()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(USERS_URL, {"fields": "email,thumbnails"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(res.data["results"][0]["thumbnails"])
+
+
+class MediaReferenceTests(TestCase):
+    """Test the reference counts and garbage collection of user images"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = override_settings(MEDIA_ROOT=self.directory)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.users = [
+            create_user(
+                get_user_model().objects.create_user,
+                email=f"user{i}@a.com",
+                password="12345",
+                username=f"user{i}",
+                birthdate=convert_str_date("1987-09-10"),
+            )
+            for i in range(3)
+        ]
+        self.data = create_image((100, 100))
+
+    def set_image(self, user, data):
+        """Save a new image of a user without generating thumbnails"""
+        with patch.object(avatar_pipeline, "submit"):
+            user.image = SimpleUploadedFile("avatar.JPG", data)
+            user.save()
+        return user.image.name
+
+    def references(self, name):
+        return MediaFile.objects.get(name=name).references
+
+    def test_identical_images_are_counted(self):
+        """Users with the same image share a file and count it"""
+        names = {self.set_image(user, self.data) for user in self.users}
+
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(name.endswith(".jpg"))
+        self.assertEqual(self.references(name), 3)
+
+        other = self.set_image(self.users[0], create_image((100, 100)))
+        self.users[1].delete()
+        self.users[2].username = "renamed"
+        self.users[2].save()
+
+        self.assertEqual(self.references(name), 1)
+        self.assertEqual(self.references(other), 1)
+
+    def test_identical_images_share_thumbnails(self):
+        """Thumbnails of an identical image are not rendered again"""
+        name = self.set_image(self.users[0], self.data)
+        AvatarPipeline(0).process(self.users[0].id, name)
+        self.set_image(self.users[1], self.data)
+
+        with patch("user.avatars.render_thumbnails") as render:
+            AvatarPipeline(0).submit(self.users[1].id, name)
+
+        render.assert_not_called()
+        self.users[1].refresh_from_db()
+        self.assertTrue(self.users[1].image_thumbnailed)
+
+    def test_saves_without_image_change_do_not_read_it(self):
+        """Only saves changing the image touch the reference counts"""
+        name = self.set_image(self.users[0], self.data)
+        user = User.objects.get(pk=self.users[0].pk)
+        user.username = "renamed"
+
+        with self.assertNumQueries(1):
+            user.save()
+
+        deferred = User.objects.only("username").get(pk=user.pk)
+        deferred.image = ""
+        deferred.save()
+        self.assertEqual(self.references(name), 0)
+
+    def age(self, *names, seconds=2 * 60 * 60):
+        """Make files look older than the garbage collection delay"""
+        storage = self.users[0].image.storage
+        for name in names:
+            path = storage.path(name)
+            mtime = os.path.getmtime(path) - seconds
+            os.utime(path, (mtime, mtime))
+
+    def test_collect_orphans(self):
+        """Unreferenced old images and their thumbnails are deleted"""
+        kept = self.set_image(self.users[0], self.data)
+        AvatarPipeline(0).process(self.users[0].id, kept)
+        orphan = self.set_image(self.users[1], create_image((100, 100)))
+        AvatarPipeline(0).process(self.users[1].id, orphan)
+        recent = self.set_image(self.users[2], create_image((100, 100)))
+        self.set_image(self.users[1], self.data)
+        self.set_image(self.users[2], self.data)
+
+        storage = self.users[0].image.storage
+        thumbnails = [thumbnail_name(orphan, size, image_format)
+                      for size in (64, 256)
+                      for image_format in ("WEBP", "JPEG")]
+        self.age(kept, orphan, *thumbnails)
+
+        out = StringIO()
+        call_command("collect_media_garbage", "--dry-run", stdout=out)
+        self.assertIn("5 media files would be deleted", out.getvalue())
+        self.assertTrue(storage.exists(orphan))
+
+        deleted = collect_media_garbage()
+
+        self.assertEqual(sorted(deleted), sorted([orphan, *thumbnails]))
+        self.assertFalse(storage.exists(orphan))
+        for name in thumbnails:
+            self.assertFalse(storage.exists(name))
+        self.assertTrue(storage.exists(kept))
+        self.assertTrue(storage.exists(recent))
+        self.assertTrue(storage.exists(thumbnail_name(kept, 64, "WEBP")))
+        self.assertFalse(MediaFile.objects.filter(name=orphan).exists())
+
+    def orphan_thumbnailed_image(self):
+        """Return an old unreferenced image and its thumbnails"""
+        name = self.set_image(self.users[0], self.data)
+        AvatarPipeline(0).process(self.users[0].id, name)
+        self.set_image(self.users[0], create_image((100, 100)))
+        thumbnails = [thumbnail_name(name, size, image_format)
+                      for size in (64, 256)
+                      for image_format in ("WEBP", "JPEG")]
+        self.age(name, *thumbnails)
+        return name, thumbnails
+
+    def test_collect_keeps_thumbnails_of_reuploaded_images(self):
+        """An identical upload in progress keeps the thumbnails"""
+        name, thumbnails = self.orphan_thumbnailed_image()
+        storage = self.users[0].image.storage
+        # Uploaded again, the user is not saved yet
+        self.assertEqual(storage.save("uploads/user/image.jpg",
+                                      ContentFile(self.data)), name)
+
+        self.assertEqual(collect_media_garbage(), [])
+        for thumbnail in [name, *thumbnails]:
+            self.assertTrue(storage.exists(thumbnail))
+
+    def test_reused_thumbnails_are_touched(self):
+        """Thumbnails reused by an identical image look recent"""
+        name, thumbnails = self.orphan_thumbnailed_image()
+        self.set_image(self.users[1], self.data)
+
+        AvatarPipeline(0).submit(self.users[1].id, name)
+
+        self.users[1].refresh_from_db()
+        self.assertTrue(self.users[1].image_thumbnailed)
+        MediaFile.objects.filter(name=name).update(references=0)
+        User.objects.filter(pk=self.users[1].pk).update(image="")
+        self.age(name)
+        self.assertEqual(collect_media_garbage(), [name])
+
+    def test_collect_keeps_images_of_users(self):
+        """Images of users are kept even when their count drifted"""
+        name = self.set_image(self.users[0], self.data)
+        MediaFile.objects.filter(name=name).update(references=0)
+        self.age(name)
+
+        self.assertEqual(collect_media_garbage(), [])
+        self.assertTrue(self.users[0].image.storage.exists(name))
@@ -1,9 +1,13 @@
 import tempfile
 import os
+from io import StringIO
+from unittest.mock import patch
 from datetime import date
 from PIL import Image
 from common.date_utils import convert_str_date, convert_date_str
-from common.tests.utils import create_user
+from common.tests.utils import create_user, create_game
+from game.models import PlaySession
+from django.core.management import call_command
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -13,6 +17,9 @@ from rest_framework import status
 
 USERS_URL = reverse("user:user-list")
 TOKEN_URL = reverse("user:token")
+TOKEN_REFRESH_URL = reverse("user:token-refresh")
+LAST_PLAYED_URL = reverse("user:user-lastplayed-list")
+PLAY_SESSION_URL = reverse("game:playsession-list")
 BIRTHDATE = convert_str_date("1987-09-10")
 
 
@@ -42,6 +49,7 @@ class PublicUserAPITests(TestCase):
         res = self.client.post(USERS_URL, PAYLOAD)
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         del res.data["image"]
+        del res.data["thumbnails"]
 
         user = get_user_model().objects.get(**res.data)
         self.assertTrue(user.check_password(PAYLOAD.get("password", None)))
@@ -192,7 +200,8 @@ class PrivateUserAPITests(TestCase):
         res = self.client.get(USERS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), len(get_user_model().objects.all()))
+        self.assertEqual(len(res.data["results"]),
+                         len(get_user_model().objects.all()))
 
     def test_get_list_of_users_authenticated(self):
         """Request all users with an authenticated user"""
@@ -207,7 +216,8 @@ class PrivateUserAPITests(TestCase):
         res = self.client.get(USERS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), len(get_user_model().objects.all()))
+        self.assertEqual(len(res.data["results"]),
+                         len(get_user_model().objects.all()))
 
     def test_get_list_users_played_games_authenticated(self):
         """Request all users and last plyed game with an authenticated user"""
@@ -216,6 +226,151 @@ class PrivateUserAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_get_list_of_users_fields(self):
+        """Only the selected user fields are rendered"""
+        self.client.force_authenticate(user=self.super_user)
+        res = self.client.get(USERS_URL, {"fields": "email,username"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"], [
+            {"email": user.email, "username": user.username}
+            for user in get_user_model().objects.order_by("id")
+        ])
+
+
+class UserLastPlayedAPITests(TestCase):
+    """Test the users last played API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.super_user = create_user(
+            get_user_model().objects.create_superuser,
+            email="b@b.com",
+            password="12345",
+            username="b",
+            birthdate=BIRTHDATE,
+        )
+        self.game1 = create_game()
+        self.game2 = create_game("Game2")
+        self.client.force_authenticate(user=self.super_user)
+
+    def test_last_played_is_recorded(self):
+        """Creating play sessions updates the user last played columns"""
+        self.client.post(PLAY_SESSION_URL, {"game": self.game1.id})
+        self.client.post(PLAY_SESSION_URL, {"game": self.game2.id})
+        last_session = PlaySession.objects.latest("creation_time")
+
+        self.super_user.refresh_from_db()
+        self.assertEqual(self.super_user.last_played_session, last_session)
+        self.assertEqual(self.super_user.last_played_game, self.game2)
+        self.assertEqual(self.super_user.last_played_at,
+                         last_session.creation_time)
+
+    def test_get_list_users_last_played(self):
+        """Get all users and their last played game with a staff user"""
+        self.client.post(PLAY_SESSION_URL, {"game": self.game1.id})
+        last_session = PlaySession.objects.get()
+
+        res = self.client.get(LAST_PLAYED_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["last_played_session"],
+                         str(last_session))
+
+    def test_get_list_users_never_played(self):
+        """Users without play sessions have an empty last played game"""
+        res = self.client.get(LAST_PLAYED_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["last_played_session"], "")
+
+    def test_delete_last_played_session(self):
+        """Deleting the last session repoints to the previous one"""
+        self.client.post(PLAY_SESSION_URL, {"game": self.game1.id})
+        self.client.post(PLAY_SESSION_URL, {"game": self.game2.id})
+        first, last = PlaySession.objects.order_by("creation_time", "id")
+
+        self.client.delete(
+            reverse("game:playsession-detail", args=[last.id]))
+
+        self.super_user.refresh_from_db()
+        self.assertEqual(self.super_user.last_played_session, first)
+        self.assertEqual(self.super_user.last_played_game, self.game1)
+
+    def test_backfill_last_played(self):
+        """The backfill command fills the last played columns"""
+        PlaySession.objects.create(user=self.super_user, game=self.game1)
+        last_session = PlaySession.objects.create(
+            user=self.super_user, game=self.game2)
+
+        call_command("backfill_last_played", batch_size=1, stdout=StringIO())
+
+        self.super_user.refresh_from_db()
+        self.assertEqual(self.super_user.last_played_session, last_session)
+        self.assertEqual(self.super_user.last_played_game, self.game2)
+
+
+class RefreshTokenAPITests(TestCase):
+    """Test the refresh token API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            get_user_model().objects.create_user,
+            email="nuno@b.com",
+            password="12345",
+            username="nuno",
+            birthdate=BIRTHDATE,
+        )
+        res = self.client.post(
+            TOKEN_URL, {"email": "nuno@b.com", "password": "12345"})
+        self.refresh = res.data["refresh"]
+        self.client.cookies.clear()
+
+    def test_refresh_token(self):
+        """A refresh token gives new tokens without hashing the password"""
+        with patch.object(get_user_model(), "check_password",
+                          autospec=True, return_value=True) as check:
+            res = self.client.post(TOKEN_REFRESH_URL,
+                                   {"refresh": self.refresh})
+            check.assert_not_called()
+
+            # The patch does intercept the password checks of a login
+            self.client.post(TOKEN_URL, {"email": "nuno@b.com",
+                                         "password": "12345"})
+            check.assert_called_once()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("token", res.data)
+        self.assertNotEqual(res.data["refresh"], self.refresh)
+
+        res = self.client.get(PLAY_SESSION_URL,
+                              HTTP_TOKEN=res.data["token"])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_refresh_token_reuse(self):
+        """Reusing a refresh token revokes every token of its family"""
+        res = self.client.post(TOKEN_REFRESH_URL, {"refresh": self.refresh})
+        new_refresh = res.data["refresh"]
+
+        res = self.client.post(TOKEN_REFRESH_URL, {"refresh": self.refresh})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_REFRESH_URL, {"refresh": new_refresh})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_token_invalid(self):
+        """Invalid refresh tokens are rejected"""
+        res = self.client.post(TOKEN_REFRESH_URL, {"refresh": "notatoken"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_token_is_not_an_access_token(self):
+        """Refresh tokens can not authenticate requests"""
+        res = self.client.get(PLAY_SESSION_URL, HTTP_TOKEN=self.refresh)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
 
 class UserImageUploadTest(TestCase):
     def setUp(self):
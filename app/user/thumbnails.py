@@ -0,0 +1,53 @@
+import os
+from PIL import Image, ImageOps
+
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def thumbnail_name(name, size, image_format):
+    """Return the storage name of a thumbnail of an image"""
+    stem, _ = os.path.splitext(name)
+    return f'{stem}_{size}.{EXTENSIONS[image_format]}'
+
+
+def has_alpha(image):
+    """Check if an image has transparent pixels"""
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+
+
+def flatten(image):
+    """Paint a transparent image over a white background"""
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def render_thumbnails(source, targets, quality):
+    """
+    Write square thumbnails of the image at the source path to the
+    (path, size, format) targets. The image is decoded once, at the
+    smallest JPEG scale that still covers the largest thumbnail, and each
+    thumbnail is written next to its path then renamed, so readers never
+    see a partial file. Runs in the worker processes, without Django.
+    """
+    with Image.open(source) as image:
+        largest = max(size for _, size, _ in targets)
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if has_alpha(image) else 'RGB')
+
+    for path, size, image_format in targets:
+        thumbnail = ImageOps.fit(image, (size, size),
+                                 Image.Resampling.LANCZOS)
+        if image_format == 'JPEG' and thumbnail.mode == 'RGBA':
+            thumbnail = flatten(thumbnail)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        thumbnail.save(tmp_path, format=image_format,
+                       quality=quality[image_format], optimize=True)
+        os.replace(tmp_path, path)
+
+    return [path for path, _, _ in targets]
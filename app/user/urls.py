@@ -3,12 +3,15 @@ from django.urls import path, include
 from user import views
 
 router = DefaultRouter()
-router.register("users/lastplayed", views.UserPlaySessionViewSet)
+router.register("users/lastplayed", views.UserPlaySessionViewSet,
+                basename="user-lastplayed")
 router.register("users", views.UserViewSet)
 
 app_name = "user"
 
 urlpatterns = [
     path('', include(router.urls)),
-    path('token/', views.CreateTokenView.as_view(), name='token')
+    path('token/', views.CreateTokenView.as_view(), name='token'),
+    path('token/refresh/', views.RefreshTokenView.as_view(),
+         name='token-refresh'),
 ]
@@ -1,8 +1,9 @@
 from common.jwt_utils import JWTAuthentication
+from common.sparse_fields import SparseFieldsViewMixin
 from common.user_permissions import UserAdminOrOwner
-from user.models import User
+from user.models import User, RefreshToken
 from user.serializers import UserSerializer, UserPlaySessionSerializer, \
-    AuthTokenSerializer, UserDetailSerializer
+    AuthTokenSerializer, UserDetailSerializer, RefreshTokenSerializer
 from rest_framework import viewsets, status, generics
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
@@ -11,13 +12,13 @@ from django.contrib.auth import authenticate
 
 class UserPlaySessionViewSet(viewsets.ReadOnlyModelViewSet):
     """Return users with their last played game"""
-    queryset = User.objects.all()
+    queryset = User.objects.select_related("last_played_game").all()
     serializer_class = UserPlaySessionSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAdminUser]
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """Create and retrieve users"""
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -61,4 +62,26 @@ class CreateTokenView(generics.GenericAPIView):
             msg = 'Unable to authenticate with provided credentials'
             return Response(msg, status=status.HTTP_400_BAD_REQUEST)
 
-        return JWTAuthentication.generate_jwt(user.id, user.is_staff)
+        refresh_token = RefreshToken.objects.issue(user)
+
+        return JWTAuthentication.generate_jwt(user.id, user.is_staff,
+                                              refresh_token)
+
+
+class RefreshTokenView(generics.GenericAPIView):
+    """Exchange a refresh token for new access and refresh tokens"""
+    serializer_class = RefreshTokenSerializer
+
+    def post(self, request, format=None):
+        jti = JWTAuthentication.decode_refresh_jwt(
+            request.data.get("refresh", None))
+
+        refresh_token = RefreshToken.objects.rotate(jti) if jti else None
+
+        if not refresh_token:
+            msg = 'Unable to refresh with provided token'
+            return Response(msg, status=status.HTTP_400_BAD_REQUEST)
+
+        user = refresh_token.user
+        return JWTAuthentication.generate_jwt(user.id, user.is_staff,
+                                              refresh_token)